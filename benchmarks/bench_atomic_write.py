@@ -0,0 +1,41 @@
+"""Cost of atomic_write per durability policy against an in-place write.
+
+Uso: python -m benchmarks.bench_atomic_write [repetições]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from core.storage import DURABILITY_POLICIES, atomic_write
+
+SIZES = (1024, 100 * 1024, 5 * 1024 * 1024)
+
+
+def in_place(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def measure(write, path: str, data: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        write(path, data)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vault.enc")
+        print(f"{'tamanho':>10} {'in-place':>12}" + "".join(f" {policy:>12}" for policy in DURABILITY_POLICIES))
+        for size in SIZES:
+            data = os.urandom(size)
+            row = [measure(in_place, path, data, repeat)]
+            for policy in DURABILITY_POLICIES:
+                row.append(measure(lambda p, d: atomic_write(p, d, policy), path, data, repeat))
+            print(f"{size // 1024:>8}KB" + "".join(f" {value * 1000:>10.3f}ms" for value in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Vault size and save/load latency for each compression setting.
+
+Uso: python -m benchmarks.bench_compression [maior número de entradas]
+"""
+import io
+import sys
+import time
+
+from cryptography.fernet import Fernet
+
+from core import vault_format
+from core.entry_cipher import EntryCipher
+
+SETTINGS = (("none", 0), ("zlib", 1), ("zlib", 6), ("zlib", 9), ("lzma", 0), ("lzma", 6))
+DOMAINS = ("google.com", "github.com", "mail.com", "example.com.br", "bank.com")
+
+
+def make_entries(count: int, cipher: EntryCipher):
+    return [
+        [f"site{i}.{DOMAINS[i % len(DOMAINS)]}", {
+            "username": f"usuario{i}@{DOMAINS[i % len(DOMAINS)]}",
+            "password": cipher.encrypt(f"senha-{i}"),
+            "last_modified": 1700000000.0 + i
+        }]
+        for i in range(count)
+    ]
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    key = Fernet.generate_key()
+    container_key = vault_format.derive_key(key)
+    cipher = EntryCipher(key)
+    count = 1000
+    while count <= largest:
+        entries = make_entries(count, cipher)
+        print(f"{count} entradas")
+        for compression, level in SETTINGS:
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            vault_format.write_records(buffer, container_key, entries, compression, level)
+            save_time = time.perf_counter() - start
+            buffer.seek(0)
+            start = time.perf_counter()
+            for _ in vault_format.read_records(buffer, container_key):
+                pass
+            load_time = time.perf_counter() - start
+            print(f"  {compression:>5} {level}: {len(buffer.getvalue()) / 1024:10.1f} KiB | "
+                  f"save {save_time * 1000:9.1f} ms | load {load_time * 1000:9.1f} ms")
+        count *= 10
+
+
+if __name__ == '__main__':
+    main()
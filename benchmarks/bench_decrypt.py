@@ -0,0 +1,47 @@
+"""Bulk decryption throughput with 1, 2, 4 and 8 workers, threads vs processes.
+
+Uso: python -m benchmarks.bench_decrypt [entradas]
+"""
+import sys
+import time
+
+from cryptography.fernet import Fernet
+
+from core.decrypt_pool import POOL_KINDS, DecryptPool
+from core.entry_cipher import EntryCipher
+
+WORKERS = (1, 2, 4, 8)
+
+
+def run(key: bytes, algorithm: str, kind: str, workers: int, tokens) -> float:
+    pool = DecryptPool(key, algorithm, workers, kind)
+    try:
+        # Aquecer o pool (processos demoram a subir) fora da medição
+        pool.decrypt_many(tokens[:workers * pool.chunk_size])
+        start = time.perf_counter()
+        count = sum(1 for _ in pool.imap(tokens))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+    assert count == len(tokens)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    key = Fernet.generate_key()
+    print(f"{count} entradas")
+    for algorithm in ("aesgcm", "fernet"):
+        cipher = EntryCipher(key, algorithm)
+        tokens = [cipher.encrypt(f"senha-{i}-segura") for i in range(count)]
+        for kind in POOL_KINDS:
+            baseline = None
+            for workers in WORKERS:
+                elapsed = run(key, algorithm, kind, workers, tokens)
+                baseline = baseline or elapsed
+                print(f"{algorithm:>7} {kind:>7} {workers} workers: {elapsed * 1e6 / count:6.2f} us/entrada "
+                      f"({baseline / elapsed:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare per-entry password encryption: legacy Fernet vs AES-GCM.
+
+Uso: python -m benchmarks.bench_entry_cipher [entradas]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from core.password_manager import PasswordManager
+
+
+def run(algorithm: str, count: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = PasswordManager(os.path.join(tmp, "passwords.enc"), entry_algorithm=algorithm)
+        
+        start = time.perf_counter()
+        with manager.transaction():
+            for i in range(count):
+                manager.add_entry(f"site{i}.com", f"user{i}", f"senha-{i}-segura")
+        add_time = time.perf_counter() - start
+        
+        # Mesmo padrão de acesso da exportação: uma decriptação por entrada
+        start = time.perf_counter()
+        for website in manager.get_entries(manager.get_default_group()):
+            manager.get_password(website)
+        read_time = time.perf_counter() - start
+        
+        manager.save()
+        shard_size = sum(
+            os.path.getsize(os.path.join(manager.shard_dir, name))
+            for name in os.listdir(manager.shard_dir)
+        )
+    return {"add": add_time, "read": read_time, "size": shard_size}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(f"{count} entradas")
+    for algorithm in ("fernet", "aesgcm"):
+        result = run(algorithm, count)
+        print(f"{algorithm:>7}: add_entry {result['add'] * 1e6 / count:7.1f} us/entrada | "
+              f"get_password {result['read'] * 1e6 / count:7.1f} us/entrada | "
+              f"shards {result['size'] / 1024:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Three-way merge time for two diverged copies of a large vault.
+
+Uso: python -m benchmarks.bench_merge [número de entradas] [fração alterada de cada lado]
+"""
+import copy
+import random
+import sys
+import time
+
+from core.merge import merge_vaults
+
+GROUPS = ("Geral", "Trabalho", "Bancos", "Social", "Compras")
+
+
+def make_state(count: int):
+    groups = {group: {} for group in GROUPS}
+    for i in range(count):
+        groups[GROUPS[i % len(GROUPS)]][f"site{i}.com"] = {
+            "username": f"user{i}", "password": f"gcm:{i:032x}", "last_modified": 1700000000.0 + i}
+    return {"groups": groups, "default_group": "Geral"}
+
+
+def diverge(state, fraction: float, rng: random.Random, stamp: float):
+    """Edit, delete and add about ``fraction`` of the entries."""
+    state = copy.deepcopy(state)
+    for entries in state["groups"].values():
+        for website in rng.sample(list(entries), int(len(entries) * fraction)):
+            action = rng.random()
+            if action < 0.6:
+                entries[website] = dict(entries[website], password="gcm:novo", last_modified=stamp)
+            elif action < 0.8:
+                del entries[website]
+            else:
+                entries[f"novo{rng.random()}.com"] = {"username": "novo", "password": "gcm:novo",
+                                                      "last_modified": stamp}
+    return state
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    rng = random.Random(42)
+    base = make_state(count)
+    ours = diverge(base, fraction, rng, 1800000000.0)
+    theirs = diverge(base, fraction, rng, 1800000001.0)
+    for _ in range(3):
+        start = time.perf_counter()
+        merged, conflicts = merge_vaults(base, ours, theirs)
+        elapsed = (time.perf_counter() - start) * 1000
+        total = sum(len(entries) for entries in merged["groups"].values())
+        print(f"{count} entradas ({fraction:.0%} alteradas de cada lado): {total} no resultado, "
+              f"{len(conflicts)} conflitos em {elapsed:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
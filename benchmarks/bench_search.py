@@ -0,0 +1,50 @@
+"""Search index build time, per-keystroke query latency and fuzzy lookups.
+
+Uso: python -m benchmarks.bench_search [número de entradas] [limite de resultados]
+"""
+import random
+import string
+import sys
+import time
+
+from core.search_index import SearchIndex
+
+DOMAINS = ("google.com", "github.com", "mail.com", "example.com.br", "bank.com")
+GROUPS = ("Geral", "Trabalho", "Bancos", "Social", "Compras")
+
+
+def make_words(count: int):
+    rng = random.Random(42)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    words = make_words(max(100, count // 30))
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i in range(count):
+        word = words[i % len(words)]
+        index.add(GROUPS[i % len(GROUPS)], f"{word}.{DOMAINS[i % len(DOMAINS)]}",
+                  f"{words[(i * 7) % len(words)]}{i}@{DOMAINS[(i * 3) % len(DOMAINS)]}")
+    print(f"{count} entradas indexadas em {(time.perf_counter() - start) * 1000:.0f} ms")
+    # Cada prefixo simula uma tecla digitada na caixa de busca
+    for query in (words[1], "github.com", "trab " + words[2][:4], "zzzzqq"):
+        for size in range(1, len(query) + 1):
+            start = time.perf_counter()
+            results = index.search(query[:size], limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"  {query[:size]!r:>22}: {len(results):5} resultados em {elapsed:6.2f} ms")
+    # Busca aproximada: troca de letras, letra faltando e palavra incompleta
+    word = words[3]
+    for query in (word[1] + word[0] + word[2:], word[:-1], f"{word}.co", "gihtub"):
+        start = time.perf_counter()
+        results = index.fuzzy(query, 10)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = results[0][1] if results else "-"
+        print(f"  fuzzy {query!r:>16}: {len(results):3} resultados em {elapsed:6.2f} ms (melhor: {best})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Sync server throughput with many concurrent clients on localhost.
+
+Uso: python -m benchmarks.bench_sync [clientes] [deltas por cliente]
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+from cryptography.fernet import Fernet
+
+from core.sync_protocol import SyncCipher, read_message, write_message
+from core.sync_server import SyncServer
+
+
+async def client(address, cipher: SyncCipher, count: int, start: asyncio.Event):
+    origin = uuid.uuid4().hex
+    reader, writer = await asyncio.open_connection(*address)
+    deltas = []
+    for i in range(count):
+        delta_id = cipher.delta_id("Geral", f"{origin}{i}.com")
+        deltas.append({"counter": i + 1, "id": delta_id,
+                       "payload": cipher.seal(delta_id, {"kind": "entry", "group": "Geral", "website": f"{i}.com",
+                                                         "entry": None, "at": 0})})
+    await start.wait()
+    await write_message(writer, {"op": "push", "vault": cipher.vault_id, "origin": origin, "deltas": deltas})
+    await read_message(reader)
+    # Pull: recebe o que os outros clientes já enviaram
+    vector, pulled = {origin: count}, 0
+    while True:
+        await write_message(writer, {"op": "pull", "vault": cipher.vault_id, "vector": vector})
+        response = await read_message(reader)
+        for delta in response["deltas"]:
+            vector[delta["origin"]] = delta["counter"]
+        pulled += len(response["deltas"])
+        if not response["more"]:
+            break
+    writer.close()
+    await writer.wait_closed()
+    return pulled
+
+
+async def run(clients: int, count: int):
+    server = SyncServer()
+    address = await server.start()
+    cipher = SyncCipher(Fernet.generate_key())
+    start = asyncio.Event()
+    tasks = [asyncio.create_task(client(address, cipher, count, start)) for _ in range(clients)]
+    await asyncio.sleep(0.1)
+    began = time.perf_counter()
+    start.set()
+    pulled = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - began
+    await server.close()
+    print(f"{clients} clientes x {count} deltas: {elapsed * 1000:.0f} ms, "
+          f"{clients * count} deltas enviados, {sum(pulled)} recebidos ({sum(pulled) / elapsed:.0f}/s)")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run(clients, count))
+
+
+if __name__ == "__main__":
+    main()
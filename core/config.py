@@ -1,9 +1,11 @@
 import json
 import os
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from core.storage import DEFAULT_DURABILITY, atomic_write, check_durability, read_keys, write_keys
 
 class Config:
-    def __init__(self):
+    def __init__(self, durability=DEFAULT_DURABILITY):
+        self.durability = check_durability(durability)
         self.config_file = "config.enc"
         self.key_file = "config.key"
         self._load_or_create_config()
@@ -13,17 +15,18 @@ class Config:
     
     def _load_or_create_key(self):
         if os.path.exists(self.key_file):
-            with open(self.key_file, 'rb') as f:
-                return f.read()
+            return read_keys(self.key_file)
         else:
-            key = self._generate_key()
-            with open(self.key_file, 'wb') as f:
-                f.write(key)
-            return key
+            keys = [self._generate_key()]
+            write_keys(self.key_file, keys, self.durability)
+            return keys
+    
+    def _set_keys(self, keys):
+        self.keys = keys
+        self.fernet = MultiFernet([Fernet(key) for key in keys])
     
     def _load_or_create_config(self):
-        key = self._load_or_create_key()
-        self.fernet = Fernet(key)
+        self._set_keys(self._load_or_create_key())
         
         default_config = {
             'email': {
@@ -36,7 +39,8 @@ class Config:
                 'theme': 'dark',
                 'auto_logout': 30,  # minutos
                 'backup_enabled': True,
-                'backup_interval': 24  # horas
+                'backup_interval': 24,  # horas
+                'kdf_target_ms': 500  # tempo alvo do KDF do login na calibração
             }
         }
         
@@ -45,14 +49,27 @@ class Config:
                 encrypted_data = f.read()
                 decrypted_data = self.fernet.decrypt(encrypted_data)
                 self.config = json.loads(decrypted_data)
+            if len(self.keys) > 1:
+                # Rotação interrompida antes de regravar o arquivo
+                self._finish_rotation()
         else:
             self.config = default_config
             self.save_config()
     
     def save_config(self):
         encrypted_data = self.fernet.encrypt(json.dumps(self.config).encode())
-        with open(self.config_file, 'wb') as f:
-            f.write(encrypted_data)
+        atomic_write(self.config_file, encrypted_data, self.durability)
+    
+    def rotate_key(self):
+        """Replace config.key, re-encrypting config.enc with the new key."""
+        self._set_keys([self._generate_key()] + self.keys)
+        write_keys(self.key_file, self.keys, self.durability)
+        self._finish_rotation()
+    
+    def _finish_rotation(self):
+        self.save_config()
+        write_keys(self.key_file, self.keys[:1], self.durability)
+        self._set_keys(self.keys[:1])
     
     def get_email_settings(self):
         return self.config.get('email', {})
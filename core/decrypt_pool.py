@@ -0,0 +1,107 @@
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from core.entry_cipher import EntryCipher
+
+POOL_KINDS = ("thread", "process")
+DEFAULT_POOL_KIND = "thread"
+
+# Cifra de cada processo do pool, criada pelo inicializador
+_worker_cipher: Optional[EntryCipher] = None
+
+
+def _init_worker(key: bytes, algorithm: str, old_keys: Sequence[bytes]) -> None:
+    global _worker_cipher
+    _worker_cipher = EntryCipher(key, algorithm, old_keys)
+
+
+def _decrypt_chunk(tokens: List[str]) -> List[str]:
+    decrypt = _worker_cipher.decrypt
+    return [decrypt(token) for token in tokens]
+
+
+class DecryptPool:
+    """Decrypt entry passwords in bulk across a ``concurrent.futures`` pool.
+
+    Tokens are sent to the workers in chunks, so the per-task overhead is
+    paid once per chunk instead of once per entry. Results stream back in
+    input order, and only ``workers * 2`` chunks are in flight at a time,
+    so decrypting a large vault does not hold every plaintext in memory.
+    With a single worker everything runs inline on the calling thread.
+    """
+
+    CHUNK_SIZE = 256
+
+    def __init__(self, key: bytes, algorithm: str = "aesgcm", workers: int = 1,
+                 kind: str = DEFAULT_POOL_KIND, chunk_size: int = None, old_keys: Sequence[bytes] = ()):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Tipo de pool desconhecido: {kind}")
+        if workers < 1:
+            raise ValueError("O pool precisa de pelo menos um worker")
+        self.algorithm = algorithm
+        self.workers = workers
+        self.kind = kind
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self._executor: Optional[Executor] = None
+        self.set_keys(key, old_keys)
+
+    def set_keys(self, key: bytes, old_keys: Sequence[bytes] = ()) -> None:
+        """Switch keys, e.g. when a key rotation starts or finishes."""
+        self.key = key
+        self.old_keys = tuple(old_keys)
+        self.cipher = EntryCipher(key, self.algorithm, self.old_keys)
+        if self.kind == "process" and self._executor is not None:
+            # Os processos guardam a cifra do inicializador: recriar o pool
+            # (tarefas já enviadas terminam com as chaves antigas)
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _pool(self) -> Executor:
+        # Criado no primeiro uso: a maioria das sessões nunca decripta em massa
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                     initargs=(self.key, self.algorithm, self.old_keys))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="vault-decrypt")
+        return self._executor
+
+    def _task(self, tokens: List[str]):
+        if self.kind == "process":
+            return self._pool().submit(_decrypt_chunk, tokens)
+        decrypt = self.cipher.decrypt
+        return self._pool().submit(lambda: [decrypt(token) for token in tokens])
+
+    def imap(self, tokens: Iterable[str]) -> Iterator[str]:
+        """Yield the plaintext of each token, in the order the tokens were given."""
+        tokens = iter(tokens)
+        if self.workers == 1:
+            decrypt = self.cipher.decrypt
+            for token in tokens:
+                yield decrypt(token)
+            return
+        in_flight = deque()
+        try:
+            while True:
+                while len(in_flight) < self.workers * 2:
+                    chunk = list(islice(tokens, self.chunk_size))
+                    if not chunk:
+                        break
+                    in_flight.append(self._task(chunk))
+                if not in_flight:
+                    return
+                yield from in_flight.popleft().result()
+        finally:
+            # Consumidor parou no meio (cancelamento): descartar o que sobrou
+            for future in in_flight:
+                future.cancel()
+
+    def decrypt_many(self, tokens: Iterable[str]) -> List[str]:
+        return list(self.imap(tokens))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
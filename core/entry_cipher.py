@@ -0,0 +1,91 @@
+import base64
+import os
+from typing import Sequence
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+
+class EntryCipher:
+    """Per-entry password encryption inside an already encrypted vault.
+
+    New entries are sealed with AES-GCM using a single context derived once
+    from the vault key, which costs about half of a Fernet token and takes
+    fewer bytes. Fernet tokens written by older versions are still read, so
+    vaults can be migrated entry by entry. During a key rotation the
+    previous keys are passed as ``old_keys``: tokens are still read with
+    them, while new tokens always use ``key``.
+    """
+
+    PREFIX = "gcm:"
+    NONCE_SIZE = 12
+
+    def __init__(self, key: bytes, algorithm: str = "aesgcm", old_keys: Sequence[bytes] = ()):
+        if algorithm not in ("aesgcm", "fernet"):
+            raise ValueError(f"Algoritmo de criptografia desconhecido: {algorithm}")
+        self.algorithm = algorithm
+        self.current_fernet = Fernet(key)
+        self.fernet = MultiFernet([self.current_fernet, *(Fernet(candidate) for candidate in old_keys)])
+        self.aeads = [AESGCM(self._entry_key(candidate)) for candidate in (key, *old_keys)]
+        self.aead = self.aeads[0]
+
+    @staticmethod
+    def _entry_key(key: bytes) -> bytes:
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"securevault-entry-key",
+        ).derive(base64.urlsafe_b64decode(key))
+
+    def encrypt(self, password: str) -> str:
+        if self.algorithm == "fernet":
+            return self.fernet.encrypt(password.encode()).decode()
+        nonce = os.urandom(self.NONCE_SIZE)
+        sealed = nonce + self.aead.encrypt(nonce, password.encode(), None)
+        return self.PREFIX + base64.urlsafe_b64encode(sealed).decode()
+
+    def decrypt(self, token: str) -> str:
+        if token.startswith(self.PREFIX):
+            sealed = base64.urlsafe_b64decode(token[len(self.PREFIX):])
+            nonce, ciphertext = sealed[:self.NONCE_SIZE], sealed[self.NONCE_SIZE:]
+            for aead in self.aeads[:-1]:
+                try:
+                    return aead.decrypt(nonce, ciphertext, None).decode()
+                except InvalidTag:
+                    continue
+            return self.aeads[-1].decrypt(nonce, ciphertext, None).decode()
+        return self.fernet.decrypt(token.encode()).decode()
+
+    def is_current(self, token: str) -> bool:
+        """Whether ``token`` uses the configured algorithm and the current key."""
+        if self.needs_upgrade(token):
+            return False
+        try:
+            if token.startswith(self.PREFIX):
+                sealed = base64.urlsafe_b64decode(token[len(self.PREFIX):])
+                self.aead.decrypt(sealed[:self.NONCE_SIZE], sealed[self.NONCE_SIZE:], None)
+            else:
+                self.current_fernet.decrypt(token.encode())
+        except (InvalidTag, InvalidToken):
+            return False
+        return True
+
+    def rotate(self, token: str) -> str:
+        """Re-encrypt ``token`` with the current key, unless it already uses it."""
+        if self.is_current(token):
+            return token
+        return self.encrypt(self.decrypt(token))
+
+    def needs_upgrade(self, token: str) -> bool:
+        """Whether ``token`` was written with a different algorithm."""
+        return (self.algorithm == "aesgcm") != token.startswith(self.PREFIX)
+
+    def upgrade(self, token: str) -> str:
+        """Re-encrypt ``token`` with the configured algorithm."""
+        if not self.needs_upgrade(token):
+            return token
+        return self.encrypt(self.decrypt(token))
@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import os
+import struct
+from itertools import islice
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from core import vault_format
+from core.storage import DEFAULT_DURABILITY, atomic_writer
+
+# Exportação criptografada (.svx):
+#   cabeçalho: magic | versão | iterações do PBKDF2 | sal
+#   corpo:     contêiner do cofre (vault_format) com um registro por entrada
+# A chave vem de uma senha escolhida na exportação, não da chave do cofre,
+# para que o arquivo possa ser importado em outra instalação.
+EXPORT_MAGIC = b"SVEX"
+EXPORT_VERSION = 1
+EXPORT_HEADER = struct.Struct(">4sBI16s")
+EXPORT_ITERATIONS = 600000
+FIELDS = ['group', 'website', 'username', 'password']
+
+
+class ExportSummary:
+    """Outcome of an export."""
+
+    def __init__(self):
+        self.exported = 0
+        self.cancelled = False
+
+    def __repr__(self):
+        return f"ExportSummary(exported={self.exported}, cancelled={self.cancelled})"
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _derive_export_key(passphrase: str, salt: bytes, iterations: int) -> bytes:
+    return PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    ).derive(passphrase.encode())
+
+
+def read_encrypted(fp: BinaryIO, passphrase: str) -> Iterator:
+    """Yield the entries of an encrypted export one at a time."""
+    header = fp.read(EXPORT_HEADER.size)
+    if len(header) != EXPORT_HEADER.size:
+        raise ValueError("Arquivo exportado truncado")
+    magic, version, iterations, salt = EXPORT_HEADER.unpack(header)
+    if magic != EXPORT_MAGIC:
+        raise ValueError("Arquivo não é uma exportação criptografada do SecureVault")
+    if version != EXPORT_VERSION:
+        raise ValueError(f"Versão de exportação não suportada: {version}")
+    key = _derive_export_key(passphrase, salt, iterations)
+    try:
+        yield from vault_format.read_records(fp, key)
+    except InvalidTag:
+        raise ValueError("Senha incorreta ou arquivo exportado corrompido") from None
+
+
+class _CsvWriter:
+    def __init__(self, fp: BinaryIO, passphrase: str = None):
+        self.text = io.TextIOWrapper(fp, encoding='utf-8', newline='', write_through=True)
+        self.writer = csv.DictWriter(self.text, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, entries) -> None:
+        self.writer.writerows(entries)
+
+    def close(self) -> None:
+        self.text.flush()
+        self.text.detach()
+
+
+class _JsonWriter:
+    """Write a JSON array item by item, in the format the importer reads."""
+
+    def __init__(self, fp: BinaryIO, passphrase: str = None):
+        self.fp = fp
+        self.first = True
+        fp.write(b"[")
+
+    def write(self, entries) -> None:
+        parts = []
+        for entry in entries:
+            parts.append(("\n    " if self.first else ",\n    ") + json.dumps(entry))
+            self.first = False
+        self.fp.write("".join(parts).encode())
+
+    def close(self) -> None:
+        self.fp.write(b"\n]\n" if not self.first else b"]\n")
+
+
+class _EncryptedWriter:
+    def __init__(self, fp: BinaryIO, passphrase: str = None):
+        if not passphrase:
+            raise ValueError("A exportação criptografada precisa de uma senha")
+        salt = os.urandom(16)
+        fp.write(EXPORT_HEADER.pack(EXPORT_MAGIC, EXPORT_VERSION, EXPORT_ITERATIONS, salt))
+        key = _derive_export_key(passphrase, salt, EXPORT_ITERATIONS)
+        self.container = vault_format.ContainerWriter(fp, key)
+
+    def write(self, entries) -> None:
+        for entry in entries:
+            self.container.write_record(entry)
+
+    def close(self) -> None:
+        self.container.close()
+
+
+WRITERS = {".csv": _CsvWriter, ".json": _JsonWriter, ".svx": _EncryptedWriter}
+
+
+class PasswordExporter:
+    """Stream every entry of a PasswordManager into a CSV, JSON or .svx file.
+
+    Entries are decrypted and written a chunk at a time, so neither the
+    whole plaintext export nor the decrypted vault is held in memory. The
+    file is written atomically: a cancelled or failed export leaves no
+    partial file behind. ``.svx`` files are encrypted with ``passphrase``,
+    so the passwords never reach the disk in plaintext.
+    """
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, password_manager, path: str, passphrase: str = None,
+                 chunk_size: int = None, durability: str = DEFAULT_DURABILITY):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in WRITERS:
+            raise ValueError(f"Formato de exportação não suportado: {extension}")
+        if extension == ".svx" and not passphrase:
+            raise ValueError("A exportação criptografada precisa de uma senha")
+        self.password_manager = password_manager
+        self.path = path
+        self.writer = WRITERS[extension]
+        self.passphrase = passphrase
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.durability = durability
+
+    def iter_chunks(self) -> Iterator[list]:
+        """Yield lists of decrypted entries, in vault order."""
+        entries = self.password_manager.iter_decrypted()
+        while True:
+            chunk = [{
+                'group': group,
+                'website': website,
+                'username': entry['username'],
+                'password': entry['password']
+            } for group, website, entry in islice(entries, self.chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+
+    def run(self, progress: Optional[Callable[[int, int], None]] = None,
+            should_cancel: Optional[Callable[[], bool]] = None) -> ExportSummary:
+        """Export the vault, calling ``progress(exported, total)`` after each chunk."""
+        summary = ExportSummary()
+        pm = self.password_manager
+        total = sum(len(pm.get_entries(group)) for group in pm.list_groups())
+        try:
+            with atomic_writer(self.path, self.durability) as fp:
+                writer = self.writer(fp, self.passphrase)
+                for chunk in self.iter_chunks():
+                    if should_cancel is not None and should_cancel():
+                        raise _Cancelled()
+                    writer.write(chunk)
+                    summary.exported += len(chunk)
+                    if progress is not None:
+                        progress(summary.exported, total)
+                writer.close()
+        except _Cancelled:
+            summary.exported = 0
+            summary.cancelled = True
+        return summary
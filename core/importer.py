@@ -0,0 +1,207 @@
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from core.exporter import read_encrypted
+
+# Tamanho dos blocos lidos do arquivo JSON
+READ_SIZE = 64 * 1024
+
+
+class ImportSummary:
+    """Outcome of an import: what was added, what was left out and why."""
+
+    def __init__(self):
+        self.imported = 0
+        self.duplicates: List[Tuple[str, str]] = []
+        self.skipped: List[Tuple[int, str]] = []  # (número do registro, motivo)
+        self.groups_created: List[str] = []
+        self.cancelled = False
+
+    def __repr__(self):
+        return (f"ImportSummary(imported={self.imported}, duplicates={len(self.duplicates)}, "
+                f"skipped={len(self.skipped)}, cancelled={self.cancelled})")
+
+
+class _CountingReader(io.RawIOBase):
+    """Binary file wrapper that counts the bytes consumed, for progress."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.consumed = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = self.raw.readinto(buffer)
+        self.consumed += size or 0
+        return size
+
+
+def read_csv(fp: io.RawIOBase, passphrase: str = None) -> Iterator[Dict]:
+    """Yield the rows of a CSV export one at a time."""
+    text = io.TextIOWrapper(io.BufferedReader(fp), encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(text)
+
+
+def read_json(fp: io.RawIOBase, passphrase: str = None) -> Iterator:
+    """Yield the items of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ""
+    position = 0
+    eof = False
+    # O que pode vir a seguir: "[" no início, um item ou "]" depois dele,
+    # "," ou "]" depois de um item e só um item depois de uma vírgula
+    expected = "["
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise ValueError("JSON incompleto: faltou fechar a lista")
+            chunk = fp.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + utf8.decode(chunk or b"", final=eof)
+            position = 0
+            continue
+        char = buffer[position]
+        if expected == "[":
+            if char != '[':
+                raise ValueError("O arquivo JSON deve conter uma lista de entradas")
+            position += 1
+            expected = "item or ]"
+            continue
+        if char == ']' and expected in ("item or ]", ", or ]"):
+            return
+        if expected == ", or ]":
+            if char != ',':
+                raise ValueError(f"JSON inválido: esperava ',' ou ']' e encontrou {char!r}")
+            position += 1
+            expected = "item"
+            continue
+        if char in ',]':
+            raise ValueError(f"JSON inválido: esperava um item e encontrou {char!r}")
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        if end is None or (end == len(buffer) and not eof):
+            # Item cortado no fim do bloco (um número pode continuar no
+            # próximo): ler mais e decodificar de novo
+            chunk = fp.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + utf8.decode(chunk or b"", final=eof)
+            position = 0
+            continue
+        position = end
+        expected = ", or ]"
+        yield item
+
+
+READERS = {".csv": read_csv, ".json": read_json, ".svx": read_encrypted}
+
+
+class PasswordImporter:
+    """Stream a CSV, JSON or encrypted .svx export into a PasswordManager in batches.
+
+    Each batch is one transaction, so it reaches the journal with a single
+    write and the vault lock is released between batches. Entries that
+    already exist are reported as duplicates and left untouched; malformed
+    rows are skipped. Cancelling removes everything this import added.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, password_manager, path: str, default_group: str = None, batch_size: int = None,
+                 passphrase: str = None):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in READERS:
+            raise ValueError(f"Formato de importação não suportado: {extension}")
+        if extension == ".svx" and not passphrase:
+            raise ValueError("A importação de um arquivo criptografado precisa da senha")
+        self.password_manager = password_manager
+        self.path = path
+        self.reader = READERS[extension]
+        self.default_group = default_group or password_manager.get_default_group()
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.passphrase = passphrase
+        self._added: List[Tuple[str, str]] = []
+
+    def run(self, progress: Optional[Callable[[int, int, int], None]] = None,
+            should_cancel: Optional[Callable[[], bool]] = None) -> ImportSummary:
+        """Import the file, calling ``progress(rows, bytes_read, total_bytes)`` per batch.
+
+        ``should_cancel`` is checked between batches; when it returns True the
+        entries and groups added so far are removed and the summary comes back
+        with ``cancelled`` set.
+        """
+        summary = ImportSummary()
+        total = os.path.getsize(self.path)
+        with open(self.path, 'rb', buffering=0) as raw:
+            counter = _CountingReader(raw)
+            rows = enumerate(self.reader(counter, self.passphrase), 1)
+            try:
+                while True:
+                    if should_cancel is not None and should_cancel():
+                        self._rollback(summary)
+                        return summary
+                    batch = [row for _, row in zip(range(self.batch_size), rows)]
+                    if not batch:
+                        break
+                    with self.password_manager.transaction():
+                        groups = set(self.password_manager.list_groups())
+                        for number, row in batch:
+                            self._import_row(number, row, summary, groups)
+                    if progress is not None:
+                        progress(batch[-1][0], counter.consumed, total)
+            except BaseException:
+                # Arquivo inválido no meio da importação: não deixar metade dela
+                self._rollback(summary)
+                raise
+        return summary
+
+    def _import_row(self, number: int, row, summary: ImportSummary, groups: Set[str]) -> None:
+        if not isinstance(row, dict):
+            summary.skipped.append((number, "Formato inválido"))
+            return
+        website = (row.get('website') or '').strip()
+        username = row.get('username')
+        password = row.get('password')
+        if not website or username is None or password is None:
+            summary.skipped.append((number, "Campos obrigatórios ausentes"))
+            return
+        group = row.get('group') or self.default_group
+        pm = self.password_manager
+        if group not in groups:
+            pm.create_group(group)
+            groups.add(group)
+            summary.groups_created.append(group)
+        if pm.has_entry(website, group):
+            summary.duplicates.append((group, website))
+            return
+        pm.add_entry(website, str(username), str(password), group)
+        self._added.append((group, website))
+        summary.imported += 1
+
+    def _rollback(self, summary: ImportSummary) -> None:
+        """Remove the entries and groups this import added, in one transaction."""
+        pm = self.password_manager
+        by_group: Dict[str, List[str]] = {}
+        for group, website in self._added:
+            by_group.setdefault(group, []).append(website)
+        with pm.transaction():
+            for group, websites in by_group.items():
+                if group not in summary.groups_created:
+                    pm.delete_entries(websites, group)
+            for group in summary.groups_created:
+                pm.delete_group(group)
+        self._added = []
+        summary.imported = 0
+        summary.cancelled = True
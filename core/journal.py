@@ -0,0 +1,101 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from core.storage import DEFAULT_DURABILITY, atomic_write, check_durability
+
+
+class Journal:
+    """Append-only log of individually encrypted mutation records.
+
+    Each line of the file is a Fernet token holding the JSON list of records
+    written together, so an edit only costs the encryption of that batch plus
+    an append, and a batch is either fully replayed or not at all.
+    """
+
+    def __init__(self, path: str, fernet: Fernet, durability: str = DEFAULT_DURABILITY):
+        self.path = path
+        self.fernet = fernet
+        self.durability = check_durability(durability)
+
+    def encode(self, records: List[Dict]) -> bytes:
+        """Encrypt a batch of records into a single journal line."""
+        return self.fernet.encrypt(json.dumps(records).encode()) + b"\n"
+
+    def write(self, line: bytes) -> None:
+        """Append a line produced by ``encode``."""
+        with open(self.path, 'ab') as f:
+            f.write(line)
+            if self.durability == "always":
+                f.flush()
+                os.fsync(f.fileno())
+
+    def sync(self) -> None:
+        """Force appends made under the "batched" policy to disk."""
+        if self.durability == "none" or not os.path.exists(self.path):
+            return
+        with open(self.path, 'ab') as f:
+            os.fsync(f.fileno())
+
+    def read_from(self, offset: int) -> Tuple[List[Dict], int]:
+        """Return the records stored after byte ``offset`` and where they end.
+
+        Lets a reader that already replayed the journal up to ``offset``
+        pick up only what other processes appended since.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                lines = f.read().split(b"\n")
+        except FileNotFoundError:
+            return [], 0
+        # Só linhas completas contam: um resto sem quebra de linha no fim é
+        # uma escrita interrompida, que o próximo escritor corta (truncate)
+        *complete, _ = lines
+        records = []
+        for i, line in enumerate(complete):
+            if line:
+                try:
+                    batch = json.loads(self.fernet.decrypt(line))
+                except InvalidToken:
+                    # Uma última linha corrompida é resultado de uma escrita
+                    # interrompida; qualquer outra indica um journal inválido
+                    if i == len(complete) - 1:
+                        break
+                    raise
+                records.extend(batch)
+            offset += len(line) + 1
+        return records, offset
+
+    def truncate(self, offset: int) -> None:
+        """Cut what follows ``offset`` (a torn write), so appends start on a fresh line."""
+        with open(self.path, 'r+b') as f:
+            f.truncate(offset)
+            if self.durability != "none":
+                os.fsync(f.fileno())
+
+    def identity(self) -> Optional[Tuple[int, int]]:
+        """Identify the journal file; it changes when the journal is compacted."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def size(self) -> int:
+        """Current journal size in bytes."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def discard_prefix(self, offset: int) -> None:
+        """Drop the first ``offset`` bytes, already folded into a snapshot."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            remaining = f.read()
+        atomic_write(self.path, remaining, self.durability)
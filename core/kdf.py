@@ -0,0 +1,78 @@
+import os
+import time
+from typing import Dict
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+# Parâmetros do KDF das senhas de login, guardados em cada perfil:
+#   {"algorithm": "pbkdf2-sha256", "iterations": N}
+#   {"algorithm": "scrypt", "n": N, "r": r, "p": p}
+ALGORITHMS = ("pbkdf2-sha256", "scrypt")
+# Perfis criados antes dos parâmetros serem guardados
+LEGACY_PARAMS = {"algorithm": "pbkdf2-sha256", "iterations": 100000}
+DEFAULT_PARAMS = {"algorithm": "pbkdf2-sha256", "iterations": 600000}
+# A calibração nunca escolhe menos que isto, mesmo em máquinas lentas
+MIN_PBKDF2_ITERATIONS = 100000
+MIN_SCRYPT_N = 2 ** 14
+MAX_SCRYPT_N = 2 ** 17  # 128 MiB de memória com r = 8
+SCRYPT_R = 8
+SCRYPT_P = 1
+KEY_LENGTH = 32
+
+
+def check_params(params: Dict) -> Dict:
+    algorithm = params.get("algorithm")
+    if algorithm == "pbkdf2-sha256":
+        if int(params.get("iterations", 0)) < 1:
+            raise ValueError("O PBKDF2 precisa de pelo menos uma iteração")
+        return {"algorithm": algorithm, "iterations": int(params["iterations"])}
+    if algorithm == "scrypt":
+        n = int(params.get("n", 0))
+        if n < 2 or n & (n - 1):
+            raise ValueError("O parâmetro n do scrypt deve ser uma potência de 2")
+        return {"algorithm": algorithm, "n": n, "r": int(params.get("r", SCRYPT_R)),
+                "p": int(params.get("p", SCRYPT_P))}
+    raise ValueError(f"Algoritmo de KDF desconhecido: {algorithm}")
+
+
+def derive(password: str, salt: bytes, params: Dict) -> bytes:
+    """Run the KDF described by ``params`` over ``password``."""
+    if params["algorithm"] == "scrypt":
+        kdf = Scrypt(salt=salt, length=KEY_LENGTH, n=params["n"], r=params["r"], p=params["p"])
+    else:
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=KEY_LENGTH, salt=salt,
+                         iterations=params["iterations"])
+    return kdf.derive(password.encode())
+
+
+def _seconds(params: Dict) -> float:
+    salt = os.urandom(16)
+    start = time.perf_counter()
+    derive("calibração", salt, params)
+    return time.perf_counter() - start
+
+
+def calibrate(target_seconds: float = 0.5, algorithm: str = "pbkdf2-sha256") -> Dict:
+    """Pick the parameters whose derivation takes about ``target_seconds`` here.
+
+    The cost of both algorithms grows linearly with iterations (PBKDF2) or
+    ``n`` (scrypt), so one timed run at a known cost is scaled to the
+    target. The result is never below the minimum cost.
+    """
+    if algorithm == "pbkdf2-sha256":
+        sample = {"algorithm": algorithm, "iterations": MIN_PBKDF2_ITERATIONS}
+        scale = target_seconds / max(_seconds(sample), 1e-6)
+        # Arredondar para deixar os valores guardados legíveis
+        iterations = int(MIN_PBKDF2_ITERATIONS * scale) // 10000 * 10000
+        return {"algorithm": algorithm, "iterations": max(MIN_PBKDF2_ITERATIONS, iterations)}
+    if algorithm == "scrypt":
+        sample = {"algorithm": algorithm, "n": MIN_SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P}
+        elapsed = max(_seconds(sample), 1e-6)
+        n = MIN_SCRYPT_N
+        # n precisa ser potência de 2: dobrar enquanto couber no tempo
+        while n < MAX_SCRYPT_N and elapsed * (n * 2) / MIN_SCRYPT_N <= target_seconds:
+            n *= 2
+        return {"algorithm": algorithm, "n": n, "r": SCRYPT_R, "p": SCRYPT_P}
+    raise ValueError(f"Algoritmo de KDF desconhecido: {algorithm}")
@@ -0,0 +1,91 @@
+from typing import Dict, List, Optional, Tuple
+
+# Conflitos: os dois lados mudaram a mesma entrada desde a base
+#   both_modified - alterada dos dois lados, de formas diferentes
+#   both_added    - criada dos dois lados, com conteúdos diferentes
+#   modify_delete - alterada de um lado e excluída do outro
+CONFLICT_KINDS = ("both_modified", "both_added", "modify_delete")
+
+
+def same_version(a: Optional[Dict], b: Optional[Dict]) -> bool:
+    """Whether two copies of an entry hold the same edit (None meaning absent).
+
+    Every edit sets ``last_modified``, while re-encrypting a password (key
+    rotation, algorithm upgrade) keeps it, so the encrypted token itself is
+    not compared.
+    """
+    if a is None or b is None:
+        return a is b
+    return a["username"] == b["username"] and a.get("last_modified") == b.get("last_modified")
+
+
+def merge_entry(base: Optional[Dict], ours: Optional[Dict],
+                theirs: Optional[Dict]) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Merge one entry, None meaning absent; returns ``(entry, conflict)``.
+
+    A side that left the entry as in ``base`` takes the other side's
+    version. When both changed it, the newer ``last_modified`` wins (ours on
+    a tie) and an edit always beats a deletion, so no edit is lost silently.
+    """
+    if same_version(ours, theirs):
+        return ours, None
+    if same_version(ours, base):
+        return theirs, None
+    if same_version(theirs, base):
+        return ours, None
+    if ours is None or theirs is None:
+        kind = "modify_delete"
+        winner = "ours" if theirs is None else "theirs"
+    else:
+        kind = "both_added" if base is None else "both_modified"
+        winner = "theirs" if theirs.get("last_modified", 0) > ours.get("last_modified", 0) else "ours"
+    entry = ours if winner == "ours" else theirs
+    return entry, {"kind": kind, "resolution": winner, "ours": ours, "theirs": theirs}
+
+
+def merge_vaults(base: Dict, ours: Dict, theirs: Dict) -> Tuple[Dict, List[Dict]]:
+    """Three-way merge of two vault states that diverged from ``base``.
+
+    Each state is ``{"groups": {group: {website: entry}}, "default_group":
+    group}``, as kept by ``PasswordManager``. Entries are compared by
+    version (see ``same_version``), never decrypted. Runs in time
+    linear in the number of entries: each one is looked up once per side.
+    Returns the merged state and the conflicts, each a dict with the
+    ``group``, ``website``, ``kind`` (see ``CONFLICT_KINDS``), the winning
+    side as ``resolution`` and both versions as ``ours``/``theirs``.
+    """
+    base_groups, our_groups, their_groups = base["groups"], ours["groups"], theirs["groups"]
+    merged: Dict[str, Dict[str, Dict]] = {}
+    conflicts: List[Dict] = []
+    # Ordem dos grupos: a nossa, seguida dos grupos novos do outro lado
+    for group_name in dict.fromkeys([*our_groups, *their_groups]):
+        base_entries = base_groups.get(group_name) or {}
+        our_entries = our_groups.get(group_name)
+        their_entries = their_groups.get(group_name)
+        # Grupo excluído de um lado: tratar cada entrada como excluída
+        our_side = our_entries or {}
+        their_side = their_entries or {}
+        entries = {}
+        for website in dict.fromkeys([*our_side, *their_side]):
+            ours_entry, their_entry = our_side.get(website), their_side.get(website)
+            if ours_entry == their_entry:
+                # Caso comum (entrada intocada dos dois lados), sem chamar merge_entry
+                entries[website] = ours_entry
+                continue
+            entry, conflict = merge_entry(base_entries.get(website), ours_entry, their_entry)
+            if entry is not None:
+                entries[website] = entry
+            if conflict is not None:
+                conflict.update(group=group_name, website=website)
+                conflicts.append(conflict)
+        both = our_entries is not None and their_entries is not None
+        created = group_name not in base_groups
+        # Excluído de um lado, o grupo só fica se o outro lado o alterou
+        if both or created or entries:
+            merged[group_name] = entries
+    base_default, our_default, their_default = (base["default_group"], ours["default_group"],
+                                                theirs["default_group"])
+    default_group = their_default if our_default == base_default else our_default
+    if default_group not in merged:
+        default_group = our_default if our_default in merged else next(iter(merged), "Geral")
+    return {"groups": merged, "default_group": default_group}, conflicts
@@ -1,73 +1,961 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 import json
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from itertools import islice, tee
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from core import vault_format
+from core.decrypt_pool import DEFAULT_POOL_KIND, DecryptPool
+from core.entry_cipher import EntryCipher
+from core.journal import Journal
+from core.merge import merge_vaults, same_version
+from core.search_index import SearchIndex
+from core.storage import (DEFAULT_DURABILITY, FileLock, atomic_writer, check_durability, file_stamp,
+                          fsync_directory, is_wrapped, read_keys, write_keys)
 
 class PasswordManager:
-    def __init__(self, password_file: str):
+    # Tamanho do journal (bytes) a partir do qual ele é compactado no snapshot
+    JOURNAL_COMPACT_THRESHOLD = 1024 * 1024
+    # Tempo (segundos) que o modo assíncrono espera para agrupar alterações
+    SAVE_DEBOUNCE = 0.25
+    # Espera (segundos) antes de tentar de novo uma gravação que falhou,
+    # dobrada a cada falha seguida até o máximo
+    SAVE_RETRY_DELAY = 0.5
+    SAVE_RETRY_MAX_DELAY = 30
+    # Rotação de chave: entradas recriptografadas por vez (com o lock) e
+    # entradas entre dois pontos de controle gravados no disco
+    ROTATION_BATCH = 500
+    ROTATION_CHECKPOINT = 5000
+    # Tentativas de ler um shard substituído por outro processo
+    SHARD_RETRIES = 3
+    
+    def __init__(self, password_file: str, entry_algorithm: str = "aesgcm", async_save: bool = False,
+                 durability: str = DEFAULT_DURABILITY, compression: str = vault_format.DEFAULT_COMPRESSION,
+                 compression_level: int = vault_format.DEFAULT_COMPRESSION_LEVEL,
+                 decrypt_workers: int = 1, decrypt_pool: str = DEFAULT_POOL_KIND, kek: bytes = None):
+        if compression not in vault_format.COMPRESSION:
+            raise ValueError(f"Compressão desconhecida: {compression}")
         self.password_file = password_file
+        self.entry_algorithm = entry_algorithm
+        self.async_save = async_save
+        self.durability = check_durability(durability)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.decrypt_workers = decrypt_workers
+        self.decrypt_pool = decrypt_pool
+        # Chave do usuário (KEK) que protege o arquivo de chave do cofre
+        self.kek = kek
         self.key_file = f"{password_file}.key"
+        self.journal_file = f"{password_file}.journal"
+        self.shard_dir = f"{password_file}.groups"
+        self._lock = threading.RLock()
+        # Trava entre processos: escritas no journal e snapshots são
+        # exclusivos; sempre obtida antes de self._lock
+        self._file_lock = FileLock(f"{password_file}.lock")
+        self._seq = 0
+        self._compaction_thread = None
+        self._transaction = None
+        # Índice reverso website -> grupos que contêm o website
+        self._website_index: Dict[str, Set[str]] = {}
+        # Índice de busca, criado na primeira busca e mantido por _apply
+        self._search_index: Optional[SearchIndex] = None
+        # Grupos ainda não incluídos no índice de busca
+        self._unindexed: Set[str] = set()
+        # Estado do armazenamento em shards (um arquivo por grupo)
+        self._shards: Dict[str, str] = {}
+        self._stored_websites: Dict[str, List[str]] = {}
+        self._pending: Dict[str, List[Dict]] = {}
+        self._dirty: Set[str] = set()
+        # Grupos convertidos só na memória (formato ou algoritmo antigo), sem
+        # registro no journal: gravados no close() se nada os gravar antes
+        self._converted: Set[str] = set()
+        self._obsolete_shards: Set[str] = set()
+        # Persistência: registros ainda não gravados (com os registros que os
+        # desfazem) e último seq durável
+        self._unsaved: List[Dict] = []
+        self._unsaved_undo: List[List[Dict]] = []
+        self._unsaved_event = threading.Event()
+        self._durable_listeners: List[Callable[[int], None]] = []
+        self._error_listeners: List[Callable[[Exception], None]] = []
+        self._change_listeners: List[Callable[[Dict], None]] = []
+        self.durable_seq = 0
+        # O que já foi lido do disco, para perceber alterações de outros processos
+        self._synced_seq = 0
+        self._manifest_stamp = None
+        self._key_stamp = None
+        self._journal_id = None
+        self._journal_offset = 0
+        # Rotação de chave: grupos que ainda podem ter dados da chave antiga
+        self._rotation: Optional[Set[str]] = None
+        self._rotation_thread = None
+        self._search_thread = None
+        self._closing = threading.Event()
         self._load_or_create()
+        self.durable_seq = self._seq
+        if self.async_save:
+            threading.Thread(target=self._writer_loop, name="vault-writer", daemon=True).start()
+        if self._rotation is not None:
+            # Rotação interrompida: continuar de onde parou
+            self._start_rotation()
     
     def _generate_key(self):
         return Fernet.generate_key()
     
     def _load_or_create_key(self):
         if os.path.exists(self.key_file):
-            with open(self.key_file, 'rb') as f:
-                return f.read()
+            self._key_stamp = file_stamp(self.key_file)
+            keys = read_keys(self.key_file, self.kek)
+            if self.kek is not None and not is_wrapped(self.key_file):
+                # Chave antiga em texto claro: passar a guardá-la protegida
+                self._write_keys(keys)
+            return keys
+        else:
+            keys = [self._generate_key()]
+            self._write_keys(keys)
+            return keys
+    
+    def _write_keys(self, keys: List[bytes]) -> None:
+        write_keys(self.key_file, keys, self.durability, (self.kek,) if self.kek is not None else ())
+        self._key_stamp = file_stamp(self.key_file)
+    
+    def _set_keys(self, keys: List[bytes]) -> None:
+        """Encrypt with ``keys[0]`` from now on; the other keys are only read."""
+        self.keys = keys
+        self.fernet = MultiFernet([Fernet(key) for key in keys])
+        self.entry_cipher = EntryCipher(keys[0], self.entry_algorithm, keys[1:])
+        self.container_key, *self._old_container_keys = [vault_format.derive_key(key) for key in keys]
+        if hasattr(self, "decryptor"):
+            self.decryptor.set_keys(keys[0], keys[1:])
+            self.journal.fernet = self.fernet
         else:
-            # Criar o diretório se não existir
-            os.makedirs(os.path.dirname(self.key_file), exist_ok=True)
-            key = self._generate_key()
-            with open(self.key_file, 'wb') as f:
-                f.write(key)
-            return key
+            self.decryptor = DecryptPool(keys[0], self.entry_algorithm, self.decrypt_workers, self.decrypt_pool,
+                                         old_keys=keys[1:])
+            self.journal = Journal(self.journal_file, self.fernet, self.durability)
     
     def _load_or_create(self):
-        key = self._load_or_create_key()
-        self.fernet = Fernet(key)
-        
-        if os.path.exists(self.password_file):
-            with open(self.password_file, 'rb') as f:
-                encrypted_data = f.read()
-                decrypted_data = self.fernet.decrypt(encrypted_data)
-                data = json.loads(decrypted_data)
-                # Migrar formato antigo se necessário
-                if isinstance(data, dict) and not ("groups" in data and "default_group" in data):
-                    self.passwords = {
-                        "groups": {
-                            "Geral": data  # Mover senhas existentes para o grupo Geral
-                        },
-                        "default_group": "Geral"
-                    }
-                    self.save()
-                else:
+        # Criar o diretório se não existir
+        os.makedirs(os.path.dirname(os.path.abspath(self.password_file)), exist_ok=True)
+        # Exclusivo: outro processo pode estar criando ou migrando o mesmo cofre
+        with self._file_lock.hold():
+            self._set_keys(self._load_or_create_key())
+            
+            if os.path.exists(self.password_file):
+                self._manifest_stamp = file_stamp(self.password_file)
+                data, legacy_file = self._read_manifest()
+                legacy = not (isinstance(data, dict) and data.get("format") == "sharded")
+                if legacy:
+                    # Migrar formato antigo (arquivo único) se necessário
+                    if isinstance(data, dict) and not ("groups" in data and "default_group" in data):
+                        data = {
+                            "groups": {
+                                "Geral": data  # Mover senhas existentes para o grupo Geral
+                            },
+                            "default_group": "Geral"
+                        }
+                    self._seq = data.pop("seq", 0)
                     self.passwords = data
+                    self._dirty = set(self.passwords["groups"])
+                    for group_name, entries in self.passwords["groups"].items():
+                        self._upgrade_entries(group_name, entries)
+                    self._rebuild_index()
+                else:
+                    self._load_manifest(data)
+                if len(self.keys) > 1:
+                    # Sem lista no manifesto, a rotação parou antes do primeiro
+                    # ponto de controle: todos os grupos ainda precisam dela
+                    rotation = data.get("rotation")
+                    self._rotation = set(self.passwords["groups"] if rotation is None else rotation)
+                self._replay_journal()
+                if legacy_file:
+                    # Converter o arquivo Fernet/JSON para o contêiner binário
+                    # (e o arquivo único para um shard por grupo)
+                    self.save()
+            else:
+                self.passwords = {
+                    "groups": {
+                        "Geral": {}  # Grupo padrão
+                    },
+                    "default_group": "Geral"
+                }
+                self._dirty = {"Geral"}
+                self._rebuild_index()
+                self.save()
+    
+    def _read_manifest(self):
+        """Read the vault file, returning its data and whether it is a legacy Fernet file."""
+        with open(self.password_file, 'rb') as f:
+            if vault_format.is_container(f.read(len(vault_format.MAGIC))):
+                f.seek(0)
+                records = vault_format.read_records(f, self.container_key, self._old_container_keys)
+                manifest = next(records)
+                manifest["groups"] = {group_name: info for group_name, info in records}
+                return manifest, False
+            f.seek(0)
+            return json.loads(self.fernet.decrypt(f.read())), True
+    
+    def _read_shard(self, group_name: str) -> Dict[str, Dict]:
+        """Decrypt a group's shard, streaming the binary container."""
+        for attempt in range(self.SHARD_RETRIES):
+            try:
+                f = open(self._shard_path(self._shards[group_name]), 'rb')
+            except FileNotFoundError:
+                # Outro processo salvou o cofre e removeu o shard antigo
+                if attempt == self.SHARD_RETRIES - 1:
+                    raise
+                if not self._adopt_shard(group_name):
+                    return {}
+                continue
+            with f:
+                if vault_format.is_container(f.read(len(vault_format.MAGIC))):
+                    f.seek(0)
+                    return {website: entry for website, entry in vault_format.read_records(
+                        f, self.container_key, self._old_container_keys)}
+                # Shard Fernet/JSON antigo: regravar no formato binário
+                f.seek(0)
+                self._dirty.add(group_name)
+                self._converted.add(group_name)
+                return json.loads(self.fernet.decrypt(f.read()))
+    
+    def _adopt_shard(self, group_name: str) -> bool:
+        """Point an unloaded group at the shard another process replaced it with.
+        
+        The new shard already holds every record this process replayed for
+        the group, so its pending records are dropped. The rest of the vault
+        catches up on the next sync. Returns False if the group was deleted.
+        """
+        manifest, _ = self._read_manifest()
+        info = manifest["groups"].get(group_name)
+        if info is None:
+            return False
+        for website in [website for website, groups in self._website_index.items() if group_name in groups]:
+            self._index_remove(website, group_name)
+        for website in info["websites"]:
+            self._index_add(website, group_name)
+        self._shards[group_name] = info["shard"]
+        self._stored_websites[group_name] = info["websites"]
+        self._pending.pop(group_name, None)
+        if self._rotation is not None:
+            self._rotation.add(group_name)
+        return True
+    
+    def _write_records(self, path: str, records, durability: str = None) -> None:
+        with atomic_writer(path, durability or self.durability) as f:
+            vault_format.write_records(f, self.container_key, records,
+                                       self.compression, self.compression_level)
+    
+    def _shard_path(self, shard_id: str) -> str:
+        return os.path.join(self.shard_dir, f"{shard_id}.enc")
+    
+    def _load_manifest(self, manifest: Dict) -> None:
+        """Load the manifest and only the default group's shard."""
+        self._seq = manifest["seq"]
+        self.passwords = {
+            "groups": {group_name: None for group_name in manifest["groups"]},
+            "default_group": manifest["default_group"]
+        }
+        for group_name, info in manifest["groups"].items():
+            self._shards[group_name] = info["shard"]
+            self._stored_websites[group_name] = info["websites"]
+        self._rebuild_index()
+        if self.passwords["default_group"] in self.passwords["groups"]:
+            self._group(self.passwords["default_group"])
+    
+    def _group(self, group_name: str) -> Dict[str, Dict]:
+        """Return a group's entries, decrypting its shard on first access."""
+        with self._lock:
+            entries = self.passwords["groups"][group_name]
+            if entries is None:
+                entries = self._read_shard(group_name)
+                self._upgrade_entries(group_name, entries)
+                self.passwords["groups"][group_name] = entries
+                self._stored_websites.pop(group_name, None)
+                # Registros do journal que chegaram antes do shard ser carregado
+                # (os ouvintes já foram avisados quando eles foram aplicados)
+                for record in self._pending.pop(group_name, []):
+                    self._apply(record, notify=False)
+            return entries
+    
+    def _upgrade_entries(self, group_name: str, entries: Dict[str, Dict]) -> None:
+        """Re-encrypt passwords written with another per-entry algorithm."""
+        for website, entry in entries.items():
+            if self.entry_cipher.needs_upgrade(entry["password"]):
+                # Substituir, nunca alterar: um snapshot pode estar lendo a entrada
+                entries[website] = dict(entry, password=self.entry_cipher.upgrade(entry["password"]))
+                self._dirty.add(group_name)
+                self._converted.add(group_name)
+    
+    def _group_websites(self, group_name: str):
+        entries = self.passwords["groups"][group_name]
+        if entries is None:
+            return self._stored_websites.get(group_name, [])
+        return entries.keys()
+    
+    def save(self):
+        """Write every dirty shard plus the manifest and empty the journal."""
+        self.wait_for_compaction()
+        with self._file_lock.hold():
+            with self._lock:
+                # Gravar e sincronizar antes: o snapshot inclui o que outros
+                # processos escreveram e nenhum registro fica só na memória
+                self._write_unsaved()
+                snapshot = self._prepare_snapshot()
+                self._write_snapshot(snapshot)
+                self._finish_snapshot(snapshot)
+        self._mark_durable(snapshot["seq"])
+    
+    def _prepare_snapshot(self) -> Dict:
+        """Serialize the dirty shards and the manifest; must hold the lock."""
+        for group_name in list(self._pending):
+            self._group(group_name)
+        shards = {}
+        for group_name in self._dirty:
+            # Cada escrita usa um novo arquivo: o manifesto antigo continua
+            # apontando para shards íntegros até ser substituído
+            if group_name in self._shards:
+                self._obsolete_shards.add(self._shards[group_name])
+            self._shards[group_name] = uuid.uuid4().hex
+            # Cópia rasa: as entradas são substituídas, nunca alteradas, então
+            # a serialização pode acontecer fora do lock
+            shards[self._shards[group_name]] = list(self.passwords["groups"][group_name].items())
+        self._dirty = set()
+        self._converted = set()
+        manifest = [{
+            "format": "sharded",
+            "seq": self._seq,
+            "default_group": self.passwords["default_group"]
+        }]
+        if self._rotation is not None:
+            manifest[0]["rotation"] = sorted(self._rotation)
+        for group_name in self.passwords["groups"]:
+            manifest.append([group_name, {
+                "shard": self._shards[group_name],
+                "websites": list(self._group_websites(group_name))
+            }])
+        obsolete, self._obsolete_shards = self._obsolete_shards, set()
+        return {
+            "seq": self._seq,
+            "offset": self.journal.size(),
+            "shards": shards,
+            "manifest": manifest,
+            "obsolete": obsolete
+        }
+    
+    def _write_snapshot(self, snapshot: Dict) -> None:
+        os.makedirs(self.shard_dir, exist_ok=True)
+        # Os shards precisam estar no disco antes do manifesto que aponta para eles
+        shard_durability = "none" if self.durability == "none" else "batched"
+        for shard_id, entries in snapshot["shards"].items():
+            self._write_records(self._shard_path(shard_id), entries, shard_durability)
+        if self.durability == "always" and snapshot["shards"]:
+            fsync_directory(self.shard_dir)
+        self._write_records(self.password_file, snapshot["manifest"])
+        for shard_id in snapshot["obsolete"]:
+            try:
+                os.remove(self._shard_path(shard_id))
+            except FileNotFoundError:
+                pass
+    
+    def _finish_snapshot(self, snapshot: Dict) -> None:
+        """Drop the journal prefix folded into ``snapshot``; must hold both locks."""
+        self.journal.discard_prefix(snapshot["offset"])
+        self._manifest_stamp = file_stamp(self.password_file)
+        self._journal_id = self.journal.identity()
+        self._journal_offset = self.journal.size()
+    
+    def _replay_journal(self) -> None:
+        """Apply the journal records that are newer than the snapshot."""
+        self._journal_id = self.journal.identity()
+        records, self._journal_offset = self.journal.read_from(0)
+        if self.journal.size() > self._journal_offset:
+            # Escrita interrompida no fim (o cofre é aberto com a trava exclusiva)
+            self.journal.truncate(self._journal_offset)
+        for record in records:
+            if record["seq"] <= self._seq:
+                continue
+            self._apply(record)
+            self._seq = record["seq"]
+        self._synced_seq = self._seq
+        self._maybe_compact()
+    
+    def _commit(self, record: Dict) -> None:
+        """Apply a mutation in memory and append it to the journal."""
+        with self._lock:
+            # O inverso desfaz o registro num rollback ou quando registros de
+            # outro processo precisam entrar antes dele
+            undo = self._inverse(record)
+            self._seq += 1
+            record["seq"] = self._seq
+            self._apply(record)
+            if self._transaction is not None:
+                self._transaction["records"].append(record)
+                self._transaction["undo"].append(undo)
+                return
+        self._persist([record], [undo])
+    
+    @contextmanager
+    def transaction(self):
+        """Group mutations so they are persisted together with a single write.
+        
+        Mutations inside the block are validated and applied in memory as
+        usual, but only reach the journal when the block exits cleanly. If it
+        raises, every mutation made inside it is rolled back. Nested blocks
+        join the outermost transaction.
+        """
+        with self._lock:
+            if self._transaction is not None:
+                yield self
+                return
+            self._transaction = {"records": [], "undo": [], "seq": self._seq}
+            try:
+                yield self
+            except BaseException:
+                transaction, self._transaction = self._transaction, None
+                for undo in reversed(transaction["undo"]):
+                    for record in undo:
+                        self._apply(record)
+                self._seq = transaction["seq"]
+                raise
+            transaction, self._transaction = self._transaction, None
+        self._persist(transaction["records"], transaction["undo"])
+    
+    def _persist(self, records: List[Dict], undo: List[List[Dict]]) -> None:
+        """Write committed records now, or hand them to the writer thread."""
+        if not records:
+            return
+        with self._lock:
+            self._unsaved.extend(records)
+            self._unsaved_undo.extend(undo)
+        if self.async_save:
+            self._unsaved_event.set()
         else:
-            # Criar o diretório se não existir
-            os.makedirs(os.path.dirname(self.password_file), exist_ok=True)
-            self.passwords = {
-                "groups": {
-                    "Geral": {}  # Grupo padrão
-                },
-                "default_group": "Geral"
-            }
+            self._write_unsaved()
+    
+    def _writer_loop(self) -> None:
+        delay = self.SAVE_RETRY_DELAY
+        while True:
+            self._unsaved_event.wait()
+            # Agrupar as alterações feitas em sequência numa única escrita
+            time.sleep(self.SAVE_DEBOUNCE)
+            self._unsaved_event.clear()
+            try:
+                self._write_unsaved()
+            except Exception as e:
+                # Os registros continuam pendentes: avisar e tentar de novo
+                # mais tarde (close() também tenta, e propaga o erro)
+                for callback in list(self._error_listeners):
+                    callback(e)
+                if not self._closing.wait(delay):
+                    self._unsaved_event.set()
+                delay = min(delay * 2, self.SAVE_RETRY_MAX_DELAY)
+            else:
+                delay = self.SAVE_RETRY_DELAY
+    
+    def _write_unsaved(self) -> None:
+        """Append every committed but unsaved record to the journal."""
+        with self._file_lock.hold():
+            with self._lock:
+                # Os registros de outros processos entram antes dos nossos
+                self._sync()
+                records, self._unsaved = self._unsaved, []
+                undo, self._unsaved_undo = self._unsaved_undo, []
+            if not records:
+                return
+            try:
+                line = self.journal.encode(records)
+                with self._lock:
+                    if self.journal.size() > self._journal_offset:
+                        # Depois da sincronização, o que passa do offset é uma
+                        # escrita interrompida: anexar depois dela perderia a linha
+                        self.journal.truncate(self._journal_offset)
+                    self.journal.write(line)
+                    # Com a trava, ninguém mais escreveu depois da sincronização
+                    self._journal_id = self.journal.identity()
+                    self._journal_offset += len(line)
+                    self._synced_seq = records[-1]["seq"]
+            except BaseException:
+                with self._lock:
+                    self._unsaved[:0] = records
+                    self._unsaved_undo[:0] = undo
+                raise
+        self._mark_durable(records[-1]["seq"])
+        self._maybe_compact()
+    
+    def refresh(self, blocking: bool = True) -> bool:
+        """Pick up the changes other processes saved to the same vault.
+        
+        Cheap when nothing changed: a few ``stat`` calls. Otherwise only the
+        journal records appended since the last sync are read and, after
+        another process saved a snapshot, only the groups whose shard was
+        rewritten; listeners are notified as for local changes. With
+        ``blocking=False`` it returns False instead of waiting while another
+        process holds the vault.
+        """
+        with self._file_lock.hold(shared=True, blocking=blocking) as acquired:
+            if not acquired:
+                return False
+            with self._lock:
+                self._sync()
+        return True
+    
+    def _sync(self) -> None:
+        """Catch up with what other processes wrote; must hold both locks.
+        
+        Records committed here but not written yet are undone first and
+        reapplied on top (those that no longer apply are dropped), so this
+        process ends up with the same state as one replaying the journal.
+        """
+        key_stamp = file_stamp(self.key_file)
+        manifest_stamp = file_stamp(self.password_file)
+        journal_id = self.journal.identity()
+        if journal_id != self._journal_id:
+            # Journal compactado por outro processo: reler o arquivo novo
+            self._journal_id, self._journal_offset = journal_id, 0
+        keys_changed = key_stamp != self._key_stamp
+        if (not keys_changed and manifest_stamp == self._manifest_stamp
+                and self.journal.size() <= self._journal_offset):
+            return
+        local, local_undo = self._unsaved, self._unsaved_undo
+        for undo in reversed(local_undo):
+            for record in undo:
+                self._apply(record)
+        self._seq = self._synced_seq
+        if keys_changed:
+            # Rotação feita por outro processo; as chaves que ela descartou
+            # continuam aqui só para ler o que ainda está na memória
+            self._key_stamp = key_stamp
+            keys = read_keys(self.key_file, self.kek)
+            self._set_keys(keys + [key for key in self.keys if key not in keys])
+        if manifest_stamp != self._manifest_stamp:
+            self._manifest_stamp = manifest_stamp
+            manifest, _ = self._read_manifest()
+            self._reload_manifest(manifest)
+        records, self._journal_offset = self.journal.read_from(self._journal_offset)
+        for record in records:
+            if record["seq"] > self._seq:
+                self._apply(record)
+                self._seq = record["seq"]
+        self._synced_seq = self._seq
+        self._unsaved, self._unsaved_undo = [], []
+        for record in local:
+            if not self._applicable(record):
+                continue
+            if keys_changed and record["op"] == "set_entry":
+                record["entry"] = dict(record["entry"], password=self.entry_cipher.rotate(record["entry"]["password"]))
+            self._unsaved_undo.append(self._inverse(record))
+            self._seq += 1
+            record["seq"] = self._seq
+            self._apply(record)
+            self._unsaved.append(record)
+    
+    def _applicable(self, record: Dict) -> bool:
+        """Whether a local record still applies after other processes' changes."""
+        groups = self.passwords["groups"]
+        op = record["op"]
+        if op == "create_group":
+            return record["group"] not in groups
+        if op == "move_entry":
+            return (record["from_group"] in self._website_index.get(record["website"], ())
+                    and record["to_group"] in groups)
+        return record["group"] in groups
+    
+    def _reload_manifest(self, manifest: Dict) -> None:
+        """Adopt a snapshot saved by another process, rereading only changed shards.
+        
+        A group whose shard id did not change holds exactly what this process
+        has in memory. Loaded groups that changed are read again right away,
+        updated in place and diffed so listeners see entry-level changes; the
+        others just point at their new shard.
+        """
+        groups = self.passwords["groups"]
+        infos = manifest["groups"]
+        for group_name in [group_name for group_name in groups if group_name not in infos]:
+            for website in list(self._group_websites(group_name)):
+                self._index_remove(website, group_name)
+            del groups[group_name]
+            self._forget_shard(group_name)
+            if self._search_index is not None:
+                self._search_index.remove_group(group_name)
+            self._notify({"type": "group_deleted", "group": group_name})
+        for group_name, info in infos.items():
+            if self._shards.get(group_name) == info["shard"] and group_name in groups:
+                continue
+            created = group_name not in groups
+            previous = groups.get(group_name)
+            if not created:
+                for website in list(self._group_websites(group_name)):
+                    self._index_remove(website, group_name)
+            self._forget_shard(group_name)
+            groups[group_name] = None
+            self._shards[group_name] = info["shard"]
+            self._stored_websites[group_name] = info["websites"]
+            for website in info["websites"]:
+                self._index_add(website, group_name)
+            if self._rotation is not None:
+                self._rotation.add(group_name)
+            if created:
+                self._notify({"type": "group_created", "group": group_name})
+            if previous is None and self._search_index is None:
+                continue
+            entries = self._group(group_name)
+            if self._search_index is not None:
+                self._search_index.remove_group(group_name)
+                for website, entry in entries.items():
+                    self._search_index.add(group_name, website, entry["username"])
+            if previous is None:
+                continue
+            changes = [{"type": "entry_removed", "group": group_name, "website": website}
+                       for website in previous.keys() - entries.keys()]
+            for website, entry in entries.items():
+                if website not in previous:
+                    changes.append({"type": "entry_added", "group": group_name, "website": website})
+                elif previous[website] != entry:
+                    changes.append({"type": "entry_updated", "group": group_name, "website": website})
+            # Os ouvintes podem guardar o dicionário do grupo (get_entries):
+            # atualizá-lo no lugar em vez de trocá-lo pelo que foi lido
+            previous.clear()
+            previous.update(entries)
+            groups[group_name] = previous
+            for change in changes:
+                self._notify(change)
+        # Manter a ordem dos grupos do outro processo
+        self.passwords["groups"] = {group_name: groups[group_name] for group_name in infos}
+        # Shards que o manifesto novo ainda usa não podem ser apagados
+        self._obsolete_shards -= {info["shard"] for info in infos.values()}
+        if manifest["default_group"] != self.passwords["default_group"]:
+            self.passwords["default_group"] = manifest["default_group"]
+            self._notify({"type": "default_group_changed", "group": manifest["default_group"]})
+        self._seq = self._synced_seq = manifest["seq"]
+    
+    def _forget_shard(self, group_name: str) -> None:
+        self._shards.pop(group_name, None)
+        self._stored_websites.pop(group_name, None)
+        self._pending.pop(group_name, None)
+        self._dirty.discard(group_name)
+        self._converted.discard(group_name)
+        if self._rotation is not None:
+            self._rotation.discard(group_name)
+    
+    def flush(self) -> None:
+        """Block until every committed mutation is on disk."""
+        self._write_unsaved()
+        self.journal.sync()
+    
+    def add_durable_listener(self, callback: Callable[[int], None]) -> None:
+        """Call ``callback(seq)`` whenever mutations up to ``seq`` become durable.
+        
+        In asynchronous mode the callback runs on the writer thread.
+        """
+        self._durable_listeners.append(callback)
+    
+    def add_error_listener(self, callback: Callable[[Exception], None]) -> None:
+        """Call ``callback(error)`` whenever a background save fails.
+        
+        The failed mutations stay pending and are written again later, with
+        a growing delay between attempts. The callback runs on the writer
+        thread.
+        """
+        self._error_listeners.append(callback)
+    
+    def _mark_durable(self, seq: int) -> None:
+        if seq <= self.durable_seq:
+            return
+        self.durable_seq = seq
+        for callback in list(self._durable_listeners):
+            callback(seq)
+    
+    def add_change_listener(self, callback: Callable[[Dict], None]) -> None:
+        """Call ``callback(change)`` for every change applied to the vault.
+        
+        ``change["type"]`` is one of ``group_created``, ``group_deleted``,
+        ``entry_added``, ``entry_updated``, ``entry_removed``, ``entry_moved``
+        or ``default_group_changed``; the other keys name the affected
+        ``group`` and ``website`` (``from_group``/``to_group`` for moves).
+        Rolled back transactions notify the inverse changes. The callback runs
+        on the thread that made the change, with the vault lock held.
+        """
+        self._change_listeners.append(callback)
+    
+    def _notify(self, change: Dict) -> None:
+        for callback in list(self._change_listeners):
+            callback(change)
+    
+    def _inverse(self, record: Dict) -> List[Dict]:
+        """Build the records that undo ``record`` against the current state."""
+        op = record["op"]
+        if op == "create_group":
+            return [{"op": "delete_group", "group": record["group"]}]
+        if op == "delete_group":
+            return [{"op": "create_group", "group": record["group"],
+                     "entries": self._group(record["group"])}]
+        if op in ("set_entry", "delete_entry"):
+            previous = self._group(record["group"]).get(record["website"])
+            if previous is None:
+                return [{"op": "delete_entry", "group": record["group"], "website": record["website"]}]
+            return [{"op": "set_entry", "group": record["group"], "website": record["website"],
+                     "entry": previous}]
+        if op == "move_entry":
+            undo = [{"op": "move_entry", "website": record["website"],
+                     "from_group": record["to_group"], "to_group": record["from_group"]}]
+            replaced = self._group(record["to_group"]).get(record["website"])
+            if replaced is not None and record["to_group"] != record["from_group"]:
+                undo.append({"op": "set_entry", "group": record["to_group"],
+                             "website": record["website"], "entry": replaced})
+            return undo
+        if op == "set_default_group":
+            return [{"op": "set_default_group", "group": self.passwords["default_group"]}]
+        raise ValueError(f"Operação desconhecida no journal: {op}")
+    
+    def _rebuild_index(self) -> None:
+        """Build the website -> groups index from the loaded vault."""
+        self._website_index = {}
+        for group_name in self.passwords["groups"]:
+            for website in self._group_websites(group_name):
+                self._index_add(website, group_name)
+    
+    def _index_add(self, website: str, group: str) -> None:
+        self._website_index.setdefault(website, set()).add(group)
+    
+    def _index_remove(self, website: str, group: str) -> None:
+        groups = self._website_index.get(website)
+        if groups is not None:
+            groups.discard(group)
+            if not groups:
+                del self._website_index[website]
+    
+    def _find_group(self, website: str) -> Optional[str]:
+        """Return the group holding ``website`` when no group was given."""
+        groups = self._website_index.get(website)
+        if not groups:
+            return None
+        if len(groups) == 1:
+            return next(iter(groups))
+        # Website em vários grupos: manter a ordem dos grupos como desempate
+        for group_name in self.passwords["groups"]:
+            if group_name in groups:
+                return group_name
+        return None
+    
+    def _apply(self, record: Dict, notify: bool = True) -> None:
+        """Apply a single mutation record to the in-memory vault."""
+        groups = self.passwords["groups"]
+        op = record["op"]
+        if op == "create_group":
+            groups[record["group"]] = dict(record.get("entries", {}))
+            self._dirty.add(record["group"])
+            if self._rotation is not None and record.get("entries"):
+                # Grupo restaurado por um rollback: pode trazer a chave antiga
+                self._rotation.add(record["group"])
+            for website, entry in groups[record["group"]].items():
+                self._index_add(website, record["group"])
+                if self._search_index is not None:
+                    self._search_index.add(record["group"], website, entry["username"])
+            change = {"type": "group_created", "group": record["group"]}
+        elif op == "delete_group":
+            if record["group"] not in groups:
+                return
+            for website in self._group(record["group"]):
+                self._index_remove(website, record["group"])
+            del groups[record["group"]]
+            self._dirty.discard(record["group"])
+            if record["group"] in self._shards:
+                self._obsolete_shards.add(self._shards.pop(record["group"]))
+            if self._search_index is not None:
+                self._search_index.remove_group(record["group"])
+            if self._rotation is not None:
+                self._rotation.discard(record["group"])
+            change = {"type": "group_deleted", "group": record["group"]}
+        elif op in ("set_entry", "delete_entry"):
+            group = record["group"]
+            # O índice também cobre os grupos ainda não carregados
+            existed = group in self._website_index.get(record["website"], ())
+            if groups[group] is None:
+                # Shard ainda não carregado: aplicar quando for acessado
+                self._pending.setdefault(group, []).append(record)
+            elif op == "set_entry":
+                groups[group][record["website"]] = record["entry"]
+            else:
+                groups[group].pop(record["website"], None)
+            self._dirty.add(group)
+            if op == "set_entry":
+                self._index_add(record["website"], group)
+                if self._search_index is not None:
+                    self._search_index.add(group, record["website"], record["entry"]["username"])
+                change_type = "entry_updated" if existed else "entry_added"
+            else:
+                self._index_remove(record["website"], group)
+                if self._search_index is not None:
+                    self._search_index.remove(group, record["website"])
+                if not existed:
+                    return
+                change_type = "entry_removed"
+            change = {"type": change_type, "group": group, "website": record["website"]}
+        elif op == "move_entry":
+            entry = self._group(record["from_group"]).pop(record["website"])
+            self._group(record["to_group"])[record["website"]] = entry
+            self._dirty.update((record["from_group"], record["to_group"]))
+            if self._rotation is not None and record["from_group"] in self._rotation:
+                self._rotation.add(record["to_group"])
+            self._index_remove(record["website"], record["from_group"])
+            self._index_add(record["website"], record["to_group"])
+            if self._search_index is not None:
+                self._search_index.remove(record["from_group"], record["website"])
+                self._search_index.add(record["to_group"], record["website"], entry["username"])
+            change = {"type": "entry_moved", "website": record["website"],
+                      "from_group": record["from_group"], "to_group": record["to_group"]}
+        elif op == "set_default_group":
+            self.passwords["default_group"] = record["group"]
+            change = {"type": "default_group_changed", "group": record["group"]}
+        else:
+            raise ValueError(f"Operação desconhecida no journal: {op}")
+        if notify:
+            self._notify(change)
+    
+    def _maybe_compact(self) -> None:
+        """Fold the journal into the snapshot in the background once it grows too large."""
+        if self.journal.size() < self.JOURNAL_COMPACT_THRESHOLD:
+            return
+        with self._lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(target=self._compact, name="journal-compaction")
+            self._compaction_thread.start()
+    
+    def close(self) -> None:
+        """Flush pending writes and wait for background compaction.
+        
+        A key rotation in progress is checkpointed and stopped; it resumes
+        the next time the vault is opened. Groups converted from an older
+        format or algorithm when loaded are written back to their shards.
+        """
+        self._closing.set()
+        for thread in (self._rotation_thread, self._search_thread):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join()
+        self.flush()
+        self.wait_for_compaction()
+        with self._lock:
+            converted = bool(self._converted)
+        if converted:
+            # Sem isso, cada abertura decriptaria e converteria os mesmos
+            # grupos de novo até a próxima compactação
             self.save()
+        self.decryptor.close()
     
-    def save(self):
-        encrypted_data = self.fernet.encrypt(json.dumps(self.passwords).encode())
-        with open(self.password_file, 'wb') as f:
-            f.write(encrypted_data)
+    def rotate_key(self) -> None:
+        """Replace the vault key, re-encrypting the vault in the background.
+        
+        The new key encrypts everything written from now on, while the old
+        one is kept in the key file to read what was not converted yet.
+        Groups are re-encrypted a batch at a time on another thread, with
+        the remaining groups saved in the manifest at every checkpoint, so an
+        interrupted rotation continues when the vault is opened again. The
+        old key is dropped once no shard or journal record depends on it.
+        """
+        with self._file_lock.hold(), self._lock:
+            if self._rotation is not None:
+                raise ValueError("Já existe uma rotação de chave em andamento")
+            # Partir das chaves atuais do arquivo, que outro processo pode ter trocado
+            self._sync()
+            keys = [self._generate_key()] + self.keys
+            # A nova chave precisa estar no disco antes de qualquer dado criptografado com ela
+            self._write_keys(keys)
+            self._set_keys(keys)
+            self._rotation = set(self.passwords["groups"])
+        self._start_rotation()
+    
+    @property
+    def rotating(self) -> bool:
+        """Whether a key rotation is in progress."""
+        return self._rotation is not None
+    
+    def wait_for_rotation(self) -> None:
+        """Block until the key rotation running in the background has finished."""
+        thread = self._rotation_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+    
+    def _start_rotation(self) -> None:
+        self._rotation_thread = threading.Thread(target=self._run_rotation, name="key-rotation", daemon=True)
+        self._rotation_thread.start()
+    
+    def _run_rotation(self) -> None:
+        rotated = 0
+        while not self._closing.is_set():
+            with self._lock:
+                group_name = min(self._rotation) if self._rotation else None
+            if group_name is None:
+                # Tudo convertido: gravar os shards e esvaziar o journal
+                # antes de descartar as chaves antigas
+                self.save()
+                with self._file_lock.hold(), self._lock:
+                    if self._rotation:
+                        continue  # Uma entrada antiga foi movida no meio tempo
+                    self._write_keys(self.keys[:1])
+                    self._set_keys(self.keys[:1])
+                    self._rotation = None
+                self.save()
+                return
+            rotated += self._rotate_group(group_name)
+            if rotated >= self.ROTATION_CHECKPOINT:
+                self.save()
+                rotated = 0
+        # Fechando: guardar o progresso para continuar na próxima abertura
+        self.save()
+    
+    def _rotate_group(self, group_name: str) -> int:
+        """Re-encrypt one group a batch at a time; returns how many entries were visited."""
+        done: Set[str] = set()
+        while not self._closing.is_set():
+            with self._lock:
+                if group_name not in self.passwords["groups"]:
+                    self._rotation.discard(group_name)
+                    break
+                entries = self._group(group_name)
+                # Entradas incluídas durante a rotação entram no fim da ordem
+                batch = list(islice((website for website in entries if website not in done), self.ROTATION_BATCH))
+                for website in batch:
+                    entry = entries[website]
+                    token = self.entry_cipher.rotate(entry["password"])
+                    if token != entry["password"]:
+                        # Substituir, nunca alterar: um snapshot pode estar lendo a entrada
+                        entries[website] = dict(entry, password=token)
+                done.update(batch)
+                # O shard também precisa ser regravado com a nova chave
+                self._dirty.add(group_name)
+                if len(batch) < self.ROTATION_BATCH:
+                    self._rotation.discard(group_name)
+                    break
+        return len(done)
+    
+    def wait_for_compaction(self) -> None:
+        """Block until a running background compaction has finished."""
+        thread = self._compaction_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+    
+    def _compact(self) -> None:
+        with self._file_lock.hold():
+            with self._lock:
+                self._write_unsaved()
+                snapshot = self._prepare_snapshot()
+            # A criptografia e a escrita dos shards acontecem fora do lock
+            # (mas com a trava de arquivo: ninguém escreve no journal até o fim)
+            self._write_snapshot(snapshot)
+            with self._lock:
+                self._finish_snapshot(snapshot)
+        self._mark_durable(snapshot["seq"])
     
     def create_group(self, group_name: str) -> None:
         """Create a new password group."""
         if group_name in self.passwords["groups"]:
             raise ValueError(f"Grupo {group_name} já existe")
         
-        self.passwords["groups"][group_name] = {}
-        self.save()
+        self._commit({"op": "create_group", "group": group_name})
     
     def delete_group(self, group_name: str) -> bool:
         """Delete a password group."""
@@ -75,8 +963,7 @@ class PasswordManager:
             raise ValueError("Não é possível excluir o grupo Geral")
         
         if group_name in self.passwords["groups"]:
-            del self.passwords["groups"][group_name]
-            self.save()
+            self._commit({"op": "delete_group", "group": group_name})
             return True
         return False
     
@@ -92,40 +979,50 @@ class PasswordManager:
         if group not in self.passwords["groups"]:
             raise ValueError(f"Grupo {group} não existe")
         
-        if website in self.passwords["groups"][group]:
+        if group in self._website_index.get(website, ()):
             raise ValueError(f"Entrada para {website} já existe no grupo {group}")
             
-        self.passwords["groups"][group][website] = {
-            "username": username,
-            "password": self.fernet.encrypt(password.encode()).decode(),
-            "last_modified": datetime.now().timestamp()
-        }
-        self.save()
+        self._commit({
+            "op": "set_entry",
+            "group": group,
+            "website": website,
+            "entry": {
+                "username": username,
+                "password": self.entry_cipher.encrypt(password),
+                "last_modified": datetime.now().timestamp()
+            }
+        })
+    
+    def put_entry(self, website: str, entry: Dict, group: str) -> None:
+        """Store an entry exactly as given, its password already encrypted.
+        
+        For entries that come from another copy of this vault (sync): the
+        group is created if missing and an existing entry is replaced.
+        """
+        with self.transaction():
+            if group not in self.passwords["groups"]:
+                self._commit({"op": "create_group", "group": group})
+            self._commit({"op": "set_entry", "group": group, "website": website, "entry": entry})
+    
+    def has_entry(self, website: str, group: str) -> bool:
+        """Whether ``group`` holds ``website``, without loading or decrypting it."""
+        return group in self._website_index.get(website, ())
     
     def get_entry(self, website: str, group: str = None) -> Optional[Dict[str, str]]:
         """Get a password entry."""
         if group is None:
-            # Procurar em todos os grupos
-            for group_name, entries in self.passwords["groups"].items():
-                if website in entries:
-                    entry = entries[website].copy()
-                    entry["password"] = self.fernet.decrypt(
-                        entry["password"].encode()
-                    ).decode()
-                    entry["group"] = group_name
-                    return entry
-            return None
+            group = self._find_group(website)
+            if group is None:
+                return None
         
         if group not in self.passwords["groups"]:
             raise ValueError(f"Grupo {group} não existe")
             
-        if website not in self.passwords["groups"][group]:
+        if group not in self._website_index.get(website, ()):
             return None
             
-        entry = self.passwords["groups"][group][website].copy()
-        entry["password"] = self.fernet.decrypt(
-            entry["password"].encode()
-        ).decode()
+        entry = self._group(group)[website].copy()
+        entry["password"] = self.entry_cipher.decrypt(entry["password"])
         entry["group"] = group
         return entry
     
@@ -136,51 +1033,155 @@ class PasswordManager:
             raise ValueError(f"Entrada para {website} não encontrada")
         return entry["password"]
     
+    def get_entries(self, group: str) -> Dict[str, Dict[str, str]]:
+        """Get the password entries of a single group."""
+        if group not in self.passwords["groups"]:
+            raise ValueError(f"Grupo {group} não existe")
+        return self._group(group)
+    
+    def list_websites(self, group: str) -> List[str]:
+        """List the websites of a group, safe while another thread edits it."""
+        with self._lock:
+            return list(self.get_entries(group))
+    
     def get_all_entries(self) -> Dict[str, Dict[str, Dict[str, str]]]:
         """Get all password entries organized by groups."""
+        for group_name in self.list_groups():
+            self._group(group_name)
         return self.passwords["groups"]
     
+    def decrypt_many(self, tokens: Iterable[str]) -> List[str]:
+        """Decrypt stored password tokens in bulk, keeping their order."""
+        return self.decryptor.decrypt_many(tokens)
+    
+    def iter_decrypted(self, groups: Iterable[str] = None) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+        """Yield ``(group, website, entry)`` with the password decrypted.
+        
+        Covers ``groups`` (every group by default) in order. Passwords are
+        decrypted across the ``decrypt_workers`` pool and streamed back as
+        they are ready, so exports and audits never hold the whole vault in
+        plaintext. Each group is copied under the lock when reached; a group
+        deleted in the meantime is skipped.
+        """
+        def snapshot():
+            for group_name in (self.list_groups() if groups is None else groups):
+                with self._lock:
+                    if group_name not in self.passwords["groups"]:
+                        continue
+                    items = [(website, entry.copy()) for website, entry in self._group(group_name).items()]
+                for website, entry in items:
+                    yield group_name, website, entry
+        
+        entries, tokens = tee(snapshot())
+        passwords = self.decryptor.imap(entry["password"] for _, _, entry in tokens)
+        for (group_name, website, entry), password in zip(entries, passwords):
+            entry["password"] = password
+            yield group_name, website, entry
+    
+    def _ensure_search_index(self) -> SearchIndex:
+        """Build the search index on first use by loading every group."""
+        with self._lock:
+            while self._index_next_group():
+                pass
+            return self._search_index
+    
+    def _index_next_group(self) -> bool:
+        """Add one more group to the search index; False once every group is in it."""
+        with self._lock:
+            if self._search_index is None:
+                # A partir daqui cada mutação já atualiza o índice, mesmo
+                # nos grupos que ainda não foram incluídos
+                self._search_index = SearchIndex()
+                self._unindexed = set(self.list_groups())
+            if not self._unindexed:
+                return False
+            group_name = self._unindexed.pop()
+            if group_name in self.passwords["groups"]:
+                for website, entry in self._group(group_name).items():
+                    self._search_index.add(group_name, website, entry["username"])
+            return True
+    
+    def build_search_index_async(self) -> Future:
+        """Build the search index on another thread; returns a Future.
+        
+        The lock is taken one group at a time, so the vault stays usable
+        while the index is built. A search made before the Future is done
+        indexes the remaining groups itself.
+        """
+        future = Future()
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                while not self._closing.is_set() and self._index_next_group():
+                    pass
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+        
+        self._search_thread = threading.Thread(target=run, name="search-index", daemon=True)
+        self._search_thread.start()
+        return future
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Find entries in any group by website, username or group name.
+        
+        Returns ``(group, website)`` pairs matching every word of ``query``.
+        The first search loads every group to build the index, unless
+        ``build_search_index_async`` already did; after that it is kept up
+        to date by each mutation.
+        """
+        with self._lock:
+            return self._ensure_search_index().search(query, limit)
+    
+    def find_entries(self, query: str, limit: int = 10) -> List[Tuple[str, str, float]]:
+        """Find websites close to ``query``, tolerating typos.
+        
+        Returns up to ``limit`` ``(group, website, score)`` tuples, best
+        first, with scores in (0, 1]. "gmial" finds "gmail.com" and
+        "github.co" finds "github.com".
+        """
+        with self._lock:
+            return self._ensure_search_index().fuzzy(query, limit)
+    
     def update_entry(self, website: str, username: str, password: str, group: str = None) -> None:
         """Update an existing password entry."""
         if group is None:
-            # Procurar em todos os grupos
-            for group_name, entries in self.passwords["groups"].items():
-                if website in entries:
-                    group = group_name
-                    break
+            group = self._find_group(website)
             if group is None:
                 raise ValueError(f"Entrada para {website} não encontrada")
         
         if group not in self.passwords["groups"]:
             raise ValueError(f"Grupo {group} não existe")
             
-        if website not in self.passwords["groups"][group]:
+        if group not in self._website_index.get(website, ()):
             raise ValueError(f"Entrada para {website} não encontrada no grupo {group}")
             
-        self.passwords["groups"][group][website] = {
-            "username": username,
-            "password": self.fernet.encrypt(password.encode()).decode(),
-            "last_modified": datetime.now().timestamp()
-        }
-        self.save()
+        self._commit({
+            "op": "set_entry",
+            "group": group,
+            "website": website,
+            "entry": {
+                "username": username,
+                "password": self.entry_cipher.encrypt(password),
+                "last_modified": datetime.now().timestamp()
+            }
+        })
     
     def delete_entry(self, website: str, group: str = None) -> bool:
         """Delete a password entry."""
         if group is None:
-            # Procurar em todos os grupos
-            for group_name, entries in self.passwords["groups"].items():
-                if website in entries:
-                    del self.passwords["groups"][group_name][website]
-                    self.save()
-                    return True
-            return False
+            group = self._find_group(website)
+            if group is None:
+                return False
         
         if group not in self.passwords["groups"]:
             return False
             
-        if website in self.passwords["groups"][group]:
-            del self.passwords["groups"][group][website]
-            self.save()
+        if group in self._website_index.get(website, ()):
+            self._commit({"op": "delete_entry", "group": group, "website": website})
             return True
         return False
     
@@ -189,23 +1190,83 @@ class PasswordManager:
         if from_group not in self.passwords["groups"] or to_group not in self.passwords["groups"]:
             return False
             
-        if website not in self.passwords["groups"][from_group]:
+        if from_group not in self._website_index.get(website, ()):
             return False
             
-        entry = self.passwords["groups"][from_group][website]
-        self.passwords["groups"][to_group][website] = entry
-        del self.passwords["groups"][from_group][website]
-        self.save()
+        self._commit({
+            "op": "move_entry",
+            "website": website,
+            "from_group": from_group,
+            "to_group": to_group
+        })
         return True
     
+    def delete_entries(self, websites: List[str], group: str) -> int:
+        """Delete several entries of a group in a single transaction."""
+        deleted = 0
+        with self.transaction():
+            for website in websites:
+                if self.delete_entry(website, group):
+                    deleted += 1
+        return deleted
+    
+    def move_entries(self, websites: List[str], from_group: str, to_group: str) -> int:
+        """Move several entries between groups in a single transaction."""
+        moved = 0
+        with self.transaction():
+            for website in websites:
+                if self.move_entry(website, from_group, to_group):
+                    moved += 1
+        return moved
+    
     def set_default_group(self, group: str) -> bool:
         """Set the default group for new entries."""
         if group not in self.passwords["groups"]:
             return False
-        self.passwords["default_group"] = group
-        self.save()
+        self._commit({"op": "set_default_group", "group": group})
         return True
     
     def get_default_group(self) -> str:
         """Get the default group name."""
-        return self.passwords["default_group"] 
\ No newline at end of file
+        return self.passwords["default_group"] 
+    
+    def merge(self, base: "PasswordManager", theirs: "PasswordManager") -> List[Dict]:
+        """Merge what changed in ``theirs`` since ``base`` into this vault.
+        
+        ``theirs`` is another copy of this vault that diverged from it, e.g.
+        the one on a file share, and ``base`` the copy both started from,
+        such as the one kept at the last sync. Entries are merged one by one
+        (see ``core.merge.merge_vaults``) and the result is applied as a
+        single transaction, journaled and notified like any other edit.
+        Returns the conflicts, already resolved by ``last_modified``.
+        """
+        base_state, their_state = base._state(), theirs._state()
+        # Cópia com outra chave (ex.: depois de uma rotação): recriptografar
+        # as senhas que vierem dela
+        translate = theirs.keys != self.keys
+        with self.transaction():
+            merged, conflicts = merge_vaults(base_state, self._state(), their_state)
+            for group_name in [group_name for group_name in self.passwords["groups"]
+                               if group_name not in merged["groups"]]:
+                self._commit({"op": "delete_group", "group": group_name})
+            for group_name, entries in merged["groups"].items():
+                if group_name not in self.passwords["groups"]:
+                    self._commit({"op": "create_group", "group": group_name})
+                current = self._group(group_name)
+                for website in [website for website in current if website not in entries]:
+                    self._commit({"op": "delete_entry", "group": group_name, "website": website})
+                for website, entry in entries.items():
+                    # Só as entradas que vieram do outro lado são diferentes das nossas
+                    if same_version(current.get(website), entry):
+                        continue
+                    if translate:
+                        entry = dict(entry, password=self.entry_cipher.encrypt(
+                            theirs.entry_cipher.decrypt(entry["password"])))
+                    self._commit({"op": "set_entry", "group": group_name, "website": website, "entry": entry})
+            if merged["default_group"] != self.passwords["default_group"]:
+                self._commit({"op": "set_default_group", "group": merged["default_group"]})
+        return conflicts
+    
+    def _state(self) -> Dict:
+        """The whole vault as ``{"groups": ..., "default_group": ...}``, every group loaded."""
+        return {"groups": self.get_all_entries(), "default_group": self.get_default_group()}
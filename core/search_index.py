@@ -0,0 +1,268 @@
+import heapq
+import re
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """In-memory inverted index over the website, username and group of each entry.
+
+    Query terms with at least ``GRAM`` characters match anywhere inside the
+    website or username through trigram posting lists; shorter terms match
+    the start of a word. Group names are few, so a term matches every entry
+    of a group whose name contains it. All terms must match, ignoring case.
+    """
+
+    GRAM = 3
+    # Palavras candidatas avaliadas por distância de edição em cada busca aproximada
+    FUZZY_CANDIDATES = 64
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._docs: Dict[int, Tuple[str, str, str, str]] = {}
+        self._next_id = 0
+        self._grams: Dict[str, Set[int]] = {}
+        self._prefixes: Dict[str, Set[int]] = {}
+        self._groups: Dict[str, Set[int]] = {}
+        # Busca aproximada: palavras dos websites e seus trigramas com borda
+        self._words: Dict[str, Set[int]] = {}
+        self._word_grams: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _keys(self, website: str, username: str):
+        """Trigrams of both fields plus the short prefixes of their words."""
+        gram = self.GRAM
+        grams = {text[i:i + gram] for text in (website, username) for i in range(len(text) - gram + 1)}
+        prefixes = {word[:size] for word in chain(_WORD.findall(website), _WORD.findall(username))
+                    for size in range(1, gram)}
+        return grams, prefixes
+
+    def add(self, group: str, website: str, username: str) -> None:
+        """Index an entry, replacing what was indexed for it before."""
+        if (group, website) in self._ids:
+            self.remove(group, website)
+        doc_id = self._next_id
+        self._next_id += 1
+        website_key, username_key = website.lower(), username.lower()
+        self._ids[(group, website)] = doc_id
+        self._docs[doc_id] = (group, website, website_key, username_key)
+        grams, prefixes = self._keys(website_key, username_key)
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids is None:
+                self._grams[gram] = {doc_id}
+            else:
+                ids.add(doc_id)
+        for prefix in prefixes:
+            ids = self._prefixes.get(prefix)
+            if ids is None:
+                self._prefixes[prefix] = {doc_id}
+            else:
+                ids.add(doc_id)
+        self._groups.setdefault(group, set()).add(doc_id)
+        for word in set(_WORD.findall(website_key)):
+            ids = self._words.get(word)
+            if ids is None:
+                self._words[word] = {doc_id}
+                for gram in self._padded_grams(word):
+                    self._word_grams.setdefault(gram, set()).add(word)
+            else:
+                ids.add(doc_id)
+
+    def remove(self, group: str, website: str) -> None:
+        doc_id = self._ids.pop((group, website), None)
+        if doc_id is None:
+            return
+        _, _, website_key, username_key = self._docs.pop(doc_id)
+        grams, prefixes = self._keys(website_key, username_key)
+        for postings, keys in ((self._grams, grams), (self._prefixes, prefixes)):
+            for key in keys:
+                ids = postings[key]
+                ids.discard(doc_id)
+                if not ids:
+                    del postings[key]
+        members = self._groups[group]
+        members.discard(doc_id)
+        if not members:
+            del self._groups[group]
+        for word in set(_WORD.findall(website_key)):
+            ids = self._words[word]
+            ids.discard(doc_id)
+            if not ids:
+                del self._words[word]
+                for gram in self._padded_grams(word):
+                    words = self._word_grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self._word_grams[gram]
+
+    def remove_group(self, group: str) -> None:
+        for doc_id in list(self._groups.get(group, ())):
+            self.remove(group, self._docs[doc_id][1])
+
+    def _match_term(self, term: str) -> Set[int]:
+        """Candidates for ``term``; long terms still need checking as substrings."""
+        if len(term) < self.GRAM:
+            ids = self._prefixes.get(term, set())
+        else:
+            # Trigramas sem sobreposição já cobrem o termo; a substring é
+            # confirmada depois, então os demais só custariam interseções
+            starts = list(range(0, len(term) - self.GRAM + 1, self.GRAM))
+            if starts[-1] != len(term) - self.GRAM:
+                starts.append(len(term) - self.GRAM)
+            postings = [self._grams.get(term[i:i + self.GRAM]) for i in starts]
+            if None in postings:
+                ids = set()
+            else:
+                postings.sort(key=len)
+                ids = postings[0].intersection(*postings[1:]) if len(postings) > 1 else postings[0]
+        groups = [members for group, members in self._groups.items() if term in group.lower()]
+        if groups:
+            ids = ids.union(*groups)
+        return ids
+
+    def _matches(self, doc_id: int, terms: List[str]) -> bool:
+        group, _, website_key, username_key = self._docs[doc_id]
+        group_key = group.lower()
+        return all(term in website_key or term in username_key or term in group_key for term in terms)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Return ``(group, website)`` pairs matching every term of ``query``.
+
+        Results are sorted with the websites that start with the first term
+        first; with a ``limit``, only the best ``limit`` of them are kept,
+        without sorting every match.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return []
+        candidates = None
+        for term in terms:
+            ids = self._match_term(term)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        # Trigramas presentes não garantem a substring inteira
+        check = [term for term in terms if len(term) > self.GRAM]
+        docs = self._docs
+        results = (docs[doc_id] for doc_id in candidates if not check or self._matches(doc_id, check))
+        first = terms[0]
+
+        def key(doc):
+            return not doc[2].startswith(first), doc[2], doc[0]
+
+        if limit is None:
+            results = sorted(results, key=key)
+        else:
+            results = heapq.nsmallest(limit, results, key=key)
+        return [(group, website) for group, website, _, _ in results]
+
+    @staticmethod
+    def _padded_grams(word: str) -> Set[str]:
+        # As bordas dão peso ao início e ao fim da palavra
+        padded = f"  {word} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def _allowed_typos(word: str) -> int:
+        if len(word) < 3:
+            return 0
+        return 1 if len(word) < 6 else 2
+
+    def _similar_words(self, term: str) -> Dict[str, float]:
+        """Website words close to ``term`` with a score in (0, 1]."""
+        counts = Counter()
+        for gram in self._padded_grams(term):
+            counts.update(self._word_grams.get(gram, ()))
+        allowed = self._allowed_typos(term)
+        scores = {}
+        # Empates no número de trigramas: preferir palavras de tamanho parecido
+        candidates = heapq.nlargest(self.FUZZY_CANDIDATES, counts.items(),
+                                    key=lambda item: (item[1], -abs(len(item[0]) - len(term))))
+        for word, _ in candidates:
+            if word == term:
+                scores[word] = 1.0
+                continue
+            score = 0.0
+            distance = edit_distance(term, word, allowed)
+            if distance <= allowed:
+                score = 1 - distance / max(len(term), len(word))
+            if len(word) > len(term):
+                # O termo pode ser o começo da palavra, mesmo com erros
+                distance = edit_distance(term, word[:len(term)], allowed)
+                if distance <= allowed:
+                    score = max(score, (0.6 + 0.3 * len(term) / len(word)) * (1 - distance / len(term)))
+            if score > 0:
+                scores[word] = score
+        return scores
+
+    def fuzzy(self, query: str, limit: int = 10) -> List[Tuple[str, str, float]]:
+        """Return up to ``limit`` ``(group, website, score)`` close to ``query``.
+
+        Each word of the query is matched against the words of the websites,
+        tolerating typos (transpositions included) and incomplete words. An
+        entry must match every query word; its score is the mean of the best
+        word scores, so 1.0 means every word matched exactly.
+        """
+        terms = _WORD.findall(query.lower())
+        if not terms:
+            return []
+        matches = [self._similar_words(term) for term in terms]
+        if not all(matches):
+            return []
+        # Partir do termo que cobre menos entradas e filtrar pelos demais
+        coverage = [sum(len(self._words[word]) for word in words) for words in matches]
+        order = sorted(range(len(terms)), key=coverage.__getitem__)
+        docs = self._docs
+        if len(terms) == 1:
+            # Um só termo: as melhores palavras já dão as melhores entradas, e
+            # a primeira palavra que encontra uma entrada traz o melhor escore
+            results = []
+            seen = set()
+            for word, score in sorted(matches[0].items(), key=lambda item: (-item[1], len(item[0]))):
+                for doc_id in self._words[word]:
+                    if doc_id in seen:
+                        continue
+                    seen.add(doc_id)
+                    results.append((docs[doc_id][0], docs[doc_id][1], score))
+                    if len(results) >= limit:
+                        return results
+            return results
+        scores: Dict[int, float] = {}
+        for word, score in sorted(matches[order[0]].items(), key=lambda item: item[1]):
+            scores.update(dict.fromkeys(self._words[word], score))
+        for position in order[1:]:
+            words = matches[position]
+            for doc_id in list(scores):
+                best = max((words.get(word, 0.0) for word in _WORD.findall(docs[doc_id][2])), default=0.0)
+                if best:
+                    scores[doc_id] += best
+                else:
+                    del scores[doc_id]
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -len(docs[item[0]][2])))
+        return [(docs[doc_id][0], docs[doc_id][1], score / len(terms)) for doc_id, score in best]
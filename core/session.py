@@ -0,0 +1,50 @@
+import hashlib
+import hmac
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class SessionKeyCache:
+    """Key-encryption keys of the users who logged in during this session.
+
+    The KEK comes out of the password KDF at login. Keeping it here lets the
+    vault be unlocked, and the same user log in again after switching users
+    or an auto-logout, without running the KDF again: the password is
+    checked against an HMAC keyed with a secret that only exists in this
+    process. Nothing is written to disk.
+    """
+
+    def __init__(self):
+        self._secret = os.urandom(32)
+        self._entries: Dict[str, Tuple[bytes, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _tag(self, username: str, password: str) -> bytes:
+        message = username.encode() + b"\0" + password.encode()
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def store(self, username: str, password: str, kek: bytes) -> None:
+        with self._lock:
+            self._entries[username] = (self._tag(username, password), kek)
+
+    def unlock(self, username: str, password: str) -> Optional[bytes]:
+        """Return the cached KEK if ``password`` is the one it was stored with."""
+        with self._lock:
+            entry = self._entries.get(username)
+        if entry is None or not hmac.compare_digest(entry[0], self._tag(username, password)):
+            return None
+        return entry[1]
+
+    def get(self, username: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(username)
+        return entry[1] if entry is not None else None
+
+    def forget(self, username: str = None) -> None:
+        """Drop one user's key, or every key when ``username`` is None."""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
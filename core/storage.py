@@ -0,0 +1,236 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Políticas de durabilidade das escritas:
+#   always  - fsync do arquivo e do diretório: sobrevive a queda de energia
+#   batched - fsync do arquivo; o diretório é sincronizado pelo chamador
+#             ao final de um lote de escritas
+#   none    - sem fsync (testes); a troca continua atômica para o processo
+DURABILITY_POLICIES = ("always", "batched", "none")
+DEFAULT_DURABILITY = "always"
+
+
+def check_durability(durability: str) -> str:
+    if durability not in DURABILITY_POLICIES:
+        raise ValueError(f"Política de durabilidade desconhecida: {durability}")
+    return durability
+
+
+@contextmanager
+def atomic_writer(path: str, durability: str = DEFAULT_DURABILITY):
+    """Open a file that atomically replaces ``path`` when the block exits.
+
+    The data goes to a temporary file in the same directory, which is
+    renamed over the target once it is complete, so a crash leaves either the
+    old or the new contents. If the block raises, ``path`` is left untouched.
+    """
+    check_durability(durability)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            f.flush()
+            if durability != "none":
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if durability == "always":
+        fsync_directory(directory)
+
+
+def atomic_write(path: str, data: bytes, durability: str = DEFAULT_DURABILITY) -> None:
+    """Replace ``path`` with ``data`` without ever leaving a truncated file."""
+    with atomic_writer(path, durability) as f:
+        f.write(data)
+
+
+def fsync_directory(path: str) -> None:
+    """Persist renames and new files inside ``path``."""
+    # O Windows não permite abrir diretórios para fsync
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Arquivos de chave: uma chave Fernet por linha, a atual primeiro. As demais
+# só existem durante uma rotação, para ler o que ainda não foi recriptografado.
+# Protegido por uma chave de usuário (KEK), o conteúdo é cifrado com AES-GCM:
+#   magic | versão | número de slots | slots [nonce | tamanho uint32 | dados]
+# Cada slot cifra as mesmas chaves com uma KEK; só há mais de um enquanto a
+# senha do usuário é trocada, para que uma interrupção não tranque o cofre.
+WRAPPED_MAGIC = b"SVKW"
+WRAPPED_VERSION = 1
+WRAPPED_HEADER = struct.Struct(">4sBB")
+WRAPPED_SLOT = struct.Struct(">12sI")
+
+
+def read_keys(path: str, kek: bytes = None) -> List[bytes]:
+    """Read a key file, current key first, unwrapping it with ``kek`` if protected."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith(WRAPPED_MAGIC):
+        data = _unwrap(path, data, kek)
+    keys = data.split()
+    if not keys:
+        raise ValueError(f"Arquivo de chave vazio: {path}")
+    return keys
+
+
+def is_wrapped(path: str) -> bool:
+    """Whether the key file at ``path`` is protected by a user key."""
+    with open(path, 'rb') as f:
+        return f.read(len(WRAPPED_MAGIC)) == WRAPPED_MAGIC
+
+
+def _unwrap(path: str, data: bytes, kek: bytes) -> bytes:
+    if kek is None:
+        raise ValueError(f"Arquivo de chave protegido, é preciso entrar com a senha: {path}")
+    header = data[:WRAPPED_HEADER.size]
+    _, version, slots = WRAPPED_HEADER.unpack(header)
+    if version != WRAPPED_VERSION:
+        raise ValueError(f"Versão de arquivo de chave não suportada: {version}")
+    aead = AESGCM(kek)
+    position = WRAPPED_HEADER.size
+    for _ in range(slots):
+        nonce, size = WRAPPED_SLOT.unpack_from(data, position)
+        position += WRAPPED_SLOT.size
+        sealed = data[position:position + size]
+        position += size
+        try:
+            return aead.decrypt(nonce, sealed, header)
+        except InvalidTag:
+            continue
+    raise ValueError(f"Senha incorreta para o arquivo de chave: {path}")
+
+
+def write_keys(path: str, keys: List[bytes], durability: str = DEFAULT_DURABILITY,
+               keks: Sequence[bytes] = ()) -> None:
+    """Write a key file, wrapped once per ``keks`` entry, or in plaintext without any."""
+    data = b"\n".join(keys)
+    if keks:
+        header = WRAPPED_HEADER.pack(WRAPPED_MAGIC, WRAPPED_VERSION, len(keks))
+        parts = [header]
+        for kek in keks:
+            nonce = os.urandom(12)
+            sealed = AESGCM(kek).encrypt(nonce, data, header)
+            parts.append(WRAPPED_SLOT.pack(nonce, len(sealed)) + sealed)
+        data = b"".join(parts)
+    atomic_write(path, data, durability)
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int, int, int]]:
+    """Identify the current version of ``path``, or None if it does not exist.
+
+    Every atomic write creates a new inode, so comparing stamps tells whether
+    another process replaced the file without reading it.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class FileLock:
+    """Advisory lock shared by every process that opens the same files.
+
+    The lock lives in its own file, so replacing the protected files does not
+    release it. It is reentrant within a process: the thread holding it can
+    take it again, while other threads wait like other processes do. The
+    outermost hold decides between shared and exclusive. Windows has no
+    shared locks through ``msvcrt``, so every hold is exclusive there.
+    """
+
+    # Intervalo entre tentativas quando o sistema não bloqueia (Windows)
+    RETRY_INTERVAL = 0.05
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    @contextmanager
+    def hold(self, shared: bool = False, blocking: bool = True):
+        """Hold the lock for the block, which receives whether it was acquired.
+
+        With ``blocking=False`` the block runs without the lock (and gets
+        False) when another thread or process holds it.
+        """
+        if not self._thread_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if self._depth == 0:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    acquired = _lock_file(fd, shared, blocking)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                if not acquired:
+                    os.close(fd)
+                    yield False
+                    return
+                self._fd = fd
+            self._depth += 1
+            try:
+                yield True
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fd, self._fd = self._fd, None
+                    _unlock_file(fd)
+                    os.close(fd)
+        finally:
+            self._thread_lock.release()
+
+
+def _lock_file(fd: int, shared: bool, blocking: bool) -> bool:
+    if fcntl is not None:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(FileLock.RETRY_INTERVAL)
+
+
+def _unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
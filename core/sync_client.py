@@ -0,0 +1,334 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from core.merge import same_version
+from core.password_manager import PasswordManager
+from core.storage import atomic_write, is_wrapped, read_keys, write_keys
+from core.sync_protocol import SyncCipher, read_message, write_message
+
+
+class SyncClient:
+    """Keep a ``PasswordManager`` in sync with a ``SyncServer``.
+
+    Each sync pulls the deltas other clients pushed since this client's
+    version vector, then pushes one delta per group or entry that changed
+    here since the last sync, found by comparing each entry's version with
+    the one recorded at that sync; after the first sync of a client, only
+    the entries its change listener saw change are compared. Deltas are
+    sealed with ``SyncCipher``. Concurrent changes to an entry are resolved
+    by ``last_modified`` (last writer wins) on every client, so all copies
+    converge; deletions are kept
+    as timestamped tombstones so an older edit cannot resurrect an entry.
+    Passwords travel in plaintext inside the sealed payload and are
+    encrypted again with the receiving copy's key when applied.
+
+    Every client must share the vault key, as copies of the same vault do;
+    the key in use at the first sync (the sync key) keeps being used for
+    sync after a rotation. It is kept in its own key file, protected like
+    the vault's, and encrypts the sync state next to the vault, so the
+    state stays readable once a rotation drops that key from the vault.
+    """
+
+    # Deltas por mensagem de push
+    PUSH_BATCH = 1000
+    # Lápides mais antigas que isto são esquecidas (segundos)
+    TOMBSTONE_TTL = 90 * 24 * 3600
+
+    def __init__(self, password_manager: PasswordManager, address: Union[Tuple[str, int], str],
+                 state_file: str = None):
+        self.pm = password_manager
+        # (host, porta) para TCP, ou o caminho de um socket Unix
+        self.address = address
+        self.state_file = state_file or f"{password_manager.password_file}.sync"
+        self.key_file = f"{self.state_file}.key"
+        self.state = self._load_state()
+        self._state_fernet = Fernet(self.sync_key)
+        self.cipher = SyncCipher(self.sync_key)
+        # Momento das exclusões feitas aqui, para datar as lápides
+        self._deleted: Dict[Tuple[str, ...], float] = {}
+        # Grupos (group,) e entradas (group, website) alterados aqui desde o
+        # último sync; None até o primeiro, que compara o cofre inteiro (nada
+        # ouvia as alterações feitas antes deste cliente existir)
+        self._dirty: Optional[Set[Tuple[str, ...]]] = None
+        self._dirty_lock = threading.Lock()
+        self._applying = False
+        self.pm.add_change_listener(self._on_change)
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'rb') as f:
+                data = f.read()
+            state = None
+            if os.path.exists(self.key_file):
+                self.sync_key = read_keys(self.key_file, self.pm.kek)[0]
+                if self.pm.kek is not None and not is_wrapped(self.key_file):
+                    self._write_sync_key()
+                try:
+                    state = json.loads(Fernet(self.sync_key).decrypt(data))
+                except InvalidToken:
+                    pass  # Migração interrompida antes de regravar o estado
+            if state is None:
+                # Estado de uma versão anterior, cifrado com a chave do cofre e
+                # guardando a chave de sincronização: passar para o arquivo próprio
+                state = json.loads(self.pm.fernet.decrypt(data))
+                self.sync_key = state.pop("sync_key").encode()
+                self._write_sync_key()
+            state["synced"] = {tuple(key): version for key, version in state["synced"]}
+            state["tombstones"] = {tuple(key): at for key, at in state["tombstones"]}
+            return state
+        self.sync_key = self.pm.keys[0]
+        self._write_sync_key()
+        return {
+            "client_id": uuid.uuid4().hex,
+            "counter": 0,
+            "vector": {},
+            # Versão de cada grupo (group,) e entrada (group, website) no último sync
+            "synced": {},
+            "tombstones": {},
+            # Deltas numerados mas ainda não confirmados pelo servidor
+            "pending": []
+        }
+
+    def _write_sync_key(self) -> None:
+        write_keys(self.key_file, [self.sync_key], self.pm.durability,
+                   keks=(self.pm.kek,) if self.pm.kek is not None else ())
+
+    def _save_state(self) -> None:
+        horizon = time.time() - self.TOMBSTONE_TTL
+        state = dict(self.state,
+                     synced=[[list(key), version] for key, version in self.state["synced"].items()],
+                     tombstones=[[list(key), at] for key, at in self.state["tombstones"].items() if at >= horizon])
+        atomic_write(self.state_file, self._state_fernet.encrypt(json.dumps(state).encode()), self.pm.durability)
+
+    def _on_change(self, change: Dict) -> None:
+        if self._applying:
+            return
+        now = time.time()
+        if change["type"] == "entry_removed":
+            self._deleted[(change["group"], change["website"])] = now
+        elif change["type"] == "entry_moved":
+            self._deleted[(change["from_group"], change["website"])] = now
+        elif change["type"] == "group_deleted":
+            self._deleted[(change["group"],)] = now
+        if change["type"] == "entry_moved":
+            keys = [(change["from_group"], change["website"]), (change["to_group"], change["website"])]
+        elif "website" in change:
+            keys = [(change["group"], change["website"])]
+        elif change["type"] in ("group_created", "group_deleted"):
+            keys = [(change["group"],)]
+        else:
+            return
+        with self._dirty_lock:
+            if self._dirty is not None:
+                self._dirty.update(keys)
+
+    async def _connect(self):
+        if isinstance(self.address, str):
+            return await asyncio.open_unix_connection(self.address)
+        return await asyncio.open_connection(*self.address)
+
+    async def _request(self, reader, writer, message: Dict) -> Dict:
+        await write_message(writer, message)
+        response = await read_message(reader)
+        if response is None:
+            raise ConnectionError("O servidor encerrou a conexão")
+        if not response.get("ok"):
+            raise ValueError(f"Erro do servidor de sincronização: {response.get('error')}")
+        return response
+
+    async def sync(self) -> Dict[str, int]:
+        """Exchange changes with the server; returns how many deltas went each way."""
+        reader, writer = await self._connect()
+        try:
+            # Deltas de um sync interrompido: reenviar com os mesmos contadores
+            await self._push(reader, writer)
+            pulled = await self._pull(reader, writer)
+            self.state["pending"] = self._local_deltas()
+            self._save_state()
+            pushed = len(self.state["pending"])
+            await self._push(reader, writer)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        return {"pulled": pulled, "pushed": pushed}
+
+    def sync_now(self) -> Dict[str, int]:
+        """Blocking ``sync()`` for callers without an event loop."""
+        return asyncio.run(self.sync())
+
+    async def _push(self, reader, writer) -> None:
+        pending = self.state["pending"]
+        for start in range(0, len(pending), self.PUSH_BATCH):
+            await self._request(reader, writer, {
+                "op": "push", "vault": self.cipher.vault_id, "origin": self.state["client_id"],
+                "deltas": pending[start:start + self.PUSH_BATCH]})
+        if pending:
+            self.state["vector"][self.state["client_id"]] = pending[-1]["counter"]
+            self.state["pending"] = []
+            self._save_state()
+
+    async def _pull(self, reader, writer) -> int:
+        pulled = 0
+        while True:
+            response = await self._request(reader, writer, {
+                "op": "pull", "vault": self.cipher.vault_id, "vector": self.state["vector"]})
+            deltas = response["deltas"]
+            if deltas:
+                self._apply_deltas(deltas)
+                pulled += len(deltas)
+                self._save_state()
+            if not response["more"]:
+                return pulled
+
+    def _apply_deltas(self, deltas: List[Dict]) -> None:
+        vector = self.state["vector"]
+        self._applying = True
+        try:
+            with self.pm.transaction():
+                for delta in deltas:
+                    payload = self.cipher.open(delta["id"], delta["payload"])
+                    if payload["kind"] == "group":
+                        self._apply_group(payload)
+                    else:
+                        self._apply_entry(payload)
+                    vector[delta["origin"]] = max(vector.get(delta["origin"], 0), delta["counter"])
+        finally:
+            self._applying = False
+
+    def _apply_entry(self, payload: Dict) -> None:
+        group, website, entry, at = payload["group"], payload["website"], payload["entry"], payload["at"]
+        key = (group, website)
+        group_exists = group in self.pm.list_groups()
+        local = self.pm.get_entries(group).get(website) if group_exists else None
+        synced, tombstones = self.state["synced"], self.state["tombstones"]
+        if entry is None:
+            tombstones[key] = max(tombstones.get(key, 0), at)
+            if local is not None:
+                if local.get("last_modified", 0) > at:
+                    return  # Editada aqui depois da exclusão remota
+                self.pm.delete_entry(website, group)
+            synced.pop(key, None)
+            return
+        if local is not None and local.get("last_modified", 0) >= at:
+            if same_version(local, entry):
+                # Já igual aqui: registrar, senão o próximo push a devolveria
+                synced[key] = [local["username"], local.get("last_modified")]
+                synced[(group,)] = True
+            return
+        if local is None and max(tombstones.get(key, 0), tombstones.get((group,), 0),
+                                 self._deleted_at(key), 0 if group_exists else self._deleted_at((group,))) >= at:
+            return  # Excluída aqui (ela ou o grupo) depois dessa edição
+        # A senha chega em texto claro: cifrá-la com a chave desta cópia
+        self.pm.put_entry(website, dict(entry, password=self.pm.entry_cipher.encrypt(entry["password"])), group)
+        synced[key] = [entry["username"], entry.get("last_modified")]
+        synced[(group,)] = True
+
+    def _deleted_at(self, key: Tuple[str, ...]) -> float:
+        """When ``key`` was deleted here since the last sync, 0 if it was not."""
+        if key in self._deleted:
+            return self._deleted[key]
+        # Excluída sem um SyncClient ouvindo: a hora exata não é conhecida
+        return time.time() if key in self.state["synced"] else 0
+
+    def _apply_group(self, payload: Dict) -> None:
+        group, at = payload["group"], payload["at"]
+        key = (group,)
+        synced, tombstones = self.state["synced"], self.state["tombstones"]
+        exists = group in self.pm.list_groups()
+        if not payload["deleted"]:
+            if not exists and max(tombstones.get(key, 0), self._deleted_at(key)) < at:
+                self.pm.create_group(group)
+                synced[key] = True
+            return
+        tombstones[key] = max(tombstones.get(key, 0), at)
+        if not exists or group == "Geral":
+            return
+        # Entradas editadas depois da exclusão mantêm o grupo
+        if any(entry.get("last_modified", 0) > at for entry in self.pm.get_entries(group).values()):
+            return
+        self.pm.delete_group(group)
+        for synced_key in [synced_key for synced_key in synced if synced_key[0] == group]:
+            del synced[synced_key]
+
+    def _local_deltas(self) -> List[Dict]:
+        """Number and seal one delta per group or entry changed since the last sync."""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        synced = self.state["synced"]
+        now = time.time()
+        changes = []
+        if dirty is None:
+            seen = set()
+            for group, entries in self.pm.get_all_entries().items():
+                seen.add((group,))
+                self._group_change(group, now, changes)
+                for website, entry in entries.items():
+                    seen.add((group, website))
+                    self._entry_change(group, website, entry, now, changes)
+            gone = [key for key in synced if key not in seen]
+        else:
+            groups = set(self.pm.list_groups())
+            gone = []
+            # Grupos antes das entradas: a criação do grupo vai primeiro
+            for key in sorted(dirty, key=len):
+                group = key[0]
+                if group not in groups:
+                    # Grupo excluído: as entradas dele também se foram
+                    gone.extend(synced_key for synced_key in synced if synced_key[0] == group)
+                elif len(key) == 1:
+                    # Excluído e criado de novo: as entradas antigas se foram
+                    self._group_change(group, now, changes)
+                    gone.extend(synced_key for synced_key in synced if synced_key[0] == group
+                                and len(synced_key) == 2 and not self.pm.has_entry(synced_key[1], group))
+                else:
+                    entry = self.pm.get_entries(group).get(key[1])
+                    if entry is None:
+                        gone.append(key)
+                    else:
+                        self._group_change(group, now, changes)
+                        self._entry_change(group, key[1], entry, now, changes)
+        for key in dict.fromkeys(gone):
+            if key in synced:
+                self._deletion_change(key, now, changes)
+        self._deleted.clear()
+        deltas = []
+        for key, payload in changes:
+            self.state["counter"] += 1
+            delta_id = self.cipher.delta_id(*key)
+            deltas.append({"counter": self.state["counter"], "id": delta_id,
+                           "payload": self.cipher.seal(delta_id, payload)})
+        return deltas
+
+    def _group_change(self, group: str, now: float, changes: List) -> None:
+        key = (group,)
+        if key not in self.state["synced"]:
+            changes.append((key, {"kind": "group", "group": group, "deleted": False, "at": now}))
+            self.state["synced"][key] = True
+
+    def _entry_change(self, group: str, website: str, entry: Dict, now: float, changes: List) -> None:
+        key = (group, website)
+        version = [entry["username"], entry.get("last_modified")]
+        if self.state["synced"].get(key) != version:
+            # O token da senha usa a chave desta cópia, que as outras
+            # podem não ter: enviar a senha, protegida pelo selo do payload
+            entry = dict(entry, password=self.pm.entry_cipher.decrypt(entry["password"]))
+            changes.append((key, {"kind": "entry", "group": group, "website": website,
+                                  "entry": entry, "at": entry.get("last_modified", now)}))
+            self.state["synced"][key] = version
+
+    def _deletion_change(self, key: Tuple[str, ...], now: float, changes: List) -> None:
+        at = self._deleted.pop(key, now)
+        self.state["tombstones"][key] = at
+        del self.state["synced"][key]
+        if len(key) == 1:
+            changes.append((key, {"kind": "group", "group": key[0], "deleted": True, "at": at}))
+        else:
+            changes.append((key, {"kind": "entry", "group": key[0], "website": key[1], "entry": None,
+                                  "at": at}))
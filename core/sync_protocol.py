@@ -0,0 +1,80 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+from typing import Dict, Optional
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# Protocolo de sincronização: cada mensagem é um objeto JSON precedido do
+# seu tamanho (uint32 big-endian). O cliente envia uma requisição e recebe
+# uma resposta na mesma conexão:
+#   {"op": "push", "vault": id, "origin": cliente, "deltas": [{"counter", "id", "payload"}]}
+#       -> {"ok": true}
+#   {"op": "pull", "vault": id, "vector": {cliente: contador}}
+#       -> {"ok": true, "deltas": [{"origin", "counter", "id", "payload"}], "more": bool}
+# Erros respondem {"ok": false, "error": mensagem}. O servidor só vê o id do
+# cofre, ids de entrada (HMAC) e payloads cifrados com AES-GCM.
+HEADER = struct.Struct(">I")
+MAX_MESSAGE = 64 * 1024 * 1024
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Read one message; None when the peer closed the connection between messages."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ConnectionError("Conexão encerrada no meio de uma mensagem")
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE:
+        raise ValueError(f"Mensagem de sincronização grande demais: {size} bytes")
+    return json.loads(await reader.readexactly(size))
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Dict) -> None:
+    data = json.dumps(message).encode()
+    writer.write(HEADER.pack(len(data)) + data)
+    await writer.drain()
+
+
+def _derive(secret: bytes, info: bytes) -> bytes:
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info).derive(secret)
+
+
+class SyncCipher:
+    """End-to-end encryption of sync deltas, keyed by the vault key.
+
+    Every copy of a vault derives the same vault id, the same entry ids and
+    the same AES-GCM key from the vault key, so clients find each other's
+    deltas on the server while the server learns neither group and website
+    names nor entry contents. The entry id is bound to its payload as
+    associated data, so the server cannot move a payload to another entry.
+    """
+
+    NONCE_SIZE = 12
+
+    def __init__(self, vault_key: bytes):
+        secret = base64.urlsafe_b64decode(vault_key)
+        self.vault_id = _derive(secret, b"securevault-sync-id").hex()
+        self._id_key = _derive(secret, b"securevault-sync-index")
+        self._aead = AESGCM(_derive(secret, b"securevault-sync"))
+
+    def delta_id(self, *key: str) -> str:
+        """Opaque id of a group ``(group,)`` or an entry ``(group, website)``."""
+        return hmac.new(self._id_key, json.dumps(key).encode(), hashlib.sha256).hexdigest()[:32]
+
+    def seal(self, delta_id: str, payload: Dict) -> str:
+        nonce = os.urandom(self.NONCE_SIZE)
+        sealed = nonce + self._aead.encrypt(nonce, json.dumps(payload).encode(), delta_id.encode())
+        return base64.b64encode(sealed).decode()
+
+    def open(self, delta_id: str, sealed: str) -> Dict:
+        data = base64.b64decode(sealed)
+        return json.loads(self._aead.decrypt(data[:self.NONCE_SIZE], data[self.NONCE_SIZE:], delta_id.encode()))
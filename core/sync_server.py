@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from core.storage import atomic_write
+from core.sync_protocol import read_message, write_message
+
+# Ids de cofre e de cliente viram nomes de arquivo: só hexadecimal
+_VAULT_ID = re.compile(r"[0-9a-f]{64}")
+_CLIENT_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class SyncServer:
+    """Relay of encrypted vault deltas between SecureVault clients.
+
+    For each vault the server keeps, per origin client, the latest delta of
+    every entry id, ordered by the client's counter. A pull sends a version
+    vector (the highest counter seen from each origin) and receives only
+    the newer deltas, so clients never download a whole vault. Everything is
+    end-to-end encrypted (see ``SyncCipher``): the server stores opaque ids
+    and ciphertext only. One asyncio event loop serves every connection.
+    With ``data_dir`` the deltas survive restarts, in one append-only log
+    per vault, written on a separate thread so the loop keeps serving.
+    """
+
+    # Máximo de deltas por resposta de pull; o cliente pede o resto em seguida
+    PULL_LIMIT = 5000
+
+    def __init__(self, data_dir: str = None):
+        self.data_dir = data_dir
+        # cofre -> origem -> id da entrada -> delta, na ordem dos contadores
+        self._vaults: Dict[str, Dict[str, "OrderedDict[str, Dict]"]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Um push por vez: o log no disco segue a ordem da memória
+        self._push_lock = asyncio.Lock()
+        # Uma única thread de escrita mantém a ordem das linhas de cada log
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-log")
+        if data_dir is not None:
+            os.makedirs(data_dir, exist_ok=True)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: str = None):
+        """Listen on TCP, or on the Unix socket ``path``; returns the bound address."""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._writer.shutdown(wait=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except (ConnectionError, ValueError):
+                    break
+                if message is None:
+                    break
+                try:
+                    response = await self._dispatch(message)
+                except (KeyError, TypeError, ValueError) as e:
+                    response = {"ok": False, "error": str(e)}
+                await write_message(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, message: Dict) -> Dict:
+        vault_id = message["vault"]
+        if not isinstance(vault_id, str) or not _VAULT_ID.fullmatch(vault_id):
+            raise ValueError("Id de cofre inválido")
+        if message["op"] == "push":
+            return await self._push(vault_id, message["origin"], message["deltas"])
+        if message["op"] == "pull":
+            return self._pull(vault_id, message.get("vector", {}))
+        raise ValueError(f"Operação desconhecida: {message['op']}")
+
+    async def _push(self, vault_id: str, origin: str, deltas: List[Dict]) -> Dict:
+        if not isinstance(origin, str) or not _CLIENT_ID.fullmatch(origin):
+            raise ValueError("Id de cliente inválido")
+        if not isinstance(deltas, list):
+            raise ValueError("Lista de deltas inválida")
+        async with self._push_lock:
+            log = self._vault(vault_id).setdefault(origin, OrderedDict())
+            last = next(reversed(log.values()))["counter"] if log else 0
+            # Validar o lote inteiro antes de alterar qualquer coisa: um delta
+            # inválido no meio não deixa os anteriores só na memória
+            accepted = []
+            for delta in deltas:
+                counter = int(delta["counter"])
+                if counter <= last:
+                    # Reenvio depois de uma falha: o delta já está aqui
+                    continue
+                if not isinstance(delta["id"], str) or not isinstance(delta["payload"], str):
+                    raise ValueError("Delta inválido")
+                accepted.append({"origin": origin, "counter": counter, "id": delta["id"],
+                                 "payload": delta["payload"]})
+                last = counter
+            if accepted and self.data_dir is not None:
+                await asyncio.get_running_loop().run_in_executor(self._writer, self._append, vault_id, accepted)
+            for stored in accepted:
+                # Um delta mais novo da mesma origem substitui o anterior da entrada
+                log.pop(stored["id"], None)
+                log[stored["id"]] = stored
+        return {"ok": True}
+
+    def _append(self, vault_id: str, deltas: List[Dict]) -> None:
+        with open(self._log_path(vault_id), "a") as f:
+            f.writelines(json.dumps(delta) + "\n" for delta in deltas)
+
+    def _pull(self, vault_id: str, vector: Dict[str, int]) -> Dict:
+        deltas = []
+        more = False
+        for origin, log in self._vault(vault_id).items():
+            known = int(vector.get(origin, 0))
+            newer = []
+            # Os contadores crescem no fim: parar no primeiro já conhecido
+            for delta in reversed(log.values()):
+                if delta["counter"] <= known:
+                    break
+                newer.append(delta)
+            newer.reverse()
+            room = self.PULL_LIMIT - len(deltas)
+            if len(newer) > room:
+                newer, more = newer[:room], True
+            deltas.extend(newer)
+            if more:
+                break
+        return {"ok": True, "deltas": deltas, "more": more}
+
+    def _log_path(self, vault_id: str) -> str:
+        return os.path.join(self.data_dir, f"{vault_id}.log")
+
+    def _vault(self, vault_id: str) -> Dict[str, "OrderedDict[str, Dict]"]:
+        vault = self._vaults.get(vault_id)
+        if vault is None:
+            vault = self._vaults[vault_id] = self._load(vault_id)
+        return vault
+
+    def _load(self, vault_id: str) -> Dict[str, "OrderedDict[str, Dict]"]:
+        vault: Dict[str, "OrderedDict[str, Dict]"] = {}
+        if self.data_dir is None or not os.path.exists(self._log_path(vault_id)):
+            return vault
+        lines = 0
+        with open(self._log_path(vault_id)) as f:
+            for line in f:
+                try:
+                    delta = json.loads(line)
+                except ValueError:
+                    break  # Última linha cortada por uma queda
+                log = vault.setdefault(delta["origin"], OrderedDict())
+                log.pop(delta["id"], None)
+                log[delta["id"]] = delta
+                lines += 1
+        kept = sum(len(log) for log in vault.values())
+        if lines > 2 * kept:
+            # Log dominado por deltas substituídos: regravar só os atuais
+            deltas = sorted((delta for log in vault.values() for delta in log.values()),
+                            key=lambda delta: (delta["origin"], delta["counter"]))
+            atomic_write(self._log_path(vault_id), "".join(json.dumps(delta) + "\n" for delta in deltas).encode())
+        return vault
+
+
+def main():
+    host = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    data_dir = sys.argv[3] if len(sys.argv) > 3 else None
+
+    async def run():
+        server = SyncServer(data_dir)
+        address = await server.start(host, port)
+        print(f"Servidor de sincronização em {address[0]}:{address[1]}")
+        await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
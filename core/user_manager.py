@@ -1,34 +1,61 @@
 import json
 import os
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import base64
+import hmac
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from core import kdf
+from core.session import SessionKeyCache
+from core.storage import DEFAULT_DURABILITY, atomic_write, check_durability, is_wrapped, read_keys, write_keys
+
+# Versões do hash de login guardado no perfil:
+#   1 - a própria saída do KDF (perfis antigos)
+#   2 - HKDF da saída do KDF; a mesma saída dá a KEK do cofre, que assim
+#       não pode ser obtida a partir do que está gravado no perfil
+HASH_VERSION = 2
+INDEX_FORMAT = "per-user"
 
 class UserManager:
-    def __init__(self):
+    def __init__(self, durability=DEFAULT_DURABILITY, kdf_params=None):
+        self.durability = check_durability(durability)
+        # Parâmetros do KDF para senhas novas; perfis com outros parâmetros
+        # são refeitos no próximo login bem-sucedido
+        self.kdf_params = kdf.check_params(kdf_params or kdf.DEFAULT_PARAMS)
         # Criar diretório de dados se não existir
         self.data_dir = "data"
         os.makedirs(self.data_dir, exist_ok=True)
         
+        # users.enc guarda só o índice (usuário -> id e email -> id); cada
+        # perfil fica em data/<id>/profile.enc e é decriptado quando usado
         self.users_file = os.path.join(self.data_dir, "users.enc")
         self.key_file = os.path.join(self.data_dir, "users.key")
+        self._profiles = {}
         self._load_or_create_key()
         self._load_or_create_users()
+        # Uma única thread para o PBKDF2: mantém a interface livre e serializa
+        # as operações que alteram os usuários
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-kdf")
+        # KEKs dos usuários que já entraram nesta sessão
+        self.session_keys = SessionKeyCache()
         
     def _generate_key(self):
         return Fernet.generate_key()
     
     def _load_or_create_key(self):
         if os.path.exists(self.key_file):
-            with open(self.key_file, 'rb') as f:
-                self.key = f.read()
+            self.keys = read_keys(self.key_file)
         else:
-            self.key = self._generate_key()
-            with open(self.key_file, 'wb') as f:
-                f.write(self.key)
-        self.fernet = Fernet(self.key)
+            self.keys = [self._generate_key()]
+            write_keys(self.key_file, self.keys, self.durability)
+        self._set_keys(self.keys)
+    
+    def _set_keys(self, keys):
+        self.keys = keys
+        self.key = keys[0]
+        self.fernet = MultiFernet([Fernet(key) for key in keys])
     
     def _load_or_create_users(self):
         if os.path.exists(self.users_file):
@@ -36,49 +63,140 @@ class UserManager:
                 encrypted_data = f.read()
                 decrypted_data = self.fernet.decrypt(encrypted_data)
                 self.users = json.loads(decrypted_data)
+            if self.users.get("format") != INDEX_FORMAT:
+                self._migrate_profiles(self.users)
+            if len(self.keys) > 1:
+                # Rotação interrompida antes de regravar os arquivos
+                self._finish_rotation()
         else:
             self.users = {
-                "profiles": {},
+                "format": INDEX_FORMAT,
+                "users": {},  # Mapeia nomes de usuário para IDs
                 "email_map": {}  # Mapeia emails para IDs de usuário
             }
             self.save_users()
+        self._build_indexes()
+    
+    def _migrate_profiles(self, legacy):
+        """Split an old users.enc holding every profile into one file per user."""
+        email_map = {}
+        for username, user in legacy["profiles"].items():
+            os.makedirs(os.path.join(self.data_dir, user["id"]), exist_ok=True)
+            self._profiles[username] = user
+            self._save_profile(username, user["id"])
+            # Email repetido: vale o perfil para o qual o email_map aponta
+            if user["email"] not in email_map or legacy["email_map"].get(user["email"]) == user["id"]:
+                email_map[user["email"]] = user["id"]
+        # Os perfis já estão no disco: o índice novo pode substituir o arquivo antigo
+        self.users = {
+            "format": INDEX_FORMAT,
+            "users": {username: user["id"] for username, user in legacy["profiles"].items()},
+            "email_map": email_map
+        }
+        self.save_users()
+    
+    def _build_indexes(self):
+        """Index the users by email and id, repairing ``email_map`` if needed.
+        
+        ``email_map`` entries whose id belongs to no user are dropped and
+        the index is saved again. Two users with the same id cannot be told
+        apart, so that is an error.
+        """
+        # Índices só em memória: email -> usuário e id -> usuário
+        self._by_id = {}
+        for username, user_id in self.users["users"].items():
+            if user_id in self._by_id:
+                raise ValueError(f"ID de usuário repetido em users.enc: {user_id}")
+            self._by_id[user_id] = username
+        email_map = self.users["email_map"]
+        self._by_email = {email: self._by_id[user_id] for email, user_id in email_map.items()
+                          if user_id in self._by_id}
+        if len(self._by_email) != len(email_map):
+            self.users["email_map"] = {email: user_id for email, user_id in email_map.items()
+                                       if user_id in self._by_id}
+            self.save_users()
+    
+    def _profile_file(self, user_id):
+        return os.path.join(self.data_dir, user_id, "profile.enc")
+    
+    def _profile(self, username):
+        """Return a user's profile, decrypting its file on first use."""
+        profile = self._profiles.get(username)
+        if profile is None:
+            with open(self._profile_file(self.users["users"][username]), 'rb') as f:
+                profile = json.loads(self.fernet.decrypt(f.read()))
+            self._profiles[username] = profile
+        return profile
+    
+    def _save_profile(self, username, user_id=None):
+        encrypted_data = self.fernet.encrypt(json.dumps(self._profiles[username]).encode())
+        atomic_write(self._profile_file(user_id or self.users["users"][username]), encrypted_data, self.durability)
     
     def save_users(self):
+        """Write the username/email index; profiles are saved on their own."""
         encrypted_data = self.fernet.encrypt(json.dumps(self.users).encode())
-        with open(self.users_file, 'wb') as f:
-            f.write(encrypted_data)
+        atomic_write(self.users_file, encrypted_data, self.durability)
     
-    def _hash_password(self, password, salt=None):
+    def rotate_key(self):
+        """Replace users.key, re-encrypting the index and every profile with the new key.
+        
+        The new key is stored next to the old one before the files are
+        rewritten, so an interruption is finished on the next start.
+        """
+        self._set_keys([self._generate_key()] + self.keys)
+        write_keys(self.key_file, self.keys, self.durability)
+        self._finish_rotation()
+    
+    def _finish_rotation(self):
+        for username in self.users["users"]:
+            self._profile(username)
+            self._save_profile(username)
+        self.save_users()
+        write_keys(self.key_file, self.keys[:1], self.durability)
+        self._set_keys(self.keys[:1])
+    
+    def _hash_password(self, password, salt=None, params=None):
         if salt is None:
             salt = os.urandom(16)
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.b64encode(kdf.derive(password.encode()))
-        return salt, key.decode('utf-8')
+        return salt, kdf.derive(password, salt, params or self.kdf_params)
+    
+    def _expand(self, master, info):
+        return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info).derive(master)
+    
+    def _login_hash(self, master):
+        return base64.b64encode(self._expand(master, b"securevault-login")).decode('utf-8')
+    
+    def _vault_kek(self, master):
+        return self._expand(master, b"securevault-vault-kek")
+    
+    def _vault_key_file(self, username):
+        # Mesmo caminho usado pelo PasswordManager
+        return f"{self._profile(username)['settings']['password_file']}.key"
+    
+    def _sync_key_file(self, username):
+        # Mesmo caminho usado pelo SyncClient com o arquivo de estado padrão
+        return f"{self._profile(username)['settings']['password_file']}.sync.key"
     
     def create_user(self, username, password, email, is_admin=False):
-        if username in self.users["profiles"]:
+        if username in self.users["users"]:
             raise ValueError("Usuário já existe")
         
-        if email in self.users["email_map"]:
+        if email in self._by_email:
             raise ValueError("Email já está em uso")
         
         user_id = str(uuid.uuid4())
-        salt, hashed_password = self._hash_password(password)
+        salt, master = self._hash_password(password)
         
         # Criar diretório para os arquivos do usuário
         user_dir = os.path.join(self.data_dir, user_id)
         os.makedirs(user_dir, exist_ok=True)
         
-        self.users["profiles"][username] = {
+        self._profiles[username] = {
             "id": user_id,
             "salt": base64.b64encode(salt).decode('utf-8'),
-            "password": hashed_password,
+            "password": self._login_hash(master),
+            "hash_version": HASH_VERSION,
+            "kdf": self.kdf_params,
             "email": email,
             "is_admin": is_admin,
             "settings": {
@@ -88,55 +206,170 @@ class UserManager:
             }
         }
         
+        # Perfil primeiro: um índice nunca aponta para um perfil que não existe
+        self._save_profile(username, user_id)
+        self.users["users"][username] = user_id
         self.users["email_map"][email] = user_id
         self.save_users()
+        self._by_email[email] = username
+        self._by_id[user_id] = username
+        self.session_keys.store(username, password, self._vault_kek(master))
         return user_id
     
     def verify_password(self, username, password):
-        if username not in self.users["profiles"]:
-            return False
+        return self.unlock(username, password) is not None
+    
+    def unlock(self, username, password):
+        """Check the password and return the user's vault KEK, or None.
         
-        user = self.users["profiles"][username]
-        salt = base64.b64decode(user["salt"])
-        _, hashed_password = self._hash_password(password, salt)
+        The PBKDF2 runs once per user and session: the KEK is kept in
+        ``session_keys`` and later logins of the same user are checked
+        against it without another KDF run.
+        """
+        if username not in self.users["users"]:
+            return None
+        kek = self.session_keys.unlock(username, password)
+        if kek is not None:
+            return kek
         
-        return hashed_password == user["password"]
+        user = self._profile(username)
+        salt = base64.b64decode(user["salt"])
+        _, master = self._hash_password(password, salt, user.get("kdf", kdf.LEGACY_PARAMS))
+        if user.get("hash_version", 1) == 1:
+            valid = hmac.compare_digest(base64.b64encode(master).decode('utf-8'), user["password"])
+        else:
+            valid = hmac.compare_digest(self._login_hash(master), user["password"])
+        if not valid:
+            return None
+        kek = self._vault_kek(master)
+        if user.get("hash_version", 1) != HASH_VERSION or user.get("kdf", kdf.LEGACY_PARAMS) != self.kdf_params:
+            # Hash antigo ou KDF com outro custo: refazer com os parâmetros
+            # atuais enquanto a senha está disponível
+            kek = self._set_password(username, password, kek)
+        self.session_keys.store(username, password, kek)
+        return kek
+    
+    def get_vault_key(self, username):
+        """KEK of a user who logged in during this session, else None."""
+        return self.session_keys.get(username)
+    
+    def logout(self, username=None):
+        """Forget the cached KEK: the next login runs the KDF again."""
+        self.session_keys.forget(username)
+    
+    def verify_password_async(self, username, password):
+        """Run verify_password in the background; returns a Future[bool]."""
+        return self._executor.submit(self.verify_password, username, password)
+    
+    def create_user_async(self, username, password, email, is_admin=False):
+        """Run create_user in the background; returns a Future with the user id."""
+        return self._executor.submit(self.create_user, username, password, email, is_admin)
+    
+    def change_password_async(self, username, new_password, current_password=None):
+        """Run change_password in the background; returns a Future[bool]."""
+        return self._executor.submit(self.change_password, username, new_password, current_password)
     
     def get_user_by_email(self, email):
-        if email in self.users["email_map"]:
-            user_id = self.users["email_map"][email]
-            for username, user in self.users["profiles"].items():
-                if user["id"] == user_id:
-                    return username, user
+        username = self._by_email.get(email)
+        if username is not None:
+            return username, self._profile(username)
         return None, None
     
+    def get_username_by_id(self, user_id):
+        """Owner of a per-user data directory, or None."""
+        return self._by_id.get(user_id)
+    
+    def rename_user(self, username, new_username):
+        if username not in self.users["users"]:
+            return False
+        if new_username in self.users["users"]:
+            raise ValueError("Usuário já existe")
+        user = self._profile(username)
+        # O perfil não guarda o nome: basta atualizar o índice
+        self.users["users"][new_username] = self.users["users"].pop(username)
+        self._profiles[new_username] = self._profiles.pop(username)
+        self.save_users()
+        self._by_email[user["email"]] = new_username
+        self._by_id[user["id"]] = new_username
+        # O cache de sessão confere o nome junto com a senha
+        self.session_keys.forget(username)
+        return True
+    
+    def delete_user(self, username):
+        """Remove a user from the index; its files in data/<id> are left in place."""
+        if username not in self.users["users"]:
+            return False
+        user = self._profile(username)
+        del self.users["users"][username]
+        if self.users["email_map"].get(user["email"]) == user["id"]:
+            del self.users["email_map"][user["email"]]
+            self._by_email.pop(user["email"], None)
+        self.save_users()
+        del self._profiles[username]
+        self._by_id.pop(user["id"], None)
+        self.session_keys.forget(username)
+        return True
+    
     def get_user_settings(self, username):
-        if username in self.users["profiles"]:
-            return self.users["profiles"][username]["settings"]
+        if username in self.users["users"]:
+            return self._profile(username)["settings"]
         return None
     
     def update_user_settings(self, username, settings):
-        if username in self.users["profiles"]:
-            self.users["profiles"][username]["settings"].update(settings)
-            self.save_users()
+        if username in self.users["users"]:
+            self._profile(username)["settings"].update(settings)
+            self._save_profile(username)
             return True
         return False
     
-    def change_password(self, username, new_password):
-        if username in self.users["profiles"]:
-            salt, hashed_password = self._hash_password(new_password)
-            self.users["profiles"][username]["salt"] = base64.b64encode(salt).decode('utf-8')
-            self.users["profiles"][username]["password"] = hashed_password
-            self.save_users()
+    def change_password(self, username, new_password, current_password=None):
+        """Set a new password, re-wrapping the vault key with the new KEK.
+        
+        The vault key is unwrapped with the KEK of this session's login
+        (``unlock``); without a login, ``current_password`` is checked and
+        gives that KEK. A protected vault with neither raises ValueError.
+        """
+        if username in self.users["users"]:
+            old_kek = self.session_keys.get(username)
+            if old_kek is None and current_password is not None:
+                old_kek = self.unlock(username, current_password)
+                if old_kek is None:
+                    raise ValueError("Senha atual incorreta")
+            key_file = self._vault_key_file(username)
+            if old_kek is None and os.path.exists(key_file) and is_wrapped(key_file):
+                raise ValueError("Entre com a senha atual antes de alterá-la")
+            self.session_keys.store(username, new_password, self._set_password(username, new_password, old_kek))
             return True
         return False
     
+    def _set_password(self, username, password, old_kek):
+        """Hash ``password`` with a new salt and the current KDF, re-wrapping the vault and sync keys.
+        
+        Returns the new KEK.
+        """
+        salt, master = self._hash_password(password)
+        new_kek = self._vault_kek(master)
+        # A chave de sincronização (SyncClient) é protegida como a do cofre
+        wrapped = {path: read_keys(path, old_kek)
+                   for path in (self._vault_key_file(username), self._sync_key_file(username))
+                   if os.path.exists(path) and is_wrapped(path)}
+        for path, keys in wrapped.items():
+            # As duas senhas abrem o cofre até o perfil ser gravado
+            write_keys(path, keys, self.durability, keks=(new_kek, old_kek))
+        user = self._profile(username)
+        user["salt"] = base64.b64encode(salt).decode('utf-8')
+        user["password"] = self._login_hash(master)
+        user["hash_version"] = HASH_VERSION
+        user["kdf"] = self.kdf_params
+        self._save_profile(username)
+        for path, keys in wrapped.items():
+            write_keys(path, keys, self.durability, keks=(new_kek,))
+        return new_kek
+    
     def is_admin(self, username):
-        if username in self.users["profiles"]:
-            return self.users["profiles"][username]["is_admin"]
+        if username in self.users["users"]:
+            return self._profile(username)["is_admin"]
         return False
     
     def get_user_id(self, username):
-        if username in self.users["profiles"]:
-            return self.users["profiles"][username]["id"]
-        return None 
\ No newline at end of file
+        return self.users["users"].get(username) 
\ No newline at end of file
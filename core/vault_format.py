@@ -0,0 +1,200 @@
+import base64
+import json
+import lzma
+import os
+import struct
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Sequence
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# Contêiner binário do cofre:
+#   cabeçalho: magic | versão | flags | tamanho do bloco | prefixo do nonce
+#   corpo:     blocos [tamanho uint32 | AES-GCM(bloco)] até o fim do arquivo
+# O texto claro é uma sequência de registros [tamanho uint32 | JSON],
+# comprimida pelo algoritmo indicado nas flags antes da criptografia. Cada
+# bloco usa o nonce prefixo || contador || último, e o cabeçalho como dado
+# autenticado, o que impede reordenar, trocar ou truncar blocos.
+MAGIC = b"SVLT"
+VERSION = 1
+HEADER = struct.Struct(">4sBBI7s")
+LENGTH = struct.Struct(">I")
+CHUNK_SIZE = 64 * 1024
+TAG_SIZE = 16
+
+# Algoritmos de compressão: nome -> (id nas flags, compressor, descompressor)
+COMPRESSION = {
+    "none": (0, None, None),
+    "zlib": (1, lambda level: zlib.compressobj(level), zlib.decompressobj),
+    "lzma": (2, lambda level: lzma.LZMACompressor(preset=level), lzma.LZMADecompressor),
+}
+DEFAULT_COMPRESSION = "zlib"
+DEFAULT_COMPRESSION_LEVEL = 6
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+_decoder = json.JSONDecoder()
+
+
+class VaultFormatError(ValueError):
+    """Raised when a vault container is malformed or truncated."""
+
+
+def derive_key(key: bytes) -> bytes:
+    """Derive the container key from a Fernet vault key."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"securevault-vault-container",
+    ).derive(base64.urlsafe_b64decode(key))
+
+
+def is_container(prefix: bytes) -> bool:
+    """Whether a file starting with ``prefix`` is a binary container."""
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def _nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return prefix + struct.pack(">I?", counter, last)
+
+
+class ContainerWriter:
+    """Encrypt records into a container as they are produced."""
+
+    def __init__(self, fp: BinaryIO, key: bytes, chunk_size: int = CHUNK_SIZE,
+                 compression: str = DEFAULT_COMPRESSION, level: int = DEFAULT_COMPRESSION_LEVEL):
+        if compression not in COMPRESSION:
+            raise ValueError(f"Compressão desconhecida: {compression}")
+        flags, make_compressor, _ = COMPRESSION[compression]
+        self.fp = fp
+        self.aead = AESGCM(key)
+        self.chunk_size = chunk_size
+        self.compressor = make_compressor(level) if make_compressor else None
+        self.prefix = os.urandom(7)
+        self.header = HEADER.pack(MAGIC, VERSION, flags, chunk_size, self.prefix)
+        self.counter = 0
+        self.records = bytearray()
+        self.buffer = bytearray()
+        fp.write(self.header)
+
+    def write_record(self, record) -> None:
+        data = _encoder.encode(record).encode()
+        self.records += LENGTH.pack(len(data)) + data
+        if len(self.records) >= self.chunk_size:
+            self._compress()
+
+    def _compress(self) -> None:
+        """Move the buffered records, compressed, into the chunk buffer."""
+        data = bytes(self.records)
+        self.records = bytearray()
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        self.buffer += data
+        self._write_full_chunks()
+
+    def _write_full_chunks(self) -> None:
+        # Mantém sempre algo no buffer: o último bloco é marcado em close()
+        while len(self.buffer) > self.chunk_size:
+            self._write_chunk(bytes(self.buffer[:self.chunk_size]), last=False)
+            del self.buffer[:self.chunk_size]
+
+    def close(self) -> None:
+        self._compress()
+        if self.compressor is not None:
+            self.buffer += self.compressor.flush()
+            self._write_full_chunks()
+        self._write_chunk(bytes(self.buffer), last=True)
+        self.buffer = bytearray()
+
+    def _write_chunk(self, plaintext: bytes, last: bool) -> None:
+        sealed = self.aead.encrypt(_nonce(self.prefix, self.counter, last), plaintext, self.header)
+        self.fp.write(LENGTH.pack(len(sealed)) + sealed)
+        self.counter += 1
+
+
+def write_records(fp: BinaryIO, key: bytes, records: Iterable,
+                  compression: str = DEFAULT_COMPRESSION, level: int = DEFAULT_COMPRESSION_LEVEL) -> None:
+    writer = ContainerWriter(fp, key, compression=compression, level=level)
+    for record in records:
+        writer.write_record(record)
+    writer.close()
+
+
+def _read_exact(fp: BinaryIO, size: int) -> bytes:
+    data = fp.read(size)
+    if len(data) != size:
+        raise VaultFormatError("Arquivo do cofre truncado")
+    return data
+
+
+def read_records(fp: BinaryIO, key: bytes, old_keys: Sequence[bytes] = ()) -> Iterator:
+    """Decrypt and yield the records of a container one chunk at a time.
+
+    ``old_keys`` are tried when the first chunk does not open with ``key``,
+    so containers written before a key rotation can still be read.
+    """
+    header = _read_exact(fp, HEADER.size)
+    magic, version, flags, chunk_size, prefix = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise VaultFormatError("Arquivo não é um cofre do SecureVault")
+    if version != VERSION:
+        raise VaultFormatError(f"Versão de cofre não suportada: {version}")
+    decompressor = None
+    for compression_id, _, make_decompressor in COMPRESSION.values():
+        if compression_id == flags:
+            decompressor = make_decompressor() if make_decompressor else None
+            break
+    else:
+        raise VaultFormatError(f"Compressão não suportada: {flags}")
+    aeads = [AESGCM(candidate) for candidate in (key, *old_keys)]
+    buffer = bytearray()
+    counter = 0
+    next_length = fp.read(LENGTH.size)
+    while True:
+        if len(next_length) != LENGTH.size:
+            raise VaultFormatError("Arquivo do cofre truncado")
+        (length,) = LENGTH.unpack(next_length)
+        if length > chunk_size + TAG_SIZE:
+            raise VaultFormatError("Bloco do cofre inválido")
+        sealed = _read_exact(fp, length)
+        # Só se sabe que o bloco é o último quando o arquivo acaba depois dele
+        next_length = fp.read(LENGTH.size)
+        last = not next_length
+        nonce = _nonce(prefix, counter, last)
+        if counter == 0:
+            # A chave que abre o primeiro bloco é a do arquivo inteiro
+            for aead in aeads[:-1]:
+                try:
+                    plaintext = aead.decrypt(nonce, sealed, header)
+                    break
+                except InvalidTag:
+                    continue
+            else:
+                aead = aeads[-1]
+                plaintext = aead.decrypt(nonce, sealed, header)
+        else:
+            plaintext = aead.decrypt(nonce, sealed, header)
+        counter += 1
+        if decompressor is not None:
+            plaintext = decompressor.decompress(plaintext)
+        buffer += plaintext
+        position = 0
+        complete = []
+        while len(buffer) - position >= LENGTH.size:
+            (size,) = LENGTH.unpack_from(buffer, position)
+            end = position + LENGTH.size + size
+            if len(buffer) < end:
+                break
+            complete.append(buffer[position + LENGTH.size:end])
+            position = end
+        del buffer[:position]
+        # Decodificar os registros completos do bloco numa única chamada
+        if complete:
+            yield from _decoder.decode("[" + b",".join(complete).decode() + "]")
+        if last:
+            break
+    if buffer:
+        raise VaultFormatError("Registro incompleto no cofre")
@@ -1,10 +1,13 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QMainWindow
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtWidgets import QApplication, QMainWindow, QProgressDialog, QMessageBox
 from PyQt5.QtGui import QIcon, QFont, QPalette, QColor
 from PyQt5.QtCore import Qt
+from core import kdf
 from core.config import Config
 from core.user_manager import UserManager
+from ui.async_task import AsyncTask
 from ui.login_widget import LoginWidget, RegisterWidget
 from ui.password_widget import PasswordWidget
 
@@ -113,8 +116,10 @@ class MainWindow(QMainWindow):
                 login_widget.password_input.clear()
         
         def handle_successful_login(username):
-            # Criar e mostrar o widget de senhas
-            password_widget = PasswordWidget(self.user_manager.get_user_settings(username)["password_file"])
+            # Criar e mostrar o widget de senhas; a chave do cofre é aberta com
+            # a KEK guardada no login, sem rodar o PBKDF2 de novo
+            password_widget = PasswordWidget(self.user_manager.get_user_settings(username)["password_file"],
+                                             self.user_manager.get_vault_key(username))
             self.setCentralWidget(password_widget)
             self.show()
         
@@ -138,9 +143,41 @@ def main():
     # Aplicar tema escuro e estilos
     set_dark_theme(app)
     
-    # Criar e mostrar a janela principal
-    window = MainWindow(UserManager())
-    window.show()
+    def start(kdf_params):
+        # Criar e mostrar a janela principal
+        app.main_window = MainWindow(UserManager(kdf_params=kdf_params))
+        app.main_window.show()
+    
+    # Custo do KDF das senhas calibrado para este computador na primeira execução;
+    # a calibração leva alguns segundos e roda fora da thread da interface
+    app_settings = config.get_app_settings()
+    if 'kdf' in app_settings:
+        start(app_settings['kdf'])
+    else:
+        progress = QProgressDialog("Ajustando a proteção das senhas para este computador...", None, 0, 0)
+        progress.setWindowTitle("Gerenciador de Senhas")
+        # Fechar o aviso não deve encerrar o programa antes da janela principal existir
+        progress.setAttribute(Qt.WA_QuitOnClose, False)
+        progress.show()
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        task = AsyncTask(executor.submit(kdf.calibrate, app_settings.get('kdf_target_ms', 500) / 1000))
+        
+        def calibrated(params):
+            config.update_app_setting('kdf', params)
+            progress.close()
+            start(params)
+        
+        def calibration_failed(error):
+            # Sem calibração usa os parâmetros padrão, sem gravá-los, e tenta de novo na próxima execução
+            progress.close()
+            QMessageBox.warning(None, "Aviso", f"Não foi possível calibrar a proteção das senhas: {error}")
+            start(kdf.DEFAULT_PARAMS)
+        
+        task.succeeded.connect(calibrated)
+        task.failed.connect(calibration_failed)
+        task.start()
+        executor.shutdown(wait=False)
     
     sys.exit(app.exec_())
 
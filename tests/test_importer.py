@@ -0,0 +1,46 @@
+import io
+import json
+
+import pytest
+
+from core import importer
+from core.importer import PasswordImporter, read_json
+from core.password_manager import PasswordManager
+
+
+def read_all(text):
+    return list(read_json(io.BytesIO(text.encode())))
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 7, 64 * 1024])
+def test_read_json_across_chunk_boundaries(monkeypatch, read_size):
+    monkeypatch.setattr(importer, "READ_SIZE", read_size)
+    assert read_all("[1234567, 2]") == [1234567, 2]
+    assert read_all(' [ {"a": [1, 2]} ,"x", true, null ] ') == [{"a": [1, 2]}, "x", True, None]
+    assert read_all("[]") == []
+
+
+@pytest.mark.parametrize("text", ['[{"a":1} {"b":2}]', '[,,{"a":1}]', '[1,]', '[1,,2]', '{"a":1}', '[1, 2'])
+def test_read_json_rejects_malformed_lists(monkeypatch, text):
+    monkeypatch.setattr(importer, "READ_SIZE", 3)
+    with pytest.raises(ValueError):
+        read_all(text)
+
+
+def test_import_json_reports_skipped_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "READ_SIZE", 5)
+    rows = [{"website": "a.com", "username": "ana", "password": "1", "group": "Trabalho"},
+            12345678,
+            {"website": "b.com", "username": "bia"},
+            {"website": "a.com", "username": "ana", "password": "1", "group": "Trabalho"},
+            {"website": "c.com", "username": "caio", "password": "3"}]
+    path = tmp_path / "in.json"
+    path.write_text(json.dumps(rows))
+    pm = PasswordManager(str(tmp_path / "passwords.enc"), durability="none")
+    summary = PasswordImporter(pm, str(path), batch_size=2).run()
+    assert summary.imported == 2
+    assert summary.skipped == [(2, "Formato inválido"), (3, "Campos obrigatórios ausentes")]
+    assert summary.duplicates == [("Trabalho", "a.com")]
+    assert summary.groups_created == ["Trabalho"]
+    assert pm.get_password("c.com", "Geral") == "3"
+    pm.close()
@@ -0,0 +1,59 @@
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+
+from core.journal import Journal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return Journal(str(tmp_path / "vault.journal"), Fernet(Fernet.generate_key()), "none")
+
+
+def write(journal, *records):
+    journal.write(journal.encode(list(records)))
+
+
+def test_read_from_returns_records_and_end_offset(journal):
+    write(journal, {"seq": 1})
+    middle = journal.size()
+    write(journal, {"seq": 2}, {"seq": 3})
+    records, offset = journal.read_from(0)
+    assert [record["seq"] for record in records] == [1, 2, 3]
+    assert offset == journal.size()
+    records, offset = journal.read_from(middle)
+    assert [record["seq"] for record in records] == [2, 3]
+    assert journal.read_from(offset) == ([], offset)
+
+
+def test_missing_journal_is_empty(journal):
+    assert journal.read_from(0) == ([], 0)
+
+
+def test_torn_tail_is_skipped_and_truncated(journal):
+    write(journal, {"seq": 1})
+    end = journal.size()
+    with open(journal.path, "ab") as f:
+        f.write(b"gAAAAABtorn")
+    records, offset = journal.read_from(0)
+    assert [record["seq"] for record in records] == [1]
+    assert offset == end
+    journal.truncate(offset)
+    write(journal, {"seq": 2})
+    assert [record["seq"] for record in journal.read_from(0)[0]] == [1, 2]
+
+
+def test_corrupt_line_before_the_end_raises(journal):
+    write(journal, {"seq": 1})
+    with open(journal.path, "ab") as f:
+        f.write(b"gAAAAABcorrupt\n")
+    write(journal, {"seq": 2})
+    with pytest.raises(InvalidToken):
+        journal.read_from(0)
+
+
+def test_discard_prefix_keeps_later_records(journal):
+    write(journal, {"seq": 1})
+    offset = journal.size()
+    write(journal, {"seq": 2})
+    journal.discard_prefix(offset)
+    assert [record["seq"] for record in journal.read_from(0)[0]] == [2]
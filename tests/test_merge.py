@@ -0,0 +1,120 @@
+from core.merge import merge_entry, merge_vaults
+
+
+def entry(username, last_modified, password="token"):
+    return {"username": username, "password": password, "last_modified": last_modified}
+
+
+def state(groups, default_group="Geral"):
+    return {"groups": groups, "default_group": default_group}
+
+
+def test_one_sided_changes_take_the_other_side():
+    base = entry("ana", 1)
+    edited = entry("ana2", 2)
+    assert merge_entry(base, base, edited) == (edited, None)
+    assert merge_entry(base, edited, base) == (edited, None)
+    assert merge_entry(base, None, base) == (None, None)
+    assert merge_entry(None, None, edited) == (edited, None)
+    # Mesma edição dos dois lados, ou só a senha recifrada: não é conflito
+    assert merge_entry(base, edited, dict(edited, password="outro")) == (edited, None)
+
+
+def test_both_modified_newer_edit_wins_and_ours_wins_a_tie():
+    base = entry("ana", 1)
+    ours, theirs = entry("ana-nossa", 3), entry("ana-deles", 2)
+    merged, conflict = merge_entry(base, ours, theirs)
+    assert merged is ours
+    assert conflict == {"kind": "both_modified", "resolution": "ours", "ours": ours, "theirs": theirs}
+    merged, conflict = merge_entry(base, theirs, ours)
+    assert merged is ours and conflict["resolution"] == "theirs"
+    tie = entry("ana-deles", 3)
+    merged, conflict = merge_entry(base, ours, tie)
+    assert merged is ours and conflict["resolution"] == "ours"
+
+
+def test_both_added_is_a_conflict():
+    ours, theirs = entry("ana", 1), entry("bia", 2)
+    merged, conflict = merge_entry(None, ours, theirs)
+    assert merged is theirs
+    assert conflict["kind"] == "both_added" and conflict["resolution"] == "theirs"
+
+
+def test_edit_beats_a_deletion_on_either_side():
+    base, edited = entry("ana", 1), entry("ana2", 2)
+    merged, conflict = merge_entry(base, edited, None)
+    assert merged is edited
+    assert conflict["kind"] == "modify_delete" and conflict["resolution"] == "ours"
+    merged, conflict = merge_entry(base, None, edited)
+    assert merged is edited
+    assert conflict["kind"] == "modify_delete" and conflict["resolution"] == "theirs"
+
+
+def test_merge_vaults_combines_changes_and_reports_conflicts():
+    base = state({"Geral": {"a.com": entry("a", 1), "b.com": entry("b", 1), "c.com": entry("c", 1)}})
+    ours = state({"Geral": {"a.com": entry("a-nossa", 2), "b.com": entry("b", 1), "d.com": entry("d", 2)}})
+    theirs = state({"Geral": {"a.com": entry("a-deles", 3), "b.com": entry("b2", 2), "c.com": entry("c", 1)}})
+    merged, conflicts = merge_vaults(base, ours, theirs)
+    assert merged["groups"] == {"Geral": {"a.com": entry("a-deles", 3), "b.com": entry("b2", 2),
+                                          "d.com": entry("d", 2)}}
+    assert [(c["group"], c["website"], c["kind"], c["resolution"]) for c in conflicts] == [
+        ("Geral", "a.com", "both_modified", "theirs")]
+
+
+def test_deleted_group_keeps_only_the_other_sides_edits():
+    base = state({"Geral": {}, "Trabalho": {"a.com": entry("a", 1), "b.com": entry("b", 1)}})
+    ours = state({"Geral": {}})
+    theirs = state({"Geral": {}, "Trabalho": {"a.com": entry("a2", 2), "b.com": entry("b", 1)}})
+    merged, conflicts = merge_vaults(base, ours, theirs)
+    # A entrada editada sobrevive à exclusão; a intocada vai junto com o grupo
+    assert merged["groups"]["Trabalho"] == {"a.com": entry("a2", 2)}
+    assert [(c["group"], c["website"], c["kind"], c["resolution"]) for c in conflicts] == [
+        ("Trabalho", "a.com", "modify_delete", "theirs")]
+    # Mesmo caso com os lados trocados
+    merged, _ = merge_vaults(base, theirs, ours)
+    assert merged["groups"]["Trabalho"] == {"a.com": entry("a2", 2)}
+
+
+def test_deleted_untouched_group_is_dropped():
+    base = state({"Geral": {}, "Trabalho": {"a.com": entry("a", 1)}})
+    ours = state({"Geral": {}})
+    merged, conflicts = merge_vaults(base, ours, base)
+    assert merged["groups"] == {"Geral": {}}
+    assert conflicts == []
+    merged, _ = merge_vaults(base, base, ours)
+    assert merged["groups"] == {"Geral": {}}
+
+
+def test_groups_created_on_one_side_are_kept_even_when_empty():
+    base = state({"Geral": {}})
+    ours = state({"Geral": {}, "Nosso": {}})
+    theirs = state({"Geral": {}, "Deles": {"a.com": entry("a", 1)}})
+    merged, conflicts = merge_vaults(base, ours, theirs)
+    # Ordem: os nossos grupos, depois os novos do outro lado
+    assert list(merged["groups"]) == ["Geral", "Nosso", "Deles"]
+    assert merged["groups"]["Deles"] == {"a.com": entry("a", 1)}
+    assert conflicts == []
+
+
+def test_default_group_resolution():
+    groups = {"Geral": {}, "Trabalho": {}, "Casa": {}}
+    base = state(dict(groups), "Geral")
+    # Só o outro lado mudou o padrão: vale o dele
+    merged, _ = merge_vaults(base, state(dict(groups), "Geral"), state(dict(groups), "Trabalho"))
+    assert merged["default_group"] == "Trabalho"
+    # Os dois mudaram: vale o nosso
+    merged, _ = merge_vaults(base, state(dict(groups), "Casa"), state(dict(groups), "Trabalho"))
+    assert merged["default_group"] == "Casa"
+    # O padrão deles foi excluído do nosso lado: volta para o nosso
+    ours = state({"Geral": {}, "Casa": {}}, "Geral")
+    merged, _ = merge_vaults(base, ours, state(dict(groups), "Trabalho"))
+    assert "Trabalho" not in merged["groups"]
+    assert merged["default_group"] == "Geral"
+    # Nenhum dos dois existe mais: o primeiro grupo que restou
+    ours = state({"Casa": {}}, "Geral")
+    theirs = state({"Casa": {}}, "Trabalho")
+    merged, _ = merge_vaults(base, ours, theirs)
+    assert merged["default_group"] == "Casa"
+    # Nenhum grupo restou
+    merged, _ = merge_vaults(base, state({}, "Geral"), state({}, "Trabalho"))
+    assert merged == {"groups": {}, "default_group": "Geral"}
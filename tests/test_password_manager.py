@@ -0,0 +1,177 @@
+import threading
+
+import pytest
+
+from core.entry_cipher import EntryCipher
+from core.password_manager import PasswordManager
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    return str(tmp_path / "data" / "passwords.enc")
+
+
+def open_vault(path, **kwargs):
+    return PasswordManager(path, durability="none", **kwargs)
+
+
+def test_journal_is_replayed_on_open(vault_path):
+    pm = open_vault(vault_path)
+    pm.add_entry("a.com", "ana", "1")
+    pm.create_group("Trabalho")
+    pm.add_entry("b.com", "bia", "2", "Trabalho")
+    pm.move_entry("a.com", "Geral", "Trabalho")
+    pm.close()
+    assert pm.journal.size() > 0
+    pm = open_vault(vault_path)
+    assert pm.list_groups() == ["Geral", "Trabalho"]
+    assert sorted(pm.get_entries("Trabalho")) == ["a.com", "b.com"]
+    assert pm.get_password("a.com") == "1"
+    pm.close()
+
+
+def test_torn_journal_line_does_not_lose_later_entries(vault_path):
+    pm = open_vault(vault_path)
+    pm.add_entry("a.com", "ana", "1")
+    with open(pm.journal_file, "ab") as f:
+        f.write(b"gAAAAABtorn")
+    pm.add_entry("b.com", "bia", "2")
+    pm.add_entry("c.com", "caio", "3")
+    pm.close()
+    pm = open_vault(vault_path)
+    assert sorted(pm.get_entries("Geral")) == ["a.com", "b.com", "c.com"]
+    pm.close()
+
+
+def test_torn_line_left_by_a_crash_is_cut_on_open(vault_path):
+    pm = open_vault(vault_path)
+    pm.add_entry("a.com", "ana", "1")
+    pm.close()
+    with open(pm.journal_file, "ab") as f:
+        f.write(b"gAAAAABtorn")
+    pm = open_vault(vault_path)
+    pm.add_entry("b.com", "bia", "2")
+    pm.close()
+    pm = open_vault(vault_path)
+    assert sorted(pm.get_entries("Geral")) == ["a.com", "b.com"]
+    pm.close()
+
+
+def test_failed_transaction_is_rolled_back(vault_path):
+    pm = open_vault(vault_path)
+    pm.add_entry("a.com", "ana", "1")
+    with pytest.raises(RuntimeError):
+        with pm.transaction():
+            pm.update_entry("a.com", "ana", "changed")
+            pm.add_entry("b.com", "bia", "2")
+            pm.create_group("Temp")
+            raise RuntimeError("interrompida")
+    assert pm.get_password("a.com") == "1"
+    assert not pm.has_entry("b.com", "Geral")
+    assert "Temp" not in pm.list_groups()
+    pm.close()
+    pm = open_vault(vault_path)
+    assert sorted(pm.get_entries("Geral")) == ["a.com"]
+    assert pm.get_password("a.com") == "1"
+    pm.close()
+
+
+def test_compaction_folds_journal_into_snapshot(vault_path):
+    pm = open_vault(vault_path)
+    pm.JOURNAL_COMPACT_THRESHOLD = 2000
+    for i in range(50):
+        pm.add_entry(f"site{i}.com", "user", f"p{i}")
+    pm.wait_for_compaction()
+    pm.close()
+    assert pm.journal.size() < 2000
+    pm = open_vault(vault_path)
+    assert len(pm.get_entries("Geral")) == 50
+    assert pm.get_password("site49.com") == "p49"
+    pm.close()
+
+
+def test_search_index_built_in_background_sees_concurrent_edits(vault_path):
+    pm = open_vault(vault_path)
+    for group in ("Trabalho", "Casa"):
+        pm.create_group(group)
+        for i in range(20):
+            pm.add_entry(f"{group.lower()}{i}.com", "user", "p", group)
+    pm.close()
+    pm = open_vault(vault_path)
+    # Um grupo indexado e outro não: as edições valem para os dois
+    pm._index_next_group()
+    pm.add_entry("novo-trabalho.com", "user", "p", "Trabalho")
+    pm.add_entry("novo-casa.com", "user", "p", "Casa")
+    pm.delete_entry("casa0.com", "Casa")
+    pm.delete_entry("trabalho0.com", "Trabalho")
+    pm.build_search_index_async().result(timeout=10)
+    assert sorted(pm.search("novo")) == [("Casa", "novo-casa.com"), ("Trabalho", "novo-trabalho.com")]
+    assert pm.search("casa0.com") == [] and pm.search("trabalho0.com") == []
+    assert len(pm.search("casa")) == 20
+    pm.close()
+
+
+def test_reload_updates_loaded_group_in_place(vault_path):
+    ours = open_vault(vault_path)
+    ours.add_entry("a.com", "ana", "1")
+    ours.add_entry("b.com", "bia", "2")
+    ours.save()
+    entries = ours.get_entries("Geral")
+    changes = []
+    ours.add_change_listener(changes.append)
+    theirs = open_vault(vault_path)
+    theirs.update_entry("a.com", "ana2", "1")
+    theirs.delete_entry("b.com")
+    theirs.add_entry("c.com", "caio", "3")
+    theirs.save()
+    theirs.close()
+    ours.refresh()
+    assert ours.get_entries("Geral") is entries
+    assert sorted(entries) == ["a.com", "c.com"]
+    assert entries["a.com"]["username"] == "ana2"
+    assert sorted((change["type"], change["website"]) for change in changes) == [
+        ("entry_added", "c.com"), ("entry_removed", "b.com"), ("entry_updated", "a.com")]
+    ours.close()
+
+
+def test_failed_background_save_is_reported_and_retried(vault_path, monkeypatch):
+    pm = open_vault(vault_path, async_save=True)
+    pm.SAVE_DEBOUNCE = 0
+    pm.SAVE_RETRY_DELAY = 0.01
+    errors = []
+    pm.add_error_listener(errors.append)
+    write = pm.journal.write
+    failures = iter([OSError("disco cheio")] * 2)
+
+    def flaky_write(line):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        write(line)
+
+    monkeypatch.setattr(pm.journal, "write", flaky_write)
+    saved = threading.Event()
+    pm.add_durable_listener(lambda seq: saved.set())
+    pm.add_entry("a.com", "ana", "1")
+    assert saved.wait(5)
+    assert [str(error) for error in errors] == ["disco cheio", "disco cheio"]
+    pm.close()
+    pm = open_vault(vault_path)
+    assert pm.get_password("a.com") == "1"
+    pm.close()
+
+
+def test_algorithm_upgrade_is_written_on_close(vault_path, monkeypatch):
+    pm = open_vault(vault_path, entry_algorithm="fernet")
+    pm.add_entry("a.com", "ana", "1")
+    pm.save()
+    pm.close()
+    upgrades = []
+    upgrade = EntryCipher.upgrade
+    monkeypatch.setattr(EntryCipher, "upgrade", lambda self, token: upgrades.append(token) or upgrade(self, token))
+    for _ in range(2):
+        pm = open_vault(vault_path)
+        assert pm.get_password("a.com") == "1"
+        pm.close()
+    # Convertida na primeira abertura e gravada no close()
+    assert len(upgrades) == 1
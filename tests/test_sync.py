@@ -0,0 +1,123 @@
+import asyncio
+import shutil
+
+import pytest
+
+from core.password_manager import PasswordManager
+from core.sync_client import SyncClient
+from core.sync_server import SyncServer
+
+
+def open_vault(path):
+    return PasswordManager(path, durability="none")
+
+
+def sync_all(*clients):
+    async def run():
+        server = SyncServer()
+        address = await server.start()
+        try:
+            results = []
+            for client in clients:
+                client.address = address[:2]
+                results.append(await client.sync())
+            return results
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def copies(tmp_path):
+    ours_dir, theirs_dir = tmp_path / "ours", tmp_path / "theirs"
+    ours_dir.mkdir()
+    pm = open_vault(str(ours_dir / "passwords.enc"))
+    pm.create_group("Trabalho")
+    for i in range(5):
+        pm.add_entry(f"site{i}.com", "user", str(i), "Trabalho" if i % 2 else "Geral")
+    pm.close()
+    shutil.copytree(ours_dir, theirs_dir)
+    return open_vault(str(ours_dir / "passwords.enc")), open_vault(str(theirs_dir / "passwords.enc"))
+
+
+def test_first_sync_does_not_send_back_what_it_received(tmp_path):
+    ours, theirs = copies(tmp_path)
+    ours_client, theirs_client = SyncClient(ours, None), SyncClient(theirs, None)
+    first, second = sync_all(ours_client, theirs_client)
+    assert first == {"pulled": 0, "pushed": 7}
+    assert second == {"pulled": 7, "pushed": 0}
+    ours.close()
+    theirs.close()
+
+
+def test_later_syncs_only_read_changed_entries(tmp_path, monkeypatch):
+    ours, theirs = copies(tmp_path)
+    ours_client, theirs_client = SyncClient(ours, None), SyncClient(theirs, None)
+    sync_all(ours_client, theirs_client, ours_client)
+
+    def no_full_scan():
+        raise AssertionError("o cofre inteiro foi lido")
+
+    monkeypatch.setattr(ours, "get_all_entries", no_full_scan)
+    ours.update_entry("site0.com", "changed", "x", "Geral")
+    ours.add_entry("new.com", "nina", "n", "Geral")
+    ours.move_entry("site2.com", "Geral", "Trabalho")
+    ours.delete_group("Trabalho")
+    ours.create_group("Casa")
+    ours.add_entry("casa.com", "caio", "c", "Casa")
+    pushed, pulled = sync_all(ours_client, theirs_client)
+    assert pushed["pushed"] == pulled["pulled"]
+    assert theirs.list_groups() == ["Geral", "Casa"]
+    assert sorted(theirs.get_entries("Geral")) == ["new.com", "site0.com", "site4.com"]
+    assert theirs.get_entry("site0.com", "Geral")["username"] == "changed"
+    assert theirs.get_password("casa.com", "Casa") == "c"
+    ours.close()
+    theirs.close()
+
+
+def test_sync_after_key_rotation(tmp_path):
+    ours_dir, theirs_dir = tmp_path / "ours", tmp_path / "theirs"
+    ours_dir.mkdir()
+    ours = open_vault(str(ours_dir / "passwords.enc"))
+    ours.add_entry("a.com", "ana", "1")
+    ours.close()
+    # Outra cópia do mesmo cofre: mesma chave
+    shutil.copytree(ours_dir, theirs_dir)
+    ours = open_vault(str(ours_dir / "passwords.enc"))
+    theirs = open_vault(str(theirs_dir / "passwords.enc"))
+    ours_client, theirs_client = SyncClient(ours, None), SyncClient(theirs, None)
+    sync_all(ours_client, theirs_client)
+    ours.rotate_key()
+    ours.wait_for_rotation()
+    assert len(ours.keys) == 1
+    ours.add_entry("b.com", "bia", "2")
+    # O estado continua legível depois que a rotação descartou a chave antiga
+    ours_client = SyncClient(ours, None)
+    sync_all(ours_client, theirs_client)
+    assert theirs.get_password("b.com") == "2"
+    theirs.update_entry("a.com", "ana", "changed")
+    sync_all(theirs_client, ours_client)
+    assert ours.get_password("a.com") == "changed"
+    ours.close()
+    theirs.close()
+
+
+def test_server_rejects_a_malformed_batch_without_keeping_part_of_it(tmp_path):
+    vault, origin = "ab" * 32, "cd" * 16
+    good = [{"counter": 1, "id": "x", "payload": "p1"}, {"counter": 2, "id": "y", "payload": "p2"}]
+
+    async def run():
+        server = SyncServer(str(tmp_path))
+        bad = [good[0], {"counter": 2, "id": "y"}]
+        with pytest.raises(KeyError):
+            await server._dispatch({"op": "push", "vault": vault, "origin": origin, "deltas": bad})
+        assert (await server._dispatch({"op": "pull", "vault": vault, "vector": {}}))["deltas"] == []
+        await server._dispatch({"op": "push", "vault": vault, "origin": origin, "deltas": good})
+        await server.close()
+        # Reiniciado, o servidor lê do disco o que aceitou
+        server = SyncServer(str(tmp_path))
+        response = await server._dispatch({"op": "pull", "vault": vault, "vector": {}})
+        await server.close()
+        return [delta["payload"] for delta in response["deltas"]]
+
+    assert asyncio.run(run()) == ["p1", "p2"]
@@ -0,0 +1,215 @@
+import base64
+import json
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from core import kdf
+from core.password_manager import PasswordManager
+from core.storage import is_wrapped, read_keys
+from core.sync_client import SyncClient
+from core.user_manager import UserManager
+
+FAST_KDF = {"algorithm": "pbkdf2-sha256", "iterations": 1000}
+
+
+@pytest.fixture(autouse=True)
+def data_cwd(tmp_path, monkeypatch):
+    # O UserManager guarda tudo em data/ dentro do diretório atual
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def open_users(**kwargs):
+    return UserManager(durability="none", kdf_params=kwargs.pop("kdf_params", FAST_KDF), **kwargs)
+
+
+def legacy_profile(password, email, is_admin=False):
+    """A profile as the first versions wrote it, with the PBKDF2 output as hash."""
+    salt = os.urandom(16)
+    user_id = os.urandom(8).hex()
+    return {
+        "id": user_id,
+        "salt": base64.b64encode(salt).decode(),
+        "password": base64.b64encode(kdf.derive(password, salt, kdf.LEGACY_PARAMS)).decode(),
+        "email": email,
+        "is_admin": is_admin,
+        "settings": {"theme": "dark", "auto_logout": 30,
+                     "password_file": os.path.join("data", user_id, "passwords.enc")}
+    }
+
+
+def write_legacy_users(profiles):
+    os.makedirs("data", exist_ok=True)
+    key = Fernet.generate_key()
+    with open(os.path.join("data", "users.key"), "wb") as f:
+        f.write(key)
+    legacy = {"profiles": profiles, "email_map": {user["email"]: user["id"] for user in profiles.values()}}
+    with open(os.path.join("data", "users.enc"), "wb") as f:
+        f.write(Fernet(key).encrypt(json.dumps(legacy).encode()))
+
+
+def test_legacy_users_file_is_split_into_profiles():
+    profiles = {"ana": legacy_profile("senha-ana", "ana@x.com", True),
+                "bia": legacy_profile("senha-bia", "bia@x.com")}
+    write_legacy_users(profiles)
+    users = open_users()
+    for user in profiles.values():
+        assert os.path.exists(os.path.join("data", user["id"], "profile.enc"))
+    # Abrir de novo: o índice já está no formato novo
+    users = open_users()
+    assert users.users["format"] == "per-user"
+    assert "profiles" not in users.users
+    assert users.verify_password("ana", "senha-ana")
+    assert not users.verify_password("bia", "senha-ana")
+    assert users.verify_password("bia", "senha-bia")
+    assert users.is_admin("ana") and not users.is_admin("bia")
+    assert users.get_user_by_email("bia@x.com")[0] == "bia"
+    assert users.get_username_by_id(profiles["ana"]["id"]) == "ana"
+
+
+def test_rename_and_delete_user_survive_a_restart():
+    users = open_users()
+    ana_id = users.create_user("ana", "senha-ana", "ana@x.com")
+    users.create_user("bia", "senha-bia", "bia@x.com")
+    assert users.rename_user("ana", "ana2")
+    with pytest.raises(ValueError):
+        users.rename_user("ana2", "bia")
+    assert users.delete_user("bia")
+    assert not users.delete_user("bia")
+    users = open_users()
+    assert sorted(users.users["users"]) == ["ana2"]
+    assert users.verify_password("ana2", "senha-ana")
+    assert not users.verify_password("ana", "senha-ana")
+    assert users.get_user_by_email("ana@x.com")[0] == "ana2"
+    assert users.get_user_by_email("bia@x.com") == (None, None)
+    assert users.get_username_by_id(ana_id) == "ana2"
+    # O email da usuária excluída pode ser usado de novo
+    users.create_user("bia", "outra", "bia@x.com")
+
+
+def test_interrupted_migration_is_redone_on_the_next_start(monkeypatch):
+    profiles = {"ana": legacy_profile("senha-ana", "ana@x.com"),
+                "bia": legacy_profile("senha-bia", "bia@x.com")}
+    write_legacy_users(profiles)
+    save_profile = UserManager._save_profile
+    saved = []
+
+    def crash_on_second(self, username, user_id=None):
+        if saved:
+            raise OSError("queda no meio da migração")
+        saved.append(username)
+        save_profile(self, username, user_id)
+
+    monkeypatch.setattr(UserManager, "_save_profile", crash_on_second)
+    with pytest.raises(OSError):
+        open_users()
+    monkeypatch.setattr(UserManager, "_save_profile", save_profile)
+    users = open_users()
+    assert users.verify_password("ana", "senha-ana")
+    assert users.verify_password("bia", "senha-bia")
+    assert users.users["format"] == "per-user"
+
+
+def open_vault(users, username):
+    settings = users.get_user_settings(username)
+    return PasswordManager(settings["password_file"], durability="none", kek=users.get_vault_key(username))
+
+
+def test_unlock_wraps_the_vault_key_with_the_users_kek():
+    users = open_users()
+    users.create_user("ana", "senha-ana", "ana@x.com")
+    pm = open_vault(users, "ana")
+    pm.add_entry("a.com", "ana", "1")
+    pm.close()
+    assert is_wrapped(pm.key_file)
+    users.logout("ana")
+    assert users.unlock("ana", "errada") is None
+    kek = users.unlock("ana", "senha-ana")
+    assert kek is not None and kek == users.get_vault_key("ana")
+    pm = open_vault(users, "ana")
+    assert pm.get_password("a.com") == "1"
+    pm.close()
+    with pytest.raises(ValueError):
+        PasswordManager(pm.password_file, durability="none")
+
+
+def test_change_password_rewraps_vault_and_sync_keys():
+    users = open_users()
+    users.create_user("ana", "senha-ana", "ana@x.com")
+    pm = open_vault(users, "ana")
+    pm.add_entry("a.com", "ana", "1")
+    SyncClient(pm, None)._save_state()
+    pm.close()
+    old_kek = users.get_vault_key("ana")
+    assert users.change_password("ana", "nova")
+    users.logout("ana")
+    assert users.unlock("ana", "senha-ana") is None
+    assert users.unlock("ana", "nova") is not None
+    pm = open_vault(users, "ana")
+    assert pm.get_password("a.com") == "1"
+    assert SyncClient(pm, None).sync_key == pm.keys[0]
+    pm.close()
+    # A KEK antiga não abre mais nenhum dos dois arquivos de chave
+    for key_file in (pm.key_file, f"{pm.password_file}.sync.key"):
+        with pytest.raises(ValueError):
+            read_keys(key_file, old_kek)
+
+
+def test_change_password_without_a_login_needs_the_current_password():
+    users = open_users()
+    users.create_user("ana", "senha-ana", "ana@x.com")
+    open_vault(users, "ana").close()
+    users.logout("ana")
+    with pytest.raises(ValueError):
+        users.change_password("ana", "nova")
+    with pytest.raises(ValueError):
+        users.change_password("ana", "nova", current_password="errada")
+    assert users.change_password("ana", "nova", current_password="senha-ana")
+    users.logout("ana")
+    assert users.unlock("ana", "nova") is not None
+    open_vault(users, "ana").close()
+
+
+def test_login_upgrades_a_legacy_hash():
+    write_legacy_users({"ana": legacy_profile("senha-ana", "ana@x.com")})
+    users = open_users()
+    assert users._profile("ana").get("hash_version", 1) == 1
+    assert users.unlock("ana", "errada") is None
+    assert users._profile("ana").get("hash_version", 1) == 1
+    assert users.unlock("ana", "senha-ana") is not None
+    user = users._profile("ana")
+    assert user["hash_version"] == 2
+    assert user["kdf"] == FAST_KDF
+    open_vault(users, "ana").close()
+    # A versão nova do hash vale depois de reiniciar, sem a KEK em cache
+    users = open_users()
+    assert users._profile("ana")["hash_version"] == 2
+    assert not users.verify_password("ana", "errada")
+    assert users.unlock("ana", "senha-ana") is not None
+    open_vault(users, "ana").close()
+
+
+def test_login_rehashes_with_the_current_kdf_params():
+    users = open_users()
+    users.create_user("ana", "senha-ana", "ana@x.com")
+    pm = open_vault(users, "ana")
+    pm.add_entry("a.com", "ana", "1")
+    pm.close()
+    stronger = {"algorithm": "pbkdf2-sha256", "iterations": 2000}
+    users = open_users(kdf_params=stronger)
+    assert users._profile("ana")["kdf"] == FAST_KDF
+    assert users.unlock("ana", "senha-ana") is not None
+    assert users._profile("ana")["kdf"] == stronger
+    # O arquivo de chave do cofre foi reembrulhado com a KEK nova
+    pm = open_vault(users, "ana")
+    assert pm.get_password("a.com") == "1"
+    pm.close()
+    users = open_users(kdf_params=stronger)
+    assert users.unlock("ana", "errada") is None
+    assert users.unlock("ana", "senha-ana") is not None
+    assert users._profile("ana")["kdf"] == stronger
+    pm = open_vault(users, "ana")
+    assert pm.get_password("a.com") == "1"
+    pm.close()
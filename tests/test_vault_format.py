@@ -0,0 +1,103 @@
+import io
+import json
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+
+from core import vault_format
+from core.password_manager import PasswordManager
+from core.vault_format import HEADER, LENGTH, ContainerWriter, VaultFormatError, read_records
+
+RECORDS = [["site%d.com" % i, {"username": "user%d" % i, "password": "x" * (i % 50)}] for i in range(300)]
+
+
+def write(records, key, chunk_size=256, compression="none"):
+    fp = io.BytesIO()
+    writer = ContainerWriter(fp, key, chunk_size=chunk_size, compression=compression)
+    for record in records:
+        writer.write_record(record)
+    writer.close()
+    return fp.getvalue()
+
+
+def read(data, key, old_keys=()):
+    return list(read_records(io.BytesIO(data), key, old_keys))
+
+
+def split_chunks(data):
+    header, chunks, position = data[:HEADER.size], [], HEADER.size
+    while position < len(data):
+        (length,) = LENGTH.unpack_from(data, position)
+        end = position + LENGTH.size + length
+        chunks.append(data[position:end])
+        position = end
+    return header, chunks
+
+
+@pytest.mark.parametrize("compression", sorted(vault_format.COMPRESSION))
+def test_round_trip_over_many_chunks(compression):
+    key = os.urandom(32)
+    data = write(RECORDS, key, compression=compression)
+    # Registros maiores que o bloco atravessam vários blocos
+    data_big = write([["big", "y" * 2000]] + RECORDS, key, compression=compression)
+    assert len(split_chunks(data)[1]) > 3
+    assert read(data, key) == RECORDS
+    assert read(data_big, key) == [["big", "y" * 2000]] + RECORDS
+    assert read(write([], key, compression=compression), key) == []
+
+
+def test_old_keys_open_a_container_from_before_a_rotation():
+    old, new = os.urandom(32), os.urandom(32)
+    data = write(RECORDS, old)
+    assert read(data, new, old_keys=[old]) == RECORDS
+    with pytest.raises(InvalidTag):
+        read(data, new)
+
+
+def test_truncation_is_detected():
+    key = os.urandom(32)
+    data = write(RECORDS, key)
+    header, chunks = split_chunks(data)
+    # Sem o último bloco, o penúltimo não foi selado como último
+    with pytest.raises(InvalidTag):
+        read(header + b"".join(chunks[:-1]), key)
+    with pytest.raises(VaultFormatError):
+        read(data[:-5], key)
+    with pytest.raises(VaultFormatError):
+        read(data[:HEADER.size + 2], key)
+
+
+def test_reordered_or_swapped_chunks_are_rejected():
+    key = os.urandom(32)
+    header, chunks = split_chunks(write(RECORDS, key))
+    swapped = chunks[:]
+    swapped[1], swapped[2] = swapped[2], swapped[1]
+    with pytest.raises(InvalidTag):
+        read(header + b"".join(swapped), key)
+    # Bloco de outro contêiner com a mesma chave: outro prefixo de nonce
+    _, other = split_chunks(write(RECORDS, key))
+    with pytest.raises(InvalidTag):
+        read(header + b"".join([chunks[0], other[1], *chunks[2:]]), key)
+
+
+@pytest.mark.parametrize("nested", [True, False])
+def test_legacy_fernet_file_is_migrated_into_the_container(tmp_path, nested):
+    path = str(tmp_path / "passwords.enc")
+    key = Fernet.generate_key()
+    fernet = Fernet(key)
+    entries = {"a.com": {"username": "ana", "password": fernet.encrypt(b"1").decode(), "last_modified": 1.0}}
+    data = {"groups": {"Geral": entries, "Trabalho": {}}, "default_group": "Geral"} if nested else entries
+    with open(f"{path}.key", "wb") as f:
+        f.write(key)
+    with open(path, "wb") as f:
+        f.write(fernet.encrypt(json.dumps(data).encode()))
+    pm = PasswordManager(path, durability="none")
+    pm.close()
+    with open(path, "rb") as f:
+        assert vault_format.is_container(f.read(len(vault_format.MAGIC)))
+    pm = PasswordManager(path, durability="none")
+    assert pm.get_password("a.com") == "1"
+    assert pm.list_groups() == (["Geral", "Trabalho"] if nested else ["Geral"])
+    pm.close()
@@ -0,0 +1,33 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AsyncTask(QObject):
+    """Entrega o resultado de um Future na thread da interface via sinais."""
+    succeeded = pyqtSignal(object)  # Resultado do Future
+    failed = pyqtSignal(object)     # Exceção levantada pelo Future
+
+    def __init__(self, future, parent=None):
+        super().__init__(parent)
+        self.future = future
+        self.cancelled = False
+
+    def start(self):
+        """Passa a observar o Future; conecte os sinais antes de chamar."""
+        # O callback roda na thread de trabalho (ou aqui mesmo, se o Future
+        # já terminou); os sinais chegam aos slots pela fila de eventos
+        self.future.add_done_callback(self._done)
+        return self
+
+    def _done(self, future):
+        if self.cancelled or future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.failed.emit(error)
+        else:
+            self.succeeded.emit(future.result())
+
+    def cancel(self):
+        """Descarta o resultado; cancela o trabalho se ainda não começou."""
+        self.cancelled = True
+        self.future.cancel()
@@ -0,0 +1,386 @@
+from datetime import datetime
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionViewItem, QToolTip
+from PyQt5.QtCore import (Qt, QAbstractTableModel, QModelIndex, QRect, QEvent,
+                          pyqtSignal)
+from PyQt5.QtGui import QColor, QFont, QPainter, QPalette
+
+COLUMNS = ["Website", "Usuário", "Senha", "Modificado", "Ações"]
+WEBSITE, USERNAME, PASSWORD, MODIFIED, ACTIONS = range(len(COLUMNS))
+
+# Grupos de botões da coluna de ações: (ação, ícone, dica, tipo)
+ACTION_GROUPS = [
+    # Grupo 1: Ações Primárias
+    [
+        ("show", "👁", "Mostrar/Ocultar Senha (Alt+S)", "primary"),
+        ("copy_password", "🔑", "Copiar Senha (Alt+C)", "primary"),
+        ("copy_username", "👤", "Copiar Usuário (Alt+U)", "primary"),
+    ],
+    # Grupo 2: Ações de Edição
+    [
+        ("edit", "✏", "Editar Senha (Alt+E)", "secondary"),
+        ("open", "🌐", "Abrir Website (Alt+W)", "secondary"),
+    ],
+    # Grupo 3: Ações Secundárias
+    [
+        ("move", "📦", "Mover para Grupo (Alt+M)", "tertiary"),
+        ("delete", "🗑", "Excluir Senha (Del)", "tertiary"),
+    ],
+]
+
+BUTTON_COLORS = {
+    "primary": QColor("#2ecc71"),
+    "secondary": QColor("#27ae60"),
+    "tertiary": QColor("#16a085"),
+}
+BUTTON_SIZE = 36
+SEPARATOR_WIDTH = 13
+LINK_COLOR = QColor("#2ecc71")
+SEPARATOR_COLOR = QColor("#404040")
+
+
+def truncate_text(text, max_length):
+    """Trunca texto longo e adiciona ..."""
+    if len(text) > max_length:
+        return text[:max_length-3] + "..."
+    return text
+
+
+def format_time_ago(timestamp):
+    """Formata tempo relativo de forma amigável"""
+    now = datetime.now()
+    diff = now - timestamp
+
+    if diff.total_seconds() < 60:
+        return "Agora"
+    elif diff.total_seconds() < 3600:
+        minutes = int(diff.total_seconds() / 60)
+        return f"Há {minutes}min"
+    elif diff.days < 1:
+        return timestamp.strftime("%H:%M")
+    elif diff.days < 7:
+        return timestamp.strftime("%a %H:%M")
+    else:
+        return timestamp.strftime("%d/%m/%y")
+
+
+GROUP_ROLE = Qt.UserRole + 1
+
+
+class EntryTableModel(QAbstractTableModel):
+    """Entradas lidas diretamente dos dicionários do PasswordManager.
+
+    Exibe um grupo inteiro ou o resultado de uma busca em todos os grupos. O
+    modelo guarda apenas os pares (grupo, website) das linhas; os dados de
+    cada célula são calculados quando a vista pede, então só as linhas
+    visíveis custam algo.
+    """
+
+    def __init__(self, password_manager, parent=None):
+        super().__init__(parent)
+        self.password_manager = password_manager
+        self.group = None  # None enquanto exibe resultados de busca
+        self.entries = {}  # Grupo -> dicionário de entradas
+        self.rows = []
+        self.row_of = {}  # (grupo, website) -> linha, para consultas O(1)
+
+    def set_group(self, group):
+        """Passa a exibir as entradas de ``group``."""
+        self.beginResetModel()
+        self.group = group
+        # Uma importação pode estar alterando o grupo em outra thread: a
+        # lista de websites é copiada com a trava do cofre
+        self.entries = {group: self.password_manager.get_entries(group)}
+        self.rows = [(group, website) for website in self.password_manager.list_websites(group)]
+        self.row_of = {key: row for row, key in enumerate(self.rows)}
+        self.endResetModel()
+
+    def set_results(self, rows):
+        """Passa a exibir pares (grupo, website) vindos de uma busca."""
+        self.beginResetModel()
+        self.group = None
+        self.entries = {group: self.password_manager.get_entries(group)
+                        for group in {group for group, _ in rows}}
+        self.rows = list(rows)
+        self.row_of = {key: row for row, key in enumerate(self.rows)}
+        self.endResetModel()
+
+    def website(self, row):
+        return self.rows[row][1]
+
+    def group_of(self, row):
+        return self.rows[row][0]
+
+    def apply_change(self, change):
+        """Atualiza só as linhas afetadas por uma notificação do PasswordManager."""
+        if self.group is None:
+            return  # Resultados de busca são refeitos por quem os pediu
+        kind = change["type"]
+        if kind == "entry_moved":
+            if change["from_group"] == change["to_group"]:
+                return
+            if change["from_group"] == self.group:
+                self._remove_row(change["website"])
+            elif change["to_group"] == self.group:
+                self._upsert_row(change["website"])
+        elif change.get("group") != self.group:
+            return
+        elif kind in ("entry_added", "entry_updated"):
+            self._upsert_row(change["website"])
+        elif kind == "entry_removed":
+            self._remove_row(change["website"])
+        elif kind == "group_created":
+            # Grupo recriado (ex.: exclusão desfeita): o dicionário é outro
+            self.set_group(self.group)
+        elif kind == "group_deleted":
+            self.beginResetModel()
+            self.entries = {}
+            self.rows = []
+            self.row_of = {}
+            self.endResetModel()
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+
+    def _upsert_row(self, website):
+        key = (self.group, website)
+        row = self.row_of.get(key)
+        if row is None:
+            row = len(self.rows)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.rows.append(key)
+            self.row_of[key] = row
+            self.endInsertRows()
+        else:
+            self._row_changed(row)
+
+    def _remove_row(self, website):
+        row = self.row_of.pop((self.group, website), None)
+        if row is None:
+            return
+        last = len(self.rows) - 1
+        if row != last:
+            # A última linha ocupa o lugar da removida: nenhuma outra linha
+            # muda de índice, então a remoção é O(1) mesmo em grupos grandes
+            moved = self.rows[last]
+            self.rows[row] = moved
+            self.row_of[moved] = row
+            self._row_changed(row)
+        self.beginRemoveRows(QModelIndex(), last, last)
+        self.rows.pop()
+        self.endRemoveRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        group, website = self.rows[index.row()]
+        entry = self.entries.get(group, {}).get(website)
+        if entry is None:
+            return None
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == WEBSITE:
+                if self.group is None:
+                    # Na busca, mostrar também o grupo de cada entrada
+                    return f"{truncate_text(website, 22)} · {truncate_text(group, 12)}"
+                return truncate_text(website, 30)
+            if column == USERNAME:
+                return truncate_text(entry["username"], 25)
+            if column == PASSWORD:
+                return "•••••••••••"
+            if column == MODIFIED:
+                return format_time_ago(datetime.fromtimestamp(entry["last_modified"]))
+        elif role == Qt.ToolTipRole:
+            if column == WEBSITE:
+                return f"{website} ({group})" if self.group is None else website
+            if column == USERNAME:
+                return "Clique duplo para copiar"
+            if column == MODIFIED:
+                return datetime.fromtimestamp(entry["last_modified"]).strftime("%d/%m/%Y %H:%M")
+        elif role == Qt.TextAlignmentRole:
+            if column == MODIFIED:
+                return Qt.AlignCenter
+            return Qt.AlignLeft | Qt.AlignVCenter
+        elif role == Qt.UserRole:
+            return website
+        elif role == GROUP_ROLE:
+            return group
+        return None
+
+
+class EntryDelegate(QStyledItemDelegate):
+    """Desenha ícones e botões de ação sem criar widgets por linha."""
+    actionTriggered = pyqtSignal(str, str, str)  # Ação, grupo e website da linha clicada
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self.hovered = None  # (linha, ação) sob o mouse
+        self.pressed = None
+        self.icon_font = QFont(view.font())
+        self.icon_font.setPointSize(13)
+        view.setMouseTracking(True)
+        view.viewport().installEventFilter(self)
+
+    def paint(self, painter, option, index):
+        column = index.column()
+        if column == WEBSITE:
+            self._paint_icon_text(painter, option, index, "🌐", LINK_COLOR)
+        elif column == PASSWORD:
+            self._paint_icon_text(painter, option, index, "🔒", None, Qt.AlignCenter)
+        elif column == ACTIONS:
+            self._paint_background(painter, option, index)
+            self._paint_actions(painter, option, index)
+        else:
+            super().paint(painter, option, index)
+
+    def _paint_background(self, painter, option, index):
+        # Fundo, seleção e hover conforme o estilo da tabela, sem texto
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        option.text = ""
+        style = option.widget.style() if option.widget else None
+        if style is not None:
+            style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+    def _text_rect(self, cell, metrics, icon):
+        return cell.adjusted(5 + metrics.horizontalAdvance(icon) + 5, 0, -5, 0)
+
+    def _paint_icon_text(self, painter, option, index, icon, color, alignment=Qt.AlignLeft):
+        self._paint_background(painter, option, index)
+        painter.save()
+        painter.drawText(option.rect.adjusted(5, 0, -5, 0), Qt.AlignLeft | Qt.AlignVCenter, icon)
+        text_rect = self._text_rect(option.rect, painter.fontMetrics(), icon)
+        if color is not None:
+            painter.setPen(color)
+        else:
+            painter.setPen(option.palette.color(QPalette.Text))
+        painter.drawText(text_rect, alignment | Qt.AlignVCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+    def _button_rects(self, cell):
+        """Posição de cada botão de ação dentro da célula, centralizados."""
+        count = sum(len(group) for group in ACTION_GROUPS)
+        width = count * BUTTON_SIZE + (len(ACTION_GROUPS) - 1) * SEPARATOR_WIDTH
+        x = cell.left() + max(4, (cell.width() - width) // 2)
+        y = cell.top() + (cell.height() - BUTTON_SIZE) // 2
+        rects = []
+        for i, group in enumerate(ACTION_GROUPS):
+            if i > 0:
+                x += SEPARATOR_WIDTH
+            for action in group:
+                rects.append((QRect(x, y, BUTTON_SIZE, BUTTON_SIZE), action))
+                x += BUTTON_SIZE
+        return rects
+
+    def _paint_actions(self, painter, option, index):
+        painter.save()
+        painter.setFont(self.icon_font)
+        painter.setRenderHint(QPainter.Antialiasing)
+        previous = None
+        for rect, (name, icon, tooltip, kind) in self._button_rects(option.rect):
+            if previous is not None and previous != kind:
+                # Separador visual entre grupos
+                x = rect.left() - SEPARATOR_WIDTH // 2 - 1
+                painter.setPen(SEPARATOR_COLOR)
+                painter.drawLine(x, rect.top() + 6, x, rect.bottom() - 6)
+            previous = kind
+            color = BUTTON_COLORS[kind]
+            if self.hovered == (index.row(), name):
+                hover = QColor(color)
+                hover.setAlpha(0x15)
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(hover)
+                painter.drawRoundedRect(rect, 4, 4)
+            painter.setPen(color)
+            painter.drawText(rect, Qt.AlignCenter, icon)
+        painter.restore()
+
+    def _action_at(self, index, pos):
+        rect = self.view.visualRect(index)
+        for button, action in self._button_rects(rect):
+            if button.contains(pos):
+                return action
+        return None
+
+    def _set_hovered(self, hovered):
+        if hovered == self.hovered:
+            return
+        for state in (self.hovered, hovered):
+            if state is not None:
+                model = self.view.model()
+                self.view.viewport().update(self.view.visualRect(model.index(state[0], ACTIONS)))
+        self.hovered = hovered
+        if hovered is None:
+            self.view.viewport().unsetCursor()
+        else:
+            self.view.viewport().setCursor(Qt.PointingHandCursor)
+
+    def _on_link(self, index, pos):
+        """Se ``pos`` está sobre o texto do website, como o antigo link."""
+        metrics = self.view.fontMetrics()
+        text_rect = self._text_rect(self.view.visualRect(index), metrics, "🌐")
+        text_rect.setWidth(metrics.horizontalAdvance(index.data(Qt.DisplayRole)))
+        return text_rect.contains(pos)
+
+    def editorEvent(self, event, model, option, index):
+        if index.column() == WEBSITE:
+            on_link = hasattr(event, "pos") and self._on_link(index, event.pos())
+            if event.type() == QEvent.MouseMove:
+                self._set_hovered((index.row(), "link") if on_link else None)
+            elif (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                    and on_link and not event.modifiers()):
+                self.actionTriggered.emit("open", model.data(index, GROUP_ROLE),
+                                         model.data(index, Qt.UserRole))
+            return super().editorEvent(event, model, option, index)
+        if index.column() != ACTIONS:
+            if event.type() == QEvent.MouseMove:
+                self._set_hovered(None)
+            return super().editorEvent(event, model, option, index)
+
+        action = self._action_at(index, event.pos()) if hasattr(event, "pos") else None
+        name = action[0] if action else None
+        if event.type() == QEvent.MouseMove:
+            self._set_hovered((index.row(), name) if name else None)
+        elif event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            # Clique em botão não altera a seleção, como os botões de antes
+            self.pressed = (index.row(), name) if name else None
+            return name is not None
+        elif event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            pressed, self.pressed = self.pressed, None
+            if name is not None and pressed == (index.row(), name):
+                self.actionTriggered.emit(name, model.data(index, GROUP_ROLE),
+                                         model.data(index, Qt.UserRole))
+                return True
+        elif event.type() == QEvent.MouseButtonDblClick:
+            return name is not None
+        return super().editorEvent(event, model, option, index)
+
+    def helpEvent(self, event, view, option, index):
+        if index.column() == ACTIONS and event.type() == QEvent.ToolTip:
+            action = self._action_at(index, event.pos())
+            if action is not None:
+                QToolTip.showText(event.globalPos(), action[2], view, QRect(), 2000)
+            else:
+                QToolTip.hideText()
+            return True
+        return super().helpEvent(event, view, option, index)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Leave:
+            self._set_hovered(None)
+        return False
@@ -0,0 +1,27 @@
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.exporter import PasswordExporter
+
+
+class ExportWorker(QThread):
+    """Executa um PasswordExporter fora da thread da interface."""
+    progress = pyqtSignal(int, int)  # Entradas exportadas, total
+    succeeded = pyqtSignal(object)   # ExportSummary (também quando cancelada)
+    failed = pyqtSignal(object)      # Exceção que interrompeu a exportação
+
+    def __init__(self, password_manager, path, passphrase=None, parent=None):
+        super().__init__(parent)
+        self.exporter = PasswordExporter(password_manager, path, passphrase)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Pede o cancelamento; nenhum arquivo parcial é deixado."""
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            summary = self.exporter.run(self.progress.emit, self._cancelled.is_set)
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.succeeded.emit(summary)
@@ -0,0 +1,30 @@
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.importer import PasswordImporter
+
+
+class ImportWorker(QThread):
+    """Executa um PasswordImporter fora da thread da interface."""
+    progress = pyqtSignal(int, int)  # Registros processados, porcentagem do arquivo
+    succeeded = pyqtSignal(object)   # ImportSummary (também quando cancelada)
+    failed = pyqtSignal(object)      # Exceção que interrompeu a importação
+
+    def __init__(self, password_manager, path, default_group=None, passphrase=None, parent=None):
+        super().__init__(parent)
+        self.importer = PasswordImporter(password_manager, path, default_group, passphrase=passphrase)
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Pede o cancelamento; o que já foi importado é desfeito."""
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            summary = self.importer.run(self._report, self._cancelled.is_set)
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.succeeded.emit(summary)
+
+    def _report(self, rows, consumed, total):
+        self.progress.emit(rows, int(consumed * 100 / total) if total else 100)
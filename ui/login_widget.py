@@ -1,10 +1,50 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QLineEdit, QPushButton, QMessageBox, QDialog)
-from PyQt5.QtCore import pyqtSignal
+                             QLineEdit, QPushButton, QMessageBox, QDialog, QProgressBar)
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QIcon
+from ui.async_task import AsyncTask
 import os
 
-class LoginWidget(QDialog):
+class BusyMixin:
+    """Indicador de ocupado e cancelamento para diálogos que esperam o PBKDF2."""
+    
+    def setup_busy_indicator(self, layout):
+        self.task = None
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)  # Indeterminado
+        self.busy_bar.setTextVisible(False)
+        self.busy_bar.setMaximumHeight(6)
+        self.busy_bar.hide()
+        layout.addWidget(self.busy_bar)
+    
+    def run_task(self, future, on_success):
+        """Executa ``future`` mostrando o indicador e chama ``on_success`` com o resultado."""
+        self.set_busy(True)
+        self.task = AsyncTask(future, self)
+        self.task.succeeded.connect(lambda result: (self.set_busy(False), on_success(result)))
+        self.task.failed.connect(lambda error: (self.set_busy(False), self.task_failed(error)))
+        self.task.start()
+    
+    def task_failed(self, error):
+        QMessageBox.warning(self, "Erro", str(error))
+    
+    def set_busy(self, busy):
+        if not busy:
+            self.task = None
+        self.busy_bar.setVisible(busy)
+        for widget in self.findChildren((QLineEdit, QPushButton)):
+            widget.setEnabled(not busy)
+        if busy:
+            self.setCursor(Qt.WaitCursor)
+        else:
+            self.unsetCursor()
+    
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+class LoginWidget(BusyMixin, QDialog):
     loginSuccessful = pyqtSignal(str)  # Emite o nome de usuário após login bem-sucedido
     registerRequested = pyqtSignal()
     
@@ -58,9 +98,15 @@ class LoginWidget(QDialog):
         layout.addLayout(username_layout)
         layout.addLayout(password_layout)
         layout.addLayout(button_layout)
+        self.setup_busy_indicator(layout)
         
         self.setLayout(layout)
         
+    def reject(self):
+        # Fechar o diálogo descarta uma verificação em andamento
+        self.cancel_task()
+        super().reject()
+        
     def try_login(self):
         username = self.username_input.text()
         password = self.password_input.text()
@@ -69,7 +115,12 @@ class LoginWidget(QDialog):
             QMessageBox.warning(self, "Erro", "Por favor, preencha todos os campos.")
             return
         
-        if self.user_manager.verify_password(username, password):
+        # O PBKDF2 roda fora da thread da interface
+        self.run_task(self.user_manager.verify_password_async(username, password),
+                      lambda valid: self.login_finished(username, valid))
+    
+    def login_finished(self, username, valid):
+        if valid:
             self.loginSuccessful.emit(username)
             self.accept()
         else:
@@ -90,7 +141,7 @@ class LoginWidget(QDialog):
         else:
             QMessageBox.warning(self, "Erro", "Usuário não encontrado.")
 
-class RegisterWidget(QDialog):
+class RegisterWidget(BusyMixin, QDialog):
     def __init__(self, user_manager, parent=None):
         super().__init__(parent)
         self.user_manager = user_manager
@@ -155,9 +206,15 @@ class RegisterWidget(QDialog):
         layout.addLayout(password_layout)
         layout.addLayout(confirm_layout)
         layout.addLayout(button_layout)
+        self.setup_busy_indicator(layout)
         
         self.setLayout(layout)
         
+    def reject(self):
+        # Fechar o diálogo descarta um registro ainda não iniciado
+        self.cancel_task()
+        super().reject()
+        
     def try_register(self):
         username = self.username_input.text()
         email = self.email_input.text()
@@ -174,9 +231,9 @@ class RegisterWidget(QDialog):
             self.confirm_input.clear()
             return
         
-        try:
-            self.user_manager.create_user(username, password, email)
-            QMessageBox.information(self, "Sucesso", "Usuário registrado com sucesso!")
-            self.accept()
-        except ValueError as e:
-            QMessageBox.warning(self, "Erro", str(e)) 
\ No newline at end of file
+        self.run_task(self.user_manager.create_user_async(username, password, email),
+                      lambda user_id: self.register_finished())
+    
+    def register_finished(self):
+        QMessageBox.information(self, "Sucesso", "Usuário registrado com sucesso!")
+        self.accept() 
\ No newline at end of file
@@ -1,16 +1,18 @@
 from datetime import datetime
-import csv
-import json
 import webbrowser
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                           QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+                           QLineEdit, QPushButton, QTableView,
                            QHeaderView, QMessageBox, QSplitter, QTextEdit, QGroupBox,
                            QDialog, QFileDialog, QListWidget, QListWidgetItem, QInputDialog,
-                           QApplication, QGraphicsDropShadowEffect, QFrame)
-from PyQt5.QtCore import Qt, QTimer, QSize, QPropertyAnimation
+                           QApplication, QGraphicsDropShadowEffect, QAbstractItemView,
+                           QProgressDialog)
+from PyQt5.QtCore import Qt, QEvent, QTimer, QSize, QPropertyAnimation, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QIcon, QTextCursor
 from core.password_manager import PasswordManager
-import os
+from ui.async_task import AsyncTask
+from ui.entry_table import EntryTableModel, EntryDelegate
+from ui.import_worker import ImportWorker
+from ui.export_worker import ExportWorker
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -326,12 +328,61 @@ class PasswordRecoveryDialog(QDialog):
             QMessageBox.warning(self, "Erro", "Código incorreto")
 
 class PasswordWidget(QWidget):
-    def __init__(self, password_file, parent=None):
+    dataSaved = pyqtSignal(int)  # Emitido (na thread da interface) quando as alterações estão no disco
+    vaultChanged = pyqtSignal(object)  # Notificação de alteração do PasswordManager
+    saveFailed = pyqtSignal(object)  # Exceção de uma gravação em segundo plano (tentada de novo depois)
+    # Espera (ms) após a última tecla antes de buscar
+    SEARCH_DEBOUNCE_MS = 120
+    # Máximo de resultados exibidos por busca
+    SEARCH_LIMIT = 500
+    # Máximo de resultados aproximados quando a busca exata não encontra nada
+    FUZZY_LIMIT = 20
+    SEARCH_PLACEHOLDER = "🔍 Buscar em todos os grupos..."
+    # Intervalo (ms) para buscar alterações feitas por outra instância no mesmo cofre
+    REFRESH_INTERVAL_MS = 2000
+    
+    def __init__(self, password_file, vault_key=None, parent=None):
         super().__init__(parent)
-        self.password_manager = PasswordManager(password_file)
+        # Gravação em segundo plano para não travar a interface a cada alteração.
+        # A decriptação em massa fica na thread que a pede: o pool de workers não
+        # foi mais rápido em nenhuma medição (benchmarks/bench_decrypt.py).
+        # vault_key é a KEK obtida no login, que protege a chave do cofre
+        self.password_manager = PasswordManager(password_file, async_save=True, kek=vault_key)
+        self.password_manager.add_durable_listener(self.dataSaved.emit)
+        self.dataSaved.connect(self.data_saved)
+        self.password_manager.add_error_listener(self.saveFailed.emit)
+        self.saveFailed.connect(self.save_failed)
+        self.save_failing = False
+        # Central widget de um QMainWindow não recebe closeEvent: encerrar
+        # quando a aplicação termina
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
         self.current_group = self.password_manager.get_default_group()
         self.groups_visible = False
         self.setup_ui()
+        # Cada alteração atualiza só as linhas afetadas, na thread da interface
+        self.password_manager.add_change_listener(self.vaultChanged.emit)
+        self.vaultChanged.connect(self.apply_change)
+        # O índice de busca decripta todos os grupos: só montá-lo (em segundo
+        # plano) quando a busca for usada, para os grupos continuarem sendo
+        # carregados um a um
+        self.search_task = None
+        self.search_ready = False
+        self.search_input.installEventFilter(self)
+        # Outra instância pode estar com o mesmo cofre aberto: sem esperar
+        # pela trava, só ler o que mudou (nada, na maioria das vezes)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(lambda: self.password_manager.refresh(blocking=False))
+        self.refresh_timer.start(self.REFRESH_INTERVAL_MS)
+    
+    def shutdown(self):
+        """Garante que todas as alterações foram gravadas ao sair."""
+        for worker in (getattr(self, "import_worker", None), getattr(self, "export_worker", None)):
+            if worker is not None and worker.isRunning():
+                # Importação pela metade é desfeita; exportação não deixa arquivo
+                worker.cancel()
+                worker.wait()
+        self.refresh_timer.stop()
+        self.password_manager.close()
         
     def setup_ui(self):
         # Definir tamanho fixo para o widget
@@ -344,16 +395,16 @@ class PasswordWidget(QWidget):
                 background-color: #2b2b2b;
                 color: #ffffff;
             }
-            QTableWidget {
+            QTableView {
                 gridline-color: #404040;
                 border: 1px solid #404040;
                 background-color: #1b1b1b;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #404040;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #2ecc71;
                 color: #1b1b1b;
             }
@@ -461,12 +512,49 @@ class PasswordWidget(QWidget):
         toolbar.addWidget(export_button)
         
         toolbar.addStretch()
+        
+        # Busca em todos os grupos, atualizada enquanto se digita
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText(self.SEARCH_PLACEHOLDER)
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setFixedWidth(280)
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                background-color: #1b1b1b;
+                border: 1px solid #404040;
+                border-radius: 4px;
+                padding: 6px;
+                color: #ffffff;
+            }
+            QLineEdit:focus {
+                border: 1px solid #2ecc71;
+            }
+        """)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        toolbar.addWidget(self.search_input)
         right_layout.addLayout(toolbar)
         
         # Tabela de senhas
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Website", "Usuário", "Senha", "Modificado", "Ações"])
+        # Modelo/vista: só as linhas visíveis são desenhadas, sem widgets por célula
+        self.table = QTableView()
+        self.table_model = EntryTableModel(self.password_manager, self)
+        self.table.setModel(self.table_model)
+        self.table_delegate = EntryDelegate(self.table)
+        self.table_delegate.actionTriggered.connect(self.entry_action)
+        self.table.setItemDelegate(self.table_delegate)
+        self.entry_actions = {
+            "show": self.show_password,
+            "copy_password": self.copy_password,
+            "copy_username": self.copy_username,
+            "edit": self.edit_entry,
+            "open": self.open_website,
+            "move": self.move_entry,
+            "delete": self.delete_entry,
+        }
         
         # Ajustar larguras das colunas e comportamento
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)  # Website - usuário pode ajustar
@@ -484,14 +572,19 @@ class PasswordWidget(QWidget):
         
         # Ajustar altura das linhas e fonte
         self.table.verticalHeader().setDefaultSectionSize(48)  # Aumentado para melhor espaçamento
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.setFont(QFont("Segoe UI", 10))
         
         # Remover o cabeçalho vertical
         self.table.verticalHeader().setVisible(False)
         
+        # Permitir selecionar várias linhas para excluir/mover em lote
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        
         # Estilo da tabela e cabeçalhos com melhor feedback visual
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #1b1b1b;
                 border: 1px solid #404040;
                 gridline-color: #404040;
@@ -499,20 +592,20 @@ class PasswordWidget(QWidget):
                 selection-background-color: #2ecc7133;
                 selection-color: #ffffff;
             }
-            QTableWidget::item {
+            QTableView::item {
                 border-bottom: 1px solid #404040;
                 padding: 5px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #2ecc7133;
                 color: #ffffff;
                 border-bottom: 1px solid #2ecc71;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #2b2b2b;
             }
             /* Estilo especial para células copiáveis */
-            QTableWidget::item[copyable="true"]:hover {
+            QTableView::item[copyable="true"]:hover {
                 background-color: #2ecc7122;
                 border: 1px solid #2ecc7144;
             }
@@ -526,6 +619,13 @@ class PasswordWidget(QWidget):
                 font-weight: bold;
                 font-size: 11px;
             }
+            QToolTip {
+                background-color: #2b2b2b;
+                color: #ffffff;
+                border: 1px solid #404040;
+                padding: 5px;
+                font-size: 11px;
+            }
             QTableCornerButton::section {
                 background-color: #2b2b2b;
                 border: none;
@@ -617,9 +717,29 @@ class PasswordWidget(QWidget):
                 item.setSelected(True)
             self.groups_list.addItem(item)
     
+    def apply_change(self, change):
+        """Aplica uma notificação do PasswordManager à tabela e à lista de grupos."""
+        self.table_model.apply_change(change)
+        if self.search_input.text().strip():
+            self.search_timer.start()
+        if change["type"] == "group_created":
+            if not self.groups_list.findItems(change["group"], Qt.MatchExactly):
+                self.groups_list.addItem(QListWidgetItem(change["group"]))
+        elif change["type"] == "group_deleted":
+            for item in self.groups_list.findItems(change["group"], Qt.MatchExactly):
+                self.groups_list.takeItem(self.groups_list.row(item))
+            if change["group"] == self.current_group:
+                self.current_group = "Geral"
+                if not self.search_input.text().strip():
+                    self.refresh_table()
+    
     def group_selected(self, item):
         """Chamado quando um grupo é selecionado."""
         self.current_group = item.text()
+        if self.search_input.text():
+            # Limpar a busca já volta para o grupo selecionado
+            self.search_input.clear()
+            self.search_timer.stop()
         self.refresh_table()
         self.log_message(f"Grupo selecionado: {self.current_group}")
     
@@ -629,7 +749,6 @@ class PasswordWidget(QWidget):
         if ok and name:
             try:
                 self.password_manager.create_group(name)
-                self.refresh_groups()
                 self.log_message(f"Grupo criado: {name}")
             except ValueError as e:
                 QMessageBox.warning(self, "Erro", str(e))
@@ -646,14 +765,28 @@ class PasswordWidget(QWidget):
         
         if reply == QMessageBox.Yes:
             try:
-                self.password_manager.delete_group(self.current_group)
-                self.current_group = "Geral"
-                self.refresh_groups()
-                self.refresh_table()
-                self.log_message(f"Grupo excluído: {self.current_group}")
+                group = self.current_group
+                self.password_manager.delete_group(group)
+                self.log_message(f"Grupo excluído: {group}")
             except ValueError as e:
                 QMessageBox.warning(self, "Erro", str(e))
     
+    def data_saved(self, seq):
+        if self.save_failing:
+            self.save_failing = False
+            self.log_message("Gravação restabelecida")
+        self.log_message("Alterações salvas")
+
+    def save_failed(self, error):
+        """Avisa que as alterações ainda não estão no disco; o cofre tenta de novo."""
+        self.log_message(f"Erro ao salvar alterações (nova tentativa em breve): {str(error)}")
+        if not self.save_failing:
+            # Só um aviso por sequência de falhas
+            self.save_failing = True
+            QMessageBox.warning(self, "Erro ao salvar",
+                                "Não foi possível gravar as alterações no disco:\n"
+                                f"{str(error)}\n\nO SecureVault continuará tentando.")
+
     def log_message(self, message: str):
         """Sobrescreve o método de log para usar a animação."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -669,53 +802,71 @@ class PasswordWidget(QWidget):
             
             try:
                 self.password_manager.add_entry(website, username, password, self.current_group)
-                self.refresh_table()
                 self.log_message(f"Nova entrada adicionada para {website} no grupo {self.current_group}")
             except Exception as e:
                 QMessageBox.critical(self, "Erro", str(e))
                 self.log_message(f"Erro ao adicionar entrada: {str(e)}")
     
-    def show_password(self, website: str):
+    def show_password(self, website: str, group: str = None):
+        group = group or self.current_group
         try:
-            password = self.password_manager.get_password(website, self.current_group)
+            password = self.password_manager.get_password(website, group)
             QMessageBox.information(self, "Senha", f"Senha para {website}: {password}")
             self.log_message(f"Senha visualizada para {website}")
         except Exception as e:
             QMessageBox.critical(self, "Erro", str(e))
             self.log_message(f"Erro ao mostrar senha: {str(e)}")
     
-    def delete_entry(self, website: str):
-        reply = QMessageBox.question(self, "Confirmar Exclusão",
-                                   f"Tem certeza que deseja excluir a entrada para {website}?",
+    def selected_websites(self, website: str, group: str):
+        """Websites afetados por uma ação: a seleção, se incluir a linha clicada.
+        
+        Só entram as linhas do mesmo grupo, pois os resultados de busca
+        podem misturar grupos.
+        """
+        selected = [self.table_model.website(index.row())
+                    for index in self.table.selectionModel().selectedRows()
+                    if self.table_model.group_of(index.row()) == group]
+        if website in selected:
+            return selected
+        return [website]
+    
+    def delete_entry(self, website: str, group: str = None):
+        group = group or self.current_group
+        websites = self.selected_websites(website, group)
+        if len(websites) > 1:
+            question = f"Tem certeza que deseja excluir as {len(websites)} entradas selecionadas?"
+        else:
+            question = f"Tem certeza que deseja excluir a entrada para {website}?"
+        reply = QMessageBox.question(self, "Confirmar Exclusão", question,
                                    QMessageBox.Yes | QMessageBox.No)
         
         if reply == QMessageBox.Yes:
             try:
-                self.password_manager.delete_entry(website, self.current_group)
-                self.refresh_table()
-                self.log_message(f"Entrada deletada para {website}")
+                self.password_manager.delete_entries(websites, group)
+                self.log_message(f"Entrada deletada para {', '.join(websites)}")
             except Exception as e:
                 QMessageBox.critical(self, "Erro", str(e))
                 self.log_message(f"Erro ao deletar entrada: {str(e)}")
     
-    def move_entry(self, website: str):
+    def move_entry(self, website: str, group: str = None):
+        group = group or self.current_group
+        websites = self.selected_websites(website, group)
         groups = self.password_manager.list_groups()
-        groups.remove(self.current_group)
+        groups.remove(group)
         
-        group, ok = QInputDialog.getItem(self, "Mover Entrada",
-                                       "Selecione o grupo de destino:",
-                                       groups, 0, False)
+        target, ok = QInputDialog.getItem(self, "Mover Entrada",
+                                        "Selecione o grupo de destino:",
+                                        groups, 0, False)
         
-        if ok and group:
+        if ok and target:
             try:
-                self.password_manager.move_entry(website, self.current_group, group)
-                self.refresh_table()
-                self.log_message(f"Entrada {website} movida para o grupo {group}")
+                self.password_manager.move_entries(websites, group, target)
+                self.log_message(f"Entrada {', '.join(websites)} movida para o grupo {target}")
             except Exception as e:
                 QMessageBox.critical(self, "Erro", str(e))
                 self.log_message(f"Erro ao mover entrada: {str(e)}")
     
-    def open_website(self, website: str):
+    def open_website(self, website: str, group: str = None):
         try:
             if not website.startswith(('http://', 'https://')):
                 website = 'https://' + website
@@ -725,9 +876,10 @@ class PasswordWidget(QWidget):
             QMessageBox.critical(self, "Erro", f"Não foi possível abrir o website: {str(e)}")
             self.log_message(f"Erro ao abrir website: {str(e)}")
     
-    def edit_entry(self, website: str):
+    def edit_entry(self, website: str, group: str = None):
+        group = group or self.current_group
         try:
-            current_data = self.password_manager.get_entry(website, self.current_group)
+            current_data = self.password_manager.get_entry(website, group)
             dialog = EditEntryDialog(website, current_data["username"], current_data["password"], self)
             
             if dialog.exec_() == QDialog.Accepted:
@@ -737,13 +889,13 @@ class PasswordWidget(QWidget):
                 
                 if website != new_website:
                     # Se o website mudou, deletar a entrada antiga e criar uma nova
-                    self.password_manager.delete_entry(website, self.current_group)
-                    self.password_manager.add_entry(new_website, new_username, new_password, self.current_group)
+                    with self.password_manager.transaction():
+                        self.password_manager.delete_entry(website, group)
+                        self.password_manager.add_entry(new_website, new_username, new_password, group)
                 else:
                     # Se só os dados mudaram, atualizar a entrada existente
-                    self.password_manager.update_entry(website, new_username, new_password, self.current_group)
+                    self.password_manager.update_entry(website, new_username, new_password, group)
                 
-                self.refresh_table()
                 self.log_message(f"Entrada editada para {website}")
         except Exception as e:
             QMessageBox.critical(self, "Erro", str(e))
@@ -754,87 +906,125 @@ class PasswordWidget(QWidget):
             self,
             "Importar Senhas",
             "",
-            "CSV Files (*.csv);;JSON Files (*.json)"
+            "CSV Files (*.csv);;JSON Files (*.json);;SecureVault Criptografado (*.svx)"
         )
         
         if file_name:
+            passphrase = None
+            if file_name.lower().endswith('.svx'):
+                passphrase, ok = QInputDialog.getText(self, "Importar Senhas",
+                                                      "Senha do arquivo exportado:", QLineEdit.Password)
+                if not ok or not passphrase:
+                    return
             try:
-                if file_name.endswith('.csv'):
-                    with open(file_name, 'r', newline='') as file:
-                        reader = csv.DictReader(file)
-                        for row in reader:
-                            group = row.get('group', self.current_group)
-                            if group not in self.password_manager.list_groups():
-                                self.password_manager.create_group(group)
-                            self.password_manager.add_entry(
-                                row['website'],
-                                row['username'],
-                                row['password'],
-                                group
-                            )
-                elif file_name.endswith('.json'):
-                    with open(file_name, 'r') as file:
-                        data = json.load(file)
-                        for entry in data:
-                            group = entry.get('group', self.current_group)
-                            if group not in self.password_manager.list_groups():
-                                self.password_manager.create_group(group)
-                            self.password_manager.add_entry(
-                                entry['website'],
-                                entry['username'],
-                                entry['password'],
-                                group
-                            )
-                
-                self.refresh_groups()
-                self.refresh_table()
-                self.log_message(f"Senhas importadas de {file_name}")
-                QMessageBox.information(self, "Sucesso", "Senhas importadas com sucesso!")
-            except Exception as e:
+                # A importação roda em outra thread, em lotes; cada entrada
+                # importada chega à tabela pelas notificações do PasswordManager
+                self.import_worker = ImportWorker(self.password_manager, file_name, self.current_group,
+                                                  passphrase, parent=self)
+            except ValueError as e:
                 QMessageBox.critical(self, "Erro", f"Erro ao importar senhas: {str(e)}")
-                self.log_message(f"Erro ao importar senhas: {str(e)}")
+                return
+            progress = QProgressDialog("Importando senhas...", "Cancelar", 0, 100, self)
+            progress.setWindowTitle("Importar Senhas")
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setMinimumDuration(0)
+            progress.setAutoClose(False)
+            progress.setAutoReset(False)
+            progress.canceled.connect(self.import_worker.cancel)
+            progress.canceled.connect(lambda: progress.setLabelText("Cancelando e desfazendo a importação..."))
+            self.import_worker.progress.connect(
+                lambda rows, percent: (progress.setValue(percent),
+                                       progress.setLabelText(f"Importando senhas... {rows} registros lidos")))
+            self.import_worker.succeeded.connect(lambda summary: self.import_finished(file_name, summary))
+            self.import_worker.failed.connect(lambda error: self.import_failed(error))
+            self.import_worker.finished.connect(progress.close)
+            self.import_worker.start()
+            self.log_message(f"Importando senhas de {file_name}")
+    
+    def import_finished(self, file_name, summary):
+        """Mostra o resumo da importação: importadas, duplicadas e ignoradas."""
+        if summary.cancelled:
+            self.log_message(f"Importação de {file_name} cancelada; nada foi importado")
+            QMessageBox.information(self, "Importação Cancelada",
+                                    "A importação foi cancelada e as entradas importadas foram desfeitas.")
+            return
+        lines = [f"Entradas importadas: {summary.imported}"]
+        if summary.groups_created:
+            lines.append(f"Grupos criados: {', '.join(summary.groups_created)}")
+        if summary.duplicates:
+            examples = ", ".join(f"{website} ({group})" for group, website in summary.duplicates[:5])
+            more = "..." if len(summary.duplicates) > 5 else ""
+            lines.append(f"Duplicadas (mantidas como estavam): {len(summary.duplicates)} — {examples}{more}")
+        if summary.skipped:
+            examples = ", ".join(f"#{number}: {reason}" for number, reason in summary.skipped[:5])
+            more = "..." if len(summary.skipped) > 5 else ""
+            lines.append(f"Registros ignorados: {len(summary.skipped)} — {examples}{more}")
+        self.log_message(f"Senhas importadas de {file_name}: {summary.imported} novas, "
+                         f"{len(summary.duplicates)} duplicadas, {len(summary.skipped)} ignoradas")
+        QMessageBox.information(self, "Sucesso", "\n".join(lines))
+    
+    def import_failed(self, error):
+        QMessageBox.critical(self, "Erro", f"Erro ao importar senhas: {str(error)}")
+        self.log_message(f"Erro ao importar senhas: {str(error)}")
     
     def export_passwords(self):
-        file_name, _ = QFileDialog.getSaveFileName(
+        file_name, selected_filter = QFileDialog.getSaveFileName(
             self,
             "Exportar Senhas",
             "",
-            "CSV Files (*.csv);;JSON Files (*.json)"
+            "SecureVault Criptografado (*.svx);;CSV Files (*.csv);;JSON Files (*.json)"
         )
         
         if file_name:
-            try:
-                all_entries = []
-                for group, entries in self.password_manager.get_all_entries().items():
-                    for website, data in entries.items():
-                        entry = {
-                            'group': group,
-                            'website': website,
-                            'username': data['username'],
-                            'password': self.password_manager.get_password(website, group)
-                        }
-                        all_entries.append(entry)
-                
-                if file_name.endswith('.csv'):
-                    with open(file_name, 'w', newline='') as file:
-                        writer = csv.DictWriter(file, fieldnames=['group', 'website', 'username', 'password'])
-                        writer.writeheader()
-                        for entry in all_entries:
-                            writer.writerow(entry)
-                elif file_name.endswith('.json'):
-                    with open(file_name, 'w') as file:
-                        json.dump(all_entries, file, indent=4)
-                
-                self.log_message(f"Senhas exportadas para {file_name}")
-                QMessageBox.information(self, "Sucesso", "Senhas exportadas com sucesso!")
-            except Exception as e:
-                QMessageBox.critical(self, "Erro", f"Erro ao exportar senhas: {str(e)}")
-                self.log_message(f"Erro ao exportar senhas: {str(e)}")
+            if not file_name.lower().endswith(('.svx', '.csv', '.json')):
+                file_name += selected_filter[selected_filter.index('*') + 1:-1]
+            passphrase = None
+            if file_name.lower().endswith('.svx'):
+                # Criptografado com uma senha própria: o texto claro nunca vai ao disco
+                passphrase, ok = QInputDialog.getText(self, "Exportar Senhas",
+                                                      "Senha para proteger o arquivo:", QLineEdit.Password)
+                if not ok or not passphrase:
+                    return
+                confirm, ok = QInputDialog.getText(self, "Exportar Senhas",
+                                                   "Confirme a senha:", QLineEdit.Password)
+                if not ok:
+                    return
+                if confirm != passphrase:
+                    QMessageBox.warning(self, "Erro", "As senhas não coincidem.")
+                    return
+            self.export_worker = ExportWorker(self.password_manager, file_name, passphrase, parent=self)
+            progress = QProgressDialog("Exportando senhas...", "Cancelar", 0, 100, self)
+            progress.setWindowTitle("Exportar Senhas")
+            progress.setWindowModality(Qt.WindowModal)
+            progress.setMinimumDuration(0)
+            progress.setAutoClose(False)
+            progress.setAutoReset(False)
+            progress.canceled.connect(self.export_worker.cancel)
+            self.export_worker.progress.connect(
+                lambda done, total: (progress.setMaximum(max(total, 1)), progress.setValue(done),
+                                     progress.setLabelText(f"Exportando senhas... {done} de {total}")))
+            self.export_worker.succeeded.connect(lambda summary: self.export_finished(file_name, summary))
+            self.export_worker.failed.connect(lambda error: self.export_failed(error))
+            self.export_worker.finished.connect(progress.close)
+            self.export_worker.start()
+            self.log_message(f"Exportando senhas para {file_name}")
+    
+    def export_finished(self, file_name, summary):
+        if summary.cancelled:
+            self.log_message(f"Exportação para {file_name} cancelada")
+            return
+        self.log_message(f"Senhas exportadas para {file_name}")
+        QMessageBox.information(self, "Sucesso", f"{summary.exported} senhas exportadas com sucesso!")
+    
+    def export_failed(self, error):
+        QMessageBox.critical(self, "Erro", f"Erro ao exportar senhas: {str(error)}")
+        self.log_message(f"Erro ao exportar senhas: {str(error)}")
 
-    def copy_username(self, website: str):
+    def copy_username(self, website: str, group: str = None):
         """Copiar usuário para a área de transferência."""
+        group = group or self.current_group
         try:
-            entry = self.password_manager.get_entry(website, self.current_group)
+            entry = self.password_manager.get_entry(website, group)
             if entry:
                 clipboard = QApplication.clipboard()
                 clipboard.setText(entry["username"])
@@ -843,10 +1033,11 @@ class PasswordWidget(QWidget):
             QMessageBox.critical(self, "Erro", str(e))
             self.log_message(f"Erro ao copiar usuário: {str(e)}")
 
-    def copy_password(self, website: str):
+    def copy_password(self, website: str, group: str = None):
         """Copiar senha para a área de transferência."""
+        group = group or self.current_group
         try:
-            password = self.password_manager.get_password(website, self.current_group)
+            password = self.password_manager.get_password(website, group)
             clipboard = QApplication.clipboard()
             clipboard.setText(password)
             self.log_message(f"Senha copiada para {website}")
@@ -856,188 +1047,63 @@ class PasswordWidget(QWidget):
             QMessageBox.critical(self, "Erro", str(e))
             self.log_message(f"Erro ao copiar senha: {str(e)}")
 
-    def truncate_text(self, text, max_length):
-        """Trunca texto longo e adiciona ..."""
-        if len(text) > max_length:
-            return text[:max_length-3] + "..."
-        return text
+    def entry_action(self, action: str, group: str, website: str):
+        """Executa a ação de um botão da tabela."""
+        self.entry_actions[action](website, group)
 
-    def format_time_ago(self, timestamp):
-        """Formata tempo relativo de forma amigável"""
-        now = datetime.now()
-        diff = now - timestamp
-        
-        if diff.total_seconds() < 60:
-            return "Agora"
-        elif diff.total_seconds() < 3600:
-            minutes = int(diff.total_seconds() / 60)
-            return f"Há {minutes}min"
-        elif diff.days < 1:
-            return timestamp.strftime("%H:%M")
-        elif diff.days < 7:
-            return timestamp.strftime("%a %H:%M")
-        else:
-            return timestamp.strftime("%d/%m/%y")
+    def eventFilter(self, obj, event):
+        if obj is self.search_input and event.type() == QEvent.FocusIn:
+            self.start_search_index()
+        return super().eventFilter(obj, event)
 
-    def refresh_table(self):
-        self.table.setRowCount(0)
-        entries = self.password_manager.get_all_entries()[self.current_group]
-        
-        for website, data in entries.items():
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            
-            # Website com ícone e link
-            website_widget = QWidget()
-            website_layout = QHBoxLayout(website_widget)
-            website_layout.setContentsMargins(5, 0, 5, 0)
-            website_layout.setSpacing(5)
-            
-            globe_icon = QLabel("🌐")
-            website_label = QLabel(f'<a href="{website}" style="color: #2ecc71; text-decoration: none;">{self.truncate_text(website, 30)}</a>')
-            website_label.setOpenExternalLinks(True)
-            website_layout.addWidget(globe_icon)
-            website_layout.addWidget(website_label)
-            website_layout.addStretch()
-            self.table.setCellWidget(row, 0, website_widget)
-            
-            # Username (truncado se necessário)
-            username = self.truncate_text(data["username"], 25)
-            username_item = QTableWidgetItem(username)
-            username_item.setFlags(username_item.flags() & ~Qt.ItemIsEditable)
-            username_item.setToolTip("Clique duplo para copiar")
-            self.table.setItem(row, 1, username_item)
-            
-            # Password (hidden)
-            password_widget = QWidget()
-            password_layout = QHBoxLayout(password_widget)
-            password_layout.setContentsMargins(5, 0, 5, 0)
-            password_layout.setSpacing(5)
-            
-            lock_icon = QLabel("🔒")
-            dots_label = QLabel("•••••••••••")
-            dots_label.setAlignment(Qt.AlignCenter)
-            password_layout.addWidget(lock_icon)
-            password_layout.addWidget(dots_label, 1)
-            self.table.setCellWidget(row, 2, password_widget)
-            
-            # Last modified (formato relativo)
-            last_modified = datetime.fromtimestamp(data["last_modified"])
-            modified_text = self.format_time_ago(last_modified)
-            modified_item = QTableWidgetItem(modified_text)
-            modified_item.setFlags(modified_item.flags() & ~Qt.ItemIsEditable)
-            modified_item.setTextAlignment(Qt.AlignCenter)
-            modified_item.setToolTip(last_modified.strftime("%d/%m/%Y %H:%M"))
-            self.table.setItem(row, 3, modified_item)
-            
-            # Action buttons
-            action_widget = QWidget()
-            action_widget.setStyleSheet("""
-                QWidget {
-                    background-color: transparent;
-                }
-                QPushButton {
-                    background-color: transparent;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 6px;
-                    font-size: 18px;
-                    min-width: 32px;
-                    min-height: 32px;
-                }
-                QPushButton[primary="true"] {
-                    color: #2ecc71;
-                }
-                QPushButton[primary="true"]:hover {
-                    background-color: #2ecc7115;
-                }
-                QPushButton[secondary="true"] {
-                    color: #27ae60;
-                }
-                QPushButton[secondary="true"]:hover {
-                    background-color: #27ae6015;
-                }
-                QPushButton[tertiary="true"] {
-                    color: #16a085;
-                }
-                QPushButton[tertiary="true"]:hover {
-                    background-color: #16a08515;
-                }
-                QPushButton:pressed {
-                    background-color: transparent;
-                }
-                QFrame.separator {
-                    background-color: #404040;
-                    width: 1px;
-                    margin: 6px;
-                }
-            """)
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(4, 0, 4, 0)
-            action_layout.setSpacing(1)
-            action_layout.setAlignment(Qt.AlignCenter)
-
-            # Configuração dos grupos de botões
-            buttons_config = [
-                # Grupo 1: Ações Primárias
-                [
-                    ("👁", "Mostrar/Ocultar Senha (Alt+S)", self.show_password, "primary"),
-                    ("🔑", "Copiar Senha (Alt+C)", self.copy_password, "primary"),
-                    ("👤", "Copiar Usuário (Alt+U)", self.copy_username, "primary")
-                ],
-                # Grupo 2: Ações de Edição
-                [
-                    ("✏", "Editar Senha (Alt+E)", self.edit_entry, "secondary"),
-                    ("🌐", "Abrir Website (Alt+W)", self.open_website, "secondary")
-                ],
-                # Grupo 3: Ações Secundárias
-                [
-                    ("📦", "Mover para Grupo (Alt+M)", self.move_entry, "tertiary"),
-                    ("🗑", "Excluir Senha (Del)", self.delete_entry, "tertiary")
-                ]
-            ]
-
-            # Adicionar os grupos de botões
-            for i, group in enumerate(buttons_config):
-                if i > 0:
-                    # Separador visual entre grupos
-                    separator = QFrame()
-                    separator.setFrameShape(QFrame.VLine)
-                    separator.setProperty("class", "separator")
-                    action_layout.addWidget(separator)
-
-                # Adicionar botões do grupo
-                group_widget = QWidget()
-                group_layout = QHBoxLayout(group_widget)
-                group_layout.setContentsMargins(0, 0, 0, 0)
-                group_layout.setSpacing(1)
+    def start_search_index(self):
+        """Monta o índice de busca em segundo plano, se ainda não foi montado."""
+        if self.search_ready or self.search_task is not None:
+            return
+        self.search_input.setPlaceholderText("🔍 Preparando a busca...")
+        self.search_task = AsyncTask(self.password_manager.build_search_index_async(), self)
+        self.search_task.succeeded.connect(self.search_index_ready)
+        self.search_task.failed.connect(self.search_index_failed)
+        self.search_task.start()
 
-                for icon_text, tooltip, callback, button_type in group:
-                    btn = QPushButton(icon_text)
-                    btn.setProperty(button_type, "true")
-                    btn.setToolTip(tooltip)
-                    btn.setToolTipDuration(2000)
-                    btn.clicked.connect(lambda checked, w=website, c=callback: c(w))
-                    btn.setCursor(Qt.PointingHandCursor)
+    def search_index_ready(self, result):
+        """Chamado quando o índice de busca termina de ser montado."""
+        self.search_task = None
+        self.search_ready = True
+        self.search_input.setPlaceholderText(self.SEARCH_PLACEHOLDER)
+        self.log_message("Índice de busca pronto")
+        if self.search_input.text().strip():
+            self.run_search()
 
-                    # Estilo do tooltip
-                    tooltip_style = """
-                        QToolTip {
-                            background-color: #2b2b2b;
-                            color: #ffffff;
-                            border: 1px solid #404040;
-                            padding: 5px;
-                            font-size: 11px;
-                        }
-                    """
-                    btn.setStyleSheet(tooltip_style)
-                    
-                    group_layout.addWidget(btn)
+    def search_index_failed(self, error):
+        # A busca monta o que faltar do índice quando for usada
+        self.search_task = None
+        self.search_ready = True
+        self.search_input.setPlaceholderText(self.SEARCH_PLACEHOLDER)
+        self.log_message(f"Erro ao preparar a busca: {str(error)}")
 
-                action_layout.addWidget(group_widget)
+    def run_search(self):
+        """Exibe os resultados da busca, ou o grupo atual se ela estiver vazia."""
+        query = self.search_input.text().strip()
+        if not query:
+            self.refresh_table()
+            return
+        self.start_search_index()
+        if self.search_task is not None:
+            # A busca roda assim que o índice ficar pronto
+            self.log_message("Preparando o índice de busca...")
+            return
+        results = self.password_manager.search(query, self.SEARCH_LIMIT)
+        if not results:
+            # Nada exato: tolerar erros de digitação
+            results = [(group, website) for group, website, _ in
+                       self.password_manager.find_entries(query, self.FUZZY_LIMIT)]
+            if results:
+                self.log_message(f"Nenhum resultado exato para '{query}'; exibindo resultados aproximados")
+        self.table_model.set_results(results)
 
-            self.table.setCellWidget(row, 4, action_widget)
-        
+    def refresh_table(self):
+        self.table_model.set_group(self.current_group)
         self.log_message("Tabela atualizada")
 
     def show_success_message(self, message):